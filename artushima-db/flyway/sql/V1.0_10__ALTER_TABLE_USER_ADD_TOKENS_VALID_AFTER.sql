@@ -0,0 +1,2 @@
+ALTER TABLE user
+    ADD COLUMN tokens_valid_after   DATETIME   NULL;
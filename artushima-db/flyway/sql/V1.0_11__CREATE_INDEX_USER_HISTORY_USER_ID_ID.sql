@@ -0,0 +1,2 @@
+-- The history of a user is read page by page, newest first, which the composite index serves without sorting.
+CREATE INDEX ix_user_history_user_id_id ON user_history (user_id, id);
@@ -0,0 +1,3 @@
+-- The timeline of a campaign is read page by page in the order of the session dates, which the composite index
+-- serves without sorting.
+CREATE INDEX ix_campaign_timeline_campaign_id_session_date ON campaign_timeline (campaign_id, session_date, id);
@@ -0,0 +1,4 @@
+-- The tokens carry the roles of the user, so they no longer fit into VARCHAR(255). The blacklist is looked up only
+-- by the hash of the token, the raw value is not needed.
+ALTER TABLE blacklisted_token
+    DROP COLUMN token;
@@ -0,0 +1,18 @@
+ALTER TABLE blacklisted_token
+    ADD COLUMN token_hash   CHAR(64)   NULL,
+    ADD COLUMN expires_on   DATETIME   NULL;
+
+-- The expiration time of the tokens blacklisted so far is unknown, a generous upper bound is used instead.
+UPDATE blacklisted_token
+    SET token_hash = SHA2(token, 256),
+        expires_on = DATE_ADD(UTC_TIMESTAMP(), INTERVAL 7 DAY);
+
+DELETE duplicate FROM blacklisted_token duplicate
+    JOIN blacklisted_token original
+        ON duplicate.token_hash = original.token_hash AND duplicate.id > original.id;
+
+ALTER TABLE blacklisted_token
+    MODIFY token_hash   CHAR(64)   NOT NULL,
+    MODIFY expires_on   DATETIME   NOT NULL,
+    ADD UNIQUE INDEX ux_blacklisted_token_token_hash (token_hash),
+    ADD INDEX ix_blacklisted_token_expires_on (expires_on);
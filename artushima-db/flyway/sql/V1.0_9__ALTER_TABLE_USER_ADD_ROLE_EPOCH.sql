@@ -0,0 +1,2 @@
+ALTER TABLE user
+    ADD COLUMN role_epoch   INT UNSIGNED   NOT NULL   DEFAULT 0;
@@ -8,4 +8,5 @@ export class UsersListResponse {
   public status: string;
   public message: string;
   public users: User[];
+  public nextCursor: string;
 }
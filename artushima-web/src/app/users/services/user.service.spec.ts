@@ -91,6 +91,33 @@ describe('UserService', () => {
       expect(messagesService.showMessage).toHaveBeenCalledTimes(0);
     });
 
+    it('should read all pages of the list', () => {
+      // given
+      spyOn(messagesService, 'showMessage');
+
+      let firstPage: UsersListResponse = new UsersListResponse();
+      firstPage.status = RequestStatus.SUCCESS;
+      firstPage.message = '';
+      firstPage.users = [TEST_USER_1];
+      firstPage.nextCursor = 'test_cursor';
+
+      let lastPage: UsersListResponse = new UsersListResponse();
+      lastPage.status = RequestStatus.SUCCESS;
+      lastPage.message = '';
+      lastPage.users = [TEST_USER_2];
+      lastPage.nextCursor = null;
+
+      // when then
+      userService.getUserList()
+        .subscribe(response => expect(response).toEqual(TEST_USER_LIST));
+
+      httpTestingController.expectOne(URL_USERS_LIST).flush(firstPage);
+      httpTestingController.expectOne(`${URL_USERS_LIST}?after=test_cursor`).flush(lastPage);
+
+      httpTestingController.verify();
+      expect(messagesService.showMessage).toHaveBeenCalledTimes(0);
+    });
+
     it('should return empty list, when the request status is a failure', () => {
       // given
       spyOn(messagesService, 'showMessage');
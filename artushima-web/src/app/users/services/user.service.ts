@@ -1,7 +1,7 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
-import { Observable, Subject } from 'rxjs';
-import { first } from 'rxjs/operators';
+import { HttpClient, HttpParams } from '@angular/common/http';
+import { EMPTY, Observable, Subject } from 'rxjs';
+import { expand, first, reduce } from 'rxjs/operators';
 
 import { MessagesService } from 'src/app/core/services/messages.service';
 import { RequestStatus } from 'src/app/core/model/request-status';
@@ -30,7 +30,7 @@ export class UserService {
   ) { }
 
   /**
-   * Returns the list of all users.
+   * Returns the list of all users, reading all pages of the list one after another.
    *
    * @returns an observable emitting the list of all users
    */
@@ -98,7 +98,34 @@ export class UserService {
 
   private createUsersList$(): Observable<UsersListResponse> {
 
-    return this.httpClient.get<UsersListResponse>(URL_USERS_LIST);
+    return this.createUsersListPage$(null)
+      .pipe(
+        expand(page => this.hasNextPage(page) ? this.createUsersListPage$(page.nextCursor) : EMPTY),
+        reduce((list, page) => {
+          if (page.status !== RequestStatus.SUCCESS) {
+            return page;
+          }
+
+          list.users = list.users.concat(page.users);
+          return list;
+        })
+      );
+  }
+
+  private createUsersListPage$(cursor: string): Observable<UsersListResponse> {
+
+    let params: HttpParams = new HttpParams();
+
+    if (cursor) {
+      params = params.set('after', cursor);
+    }
+
+    return this.httpClient.get<UsersListResponse>(URL_USERS_LIST, { params: params });
+  }
+
+  private hasNextPage(page: UsersListResponse): boolean {
+
+    return page.status === RequestStatus.SUCCESS && !!page.nextCursor;
   }
 
   private createUsersAdd$(request: UsersAddRequest): Observable<UsersAddResponse> {
@@ -7,10 +7,12 @@ import flask
 import artushima.auth.persistence.model as auth_model
 import artushima.campaign.persistence.model as campaign_model
 import artushima.user.persistence.model as user_model
+from artushima.auth import auth_service, blacklist_purge_job, login_throttle
+from artushima.campaign import timeline_search_index
 from artushima.commons import logger
-from artushima.core import db_access, properties
+from artushima.core import db_access, password_hashing, properties
 from artushima.startup import startup_service
-from artushima.user import roles, user_roles_service
+from artushima.user import roles, user_roles_service, user_service
 from artushima.views import index_view
 from artushima.web_api import auth_endpoint, users_endpoint, my_campaigns_endpoint
 
@@ -37,6 +39,12 @@ class App:
         self.port = properties.get_app_port()
 
         db_access.init()
+        password_hashing.init()
+        auth_service.init_token_cache()
+        auth_service.init_auth_state_cache()
+        user_service.init_user_cache()
+        login_throttle.init()
+        blacklist_purge_job.run()
 
         # Registering web-service endpoints
         self.flask_app.register_blueprint(auth_endpoint.AUTH_BLUEPRINT)
@@ -51,16 +59,12 @@ class App:
             if not startup_service.superuser_exists():
                 startup_service.create_superuser()
             else:
-                superuser_roles = user_roles_service.get_user_roles("superuser")
+                # Granting the roles added since the last startup, if any.
+                user_roles_service.grant_roles_to_users("SYSTEM", ["superuser"], roles.ALL_ROLES)
 
-                grant_required = False
-                for role in roles.ALL_ROLES:
-                    if role not in superuser_roles:
-                        grant_required = True
-                        break
-
-                if grant_required:
-                    user_roles_service.grant_roles("SYSTEM", "superuser", roles.ALL_ROLES)
+            auth_service.init_blacklist_filter()
+            user_service.init_user_search_index()
+            timeline_search_index.init()
 
             session.commit()
 
@@ -1,5 +1,8 @@
 """
 The module contains the decorators that can be used to control access to a particular resource.
+
+The decorators resolve the principal of the request (the authenticated user with his/her roles) and store it
+in the flask's request context, so the decorated endpoints can reach it via 'get_principal'.
 """
 
 import functools
@@ -9,6 +12,7 @@ import flask
 from artushima.auth import auth_service
 from artushima.commons import logger
 from artushima.core import db_access
+from artushima.user.roles import get_required_role_mask
 
 
 def allow_authorized(func):
@@ -24,13 +28,17 @@ def allow_authorized(func):
         db_session = db_access.Session()
 
         try:
-            if not auth_service.is_token_ok(token):
+            principal = auth_service.authenticate(token)
+
+            if principal is None:
 
                 return flask.jsonify({
                     "status": "failure",
                     "message": "Błąd autoryzacji"
                 }), 401
 
+            flask.g.principal = principal
+
         except Exception as err:
             logger.log_error(str(err))
             db_session.rollback()
@@ -53,6 +61,9 @@ def allow_authorized_with_roles(roles):
     Allow access only to authorized users that have one of the given roles.
     """
 
+    # Compiling the roles once, when the decorated endpoint is defined.
+    required_role_mask = get_required_role_mask(roles)
+
     def wrap_func(func):
 
         @functools.wraps(func)
@@ -63,20 +74,24 @@ def allow_authorized_with_roles(roles):
             db_session = db_access.Session()
 
             try:
-                if not auth_service.is_token_ok(token):
+                principal = auth_service.authenticate(token)
+
+                if principal is None:
 
                     return flask.jsonify({
                         "status": "failure",
                         "message": "Błąd autoryzacji"
                     }), 401
 
-                if not auth_service.are_roles_sufficient(token, roles):
+                if not auth_service.has_sufficient_roles(principal, required_role_mask):
 
                     return flask.jsonify({
                         "status": "failure",
                         "message": "Brak uprawnień"
                     }), 403
 
+                flask.g.principal = principal
+
             except Exception as err:
                 logger.log_error(str(err))
                 db_session.rollback()
@@ -94,3 +109,13 @@ def allow_authorized_with_roles(roles):
         return wrapper
 
     return wrap_func
+
+
+def get_principal():
+    """
+    Get the principal of the current request.
+
+    The principal is available only in the endpoints decorated with one of the decorators above.
+    """
+
+    return flask.g.get("principal")
@@ -2,21 +2,188 @@
 The module dealing with user authenication.
 """
 
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 
 import jwt
-import werkzeug
 from jwt import InvalidTokenError
 
 from artushima.auth.persistence import blacklisted_token_repository
-from artushima.auth.persistence.model import BlacklistedTokenEntity
-from artushima.core import properties
+from artushima.auth.persistence.model import BlacklistedTokenEntity, hash_token
+from artushima.commons import logger
+from artushima.core import db_access, password_hashing, properties
+from artushima.core.bloom_filter import BloomFilter
+from artushima.core.cache import TTLCache
 from artushima.core.exceptions import BusinessError
 from artushima.core.properties import (PROPERTY_TEST_BEARER_ENABLED,
                                        PROPERTY_TOKEN_EXPIRATION_TIME)
-from artushima.user import user_roles_service, user_service
+from artushima.user import user_events, user_roles_service, user_service
+from artushima.user.roles import ALL_ROLES, ALL_ROLES_MASK, get_role_mask
 
 TEST_BEARER_TOKEN = "test-9999"
+DEFAULT_TOKEN_CACHE_SIZE = 1024
+DEFAULT_TOKEN_CACHE_TTL = 60
+DEFAULT_BLACKLIST_FILTER_CAPACITY = 10000
+DEFAULT_BLACKLIST_FILTER_REBUILD_INTERVAL = 600
+DEFAULT_BLACKLIST_PURGE_BATCH_SIZE = 1000
+DEFAULT_AUTH_STATE_CACHE_SIZE = 1024
+DEFAULT_AUTH_STATE_CACHE_TTL = 5
+
+token_cache = None
+auth_state_cache = None
+blacklist_filter = None
+blacklist_filter_built_on = None
+blacklist_filter_rebuild_interval = DEFAULT_BLACKLIST_FILTER_REBUILD_INTERVAL
+
+# The hashes of the tokens blacklisted by this process since the start of the last rebuild of the filter. They are
+# added to the rebuilt filter, as the database snapshot of the rebuild might not contain them yet.
+_recently_blacklisted_token_hashes = list()
+_blacklist_filter_lock = threading.Lock()
+_blacklist_filter_rebuild_lock = threading.Lock()
+
+
+def init_token_cache():
+    """
+    Initialize the cache of verified tokens.
+
+    Until the cache is initialized, every token is verified against the database.
+    """
+
+    global token_cache
+
+    cache_size = properties.get_token_cache_size()
+    cache_ttl = properties.get_token_cache_ttl()
+
+    token_cache = TTLCache(
+        int(cache_size) if cache_size else DEFAULT_TOKEN_CACHE_SIZE,
+        int(cache_ttl) if cache_ttl else DEFAULT_TOKEN_CACHE_TTL
+    )
+
+
+def get_token_cache_stats():
+    """
+    Get the statistics of the cache of verified tokens.
+    """
+
+    if token_cache is None:
+        return None
+
+    return token_cache.get_stats()
+
+
+def _evict_user_from_token_cache(user_name):
+    if token_cache is not None:
+        token_cache.evict_where(lambda token, principal: principal["user_name"] == user_name)
+
+
+user_events.subscribe_user_changed(_evict_user_from_token_cache)
+
+
+def init_auth_state_cache():
+    """
+    Initialize the cache of the data needed to authenticate the users.
+
+    The role epoch of a user is compared with the one embedded in the token to decide, if the roles embedded in
+    the token are still valid. The issue time of the token is compared with the time, before which all tokens
+    of the user are revoked. The TTL of the cache bounds the time, after which a change made by another process
+    takes effect.
+    """
+
+    global auth_state_cache
+
+    cache_ttl = properties.get_auth_state_cache_ttl()
+
+    auth_state_cache = TTLCache(
+        DEFAULT_AUTH_STATE_CACHE_SIZE,
+        int(cache_ttl) if cache_ttl else DEFAULT_AUTH_STATE_CACHE_TTL
+    )
+
+
+def _evict_user_from_auth_state_cache(user_name):
+    if auth_state_cache is not None:
+        auth_state_cache.evict(user_name)
+
+
+user_events.subscribe_user_changed(_evict_user_from_auth_state_cache)
+
+
+def _get_user_auth_state(user_name):
+    if auth_state_cache is not None:
+        user = auth_state_cache.get(user_name)
+
+        if user is not None:
+            return user
+
+    user = user_service.get_user_auth_state(user_name)
+
+    if user is not None and auth_state_cache is not None:
+        auth_state_cache.put(user_name, user)
+
+    return user
+
+
+def init_blacklist_filter():
+    """
+    Build the filter of blacklisted tokens from the database.
+
+    The filter holds the hashes of the tokens and answers most of the blacklist checks without querying the
+    database -- the database is queried only if the filter reports that the token might be blacklisted. The filter
+    is rebuilt periodically, so the tokens blacklisted by other processes are eventually taken into account. The
+    tokens blacklisted by this process are added to the filter once their transactions are committed. The rebuild
+    interval is read only here, not on every authentication.
+    """
+
+    global blacklist_filter_rebuild_interval
+
+    rebuild_interval = properties.get_blacklist_filter_rebuild_interval()
+    blacklist_filter_rebuild_interval = \
+        int(rebuild_interval) if rebuild_interval else DEFAULT_BLACKLIST_FILTER_REBUILD_INTERVAL
+
+    _build_blacklist_filter()
+
+
+def _build_blacklist_filter():
+    global blacklist_filter, blacklist_filter_built_on, _recently_blacklisted_token_hashes
+
+    with _blacklist_filter_lock:
+        previously_blacklisted_token_hashes = _recently_blacklisted_token_hashes
+        _recently_blacklisted_token_hashes = list()
+
+    token_hashes = blacklisted_token_repository.read_all_token_hashes()
+
+    new_filter = BloomFilter(max(DEFAULT_BLACKLIST_FILTER_CAPACITY, 2 * len(token_hashes)))
+    for token_hash in token_hashes:
+        new_filter.add(token_hash)
+
+    with _blacklist_filter_lock:
+        for token_hash in previously_blacklisted_token_hashes + _recently_blacklisted_token_hashes:
+            new_filter.add(token_hash)
+
+        blacklist_filter = new_filter
+        blacklist_filter_built_on = time.time()
+
+
+def _rebuild_blacklist_filter_if_due():
+    if time.time() - blacklist_filter_built_on < blacklist_filter_rebuild_interval:
+        return
+
+    # Only one request rebuilds the filter, the other ones keep using the current one meanwhile.
+    if not _blacklist_filter_rebuild_lock.acquire(blocking=False):
+        return
+
+    try:
+        if time.time() - blacklist_filter_built_on >= blacklist_filter_rebuild_interval:
+            _build_blacklist_filter()
+    finally:
+        _blacklist_filter_rebuild_lock.release()
+
+
+def _add_to_blacklist_filter(token_hash):
+    with _blacklist_filter_lock:
+        if blacklist_filter is not None:
+            blacklist_filter.add(token_hash)
+            _recently_blacklisted_token_hashes.append(token_hash)
 
 
 def log_in(user_name, password):
@@ -24,29 +191,46 @@ def log_in(user_name, password):
     Authenticate the user and return the current user data with authentication token.
     """
 
-    user = user_service.get_user_by_user_name(user_name)
+    user = user_service.get_user_credentials(user_name)
 
     if user is None:
         raise BusinessError(f"User {user_name} does not exist!")
 
-    if not werkzeug.security.check_password_hash(user["password_hash"], password):
+    if not password_hashing.check_password_hash(user["password_hash"], password):
         raise BusinessError(f"Incorrect password!")
 
-    payload = _create_jwt_payload(user_name)
+    if password_hashing.needs_rehash(user["password_hash"]):
+        _rehash_password(user_name, password)
+
+    user_roles = list(user_roles_service.get_user_roles(user_name))
+    payload = _create_jwt_payload(user_name, user["id"], user["role_epoch"], user_roles)
     token = jwt.encode(payload, properties.get_app_secret_key(), algorithm="HS256")
-    user_roles = user_roles_service.get_user_roles(user_name)
 
     return _create_log_in_response(user_name, user_roles, token)
 
 
-def _create_jwt_payload(user_name):
+def _rehash_password(user_name, password):
+    # The rehash is only an upgrade of the stored hash, so its failure must not fail the login.
+    try:
+        password_hash = password_hashing.generate_password_hash(password)
+
+        with db_access.savepoint():
+            user_service.change_password_hash(user_name, password_hash)
+    except Exception as err:
+        logger.log_error(f"Error on rehashing the password of the user {user_name}: {str(err)}")
+
+
+def _create_jwt_payload(user_name, user_id, role_epoch, user_roles):
     timestamp = datetime.utcnow()
     exp_time = _get_and_validate_exp_time()
 
     return {
         "sub": user_name,
         "iat": timestamp,
-        "exp": timestamp + timedelta(minutes=exp_time)
+        "exp": timestamp + timedelta(minutes=exp_time),
+        "uid": user_id,
+        "roles": user_roles,
+        "role_epoch": role_epoch
     }
 
 
@@ -96,12 +280,18 @@ def is_token_ok(token):
     if user is None:
         return False
 
+    if _is_token_revoked(decoded_token, user):
+        return False
+
     return True
 
 
-def get_user_name(token):
+def authenticate(token):
     """
-    Get the user name from the token.
+    Authenticate the token and resolve the principal of the request.
+
+    The token is decoded only once and the user is read together with his/her roles, so the returned principal
+    contains everything that is needed to authorize the request. If the token is not valid, None is returned.
     """
 
     if token is None:
@@ -110,78 +300,119 @@ def get_user_name(token):
     token = token.split(" ")[1]
 
     if token == TEST_BEARER_TOKEN:
-        return "Test"
+        if _is_test_bearer_enabled():
+            return _create_test_bearer_principal()
+        else:
+            return None
+
+    if token_cache is not None:
+        principal = token_cache.get(token)
+
+        if principal is not None:
+            return principal
+
+    if _is_token_blacklisted(token):
+        return None
 
     try:
         decoded_token = jwt.decode(token, properties.get_app_secret_key(), algorithm="HS256")
     except InvalidTokenError:
         return None
 
-    return decoded_token["sub"]
+    auth_state = _get_user_auth_state(decoded_token["sub"])
 
+    if auth_state is None:
+        return None
 
-def get_user_id(token):
-    """
-    Get the ID of the user from the token.
-    """
+    if _is_token_revoked(decoded_token, auth_state):
+        return None
 
-    user_name = get_user_name(token)
+    principal = _create_principal_from_claims(decoded_token, auth_state)
 
-    if user_name is None:
-        return None
+    if principal is None:
+        user = user_service.get_user_with_roles_by_user_name(decoded_token["sub"])
 
-    if user_name == "Test":
-        user_name = "superuser"
+        if user is None:
+            return None
 
-    user = user_service.get_user_by_user_name(user_name)
+        principal = _create_principal(user["id"], user["user_name"], user["roles"], decoded_token)
 
-    if user is None:
-        return None
+    if token_cache is not None:
+        token_cache.put(token, principal, decoded_token.get("exp"))
 
-    return user["id"]
+    return principal
 
 
-def are_roles_sufficient(token, required_roles):
+def _is_token_revoked(claims, user):
     """
-    Check if the user for whom the token has been issued has required roles.
+    Check if the token has been issued before the time, from which the tokens of the user are valid.
 
-    The user has to have only one of the required roles -- each role grants the access to the resource separately.
+    The 'iat' claim has the resolution of one second, so the tokens issued within the second of the revocation
+    are treated as revoked as well.
     """
 
-    if token is None:
+    tokens_valid_after = user.get("tokens_valid_after")
+
+    if tokens_valid_after is None:
         return False
 
-    token = token.split(" ")[1]
+    if "iat" not in claims:
+        return True
 
-    if token == TEST_BEARER_TOKEN:
-        if _is_test_bearer_enabled():
-            return True
-        else:
-            return False
+    return claims["iat"] <= tokens_valid_after.replace(tzinfo=timezone.utc).timestamp()
 
-    if required_roles is None or len(required_roles) == 0:
-        return True
 
-    if _is_token_blacklisted(token):
-        return False
+def _create_principal_from_claims(claims, auth_state):
+    """
+    Create the principal from the roles embedded in the token, if they are still valid.
 
-    try:
-        decoded_token = jwt.decode(token, properties.get_app_secret_key(), algorithm="HS256")
-    except InvalidTokenError:
-        return False
+    The roles are valid, if the role epoch embedded in the token is the current role epoch of the user.
+    """
 
-    user = user_service.get_user_by_user_name(decoded_token["sub"])
+    if "roles" not in claims or "role_epoch" not in claims:
+        return None
 
-    if user is None:
-        return False
+    if auth_state["role_epoch"] != claims["role_epoch"]:
+        return None
 
-    user_roles = user_roles_service.get_user_roles(user["user_name"])
+    return _create_principal(auth_state["id"], claims["sub"], claims["roles"], claims)
 
-    for user_role in user_roles:
-        if user_role in required_roles:
-            return True
 
-    return False
+def _create_test_bearer_principal():
+    superuser = user_service.get_user_by_user_name("superuser")
+    superuser_id = superuser["id"] if superuser is not None else None
+
+    principal = _create_principal(superuser_id, "Test", list(ALL_ROLES), dict())
+    principal["role_mask"] = ALL_ROLES_MASK
+
+    return principal
+
+
+def _create_principal(user_id, user_name, user_roles, claims):
+    return {
+        "user_id": user_id,
+        "user_name": user_name,
+        "roles": user_roles,
+        "role_mask": get_role_mask(user_roles),
+        "claims": claims
+    }
+
+
+def has_sufficient_roles(principal, required_role_mask):
+    """
+    Check if the principal has at least one of the required roles.
+
+    The required roles are given as a mask compiled with 'roles.get_required_role_mask'. An empty mask means that
+    no roles are required.
+    """
+
+    if principal is None:
+        return False
+
+    if required_role_mask == 0:
+        return True
+
+    return principal["role_mask"] & required_role_mask != 0
 
 
 def _is_test_bearer_enabled():
@@ -194,19 +425,64 @@ def _is_test_bearer_enabled():
 
 
 def _is_token_blacklisted(token):
-    blacklisted_token = blacklisted_token_repository.read_by_token(token)
+    token_hash = hash_token(token)
+
+    if blacklist_filter is not None:
+        _rebuild_blacklist_filter_if_due()
+
+        if not blacklist_filter.might_contain(token_hash):
+            return False
+
+    blacklisted_token = blacklisted_token_repository.read_by_token_hash(token_hash)
 
     return blacklisted_token is not None
 
 
 def blacklist_token(token):
     """
-    Persist the given token as blacklisted.
+    Persist the given token as blacklisted. A token already blacklisted (e.g. the test bearer token on a repeated
+    logout) is skipped.
     """
 
     token = token.split(" ")[1]
+    token_hash = hash_token(token)
+
+    if blacklisted_token_repository.read_by_token_hash(token_hash) is not None:
+        return
 
     blacklisted_token = BlacklistedTokenEntity()
-    blacklisted_token.token = token
+    blacklisted_token.token_hash = token_hash
+    blacklisted_token.expires_on = _get_token_expiration_time(token)
 
     blacklisted_token_repository.persist(blacklisted_token)
+    db_access.run_after_commit(lambda: _on_token_blacklisted(token, token_hash))
+
+
+def _on_token_blacklisted(token, token_hash):
+    if token_cache is not None:
+        token_cache.evict(token)
+
+    _add_to_blacklist_filter(token_hash)
+
+
+def _get_token_expiration_time(token):
+    try:
+        decoded_token = jwt.decode(token, properties.get_app_secret_key(), algorithm="HS256")
+        return datetime.utcfromtimestamp(decoded_token["exp"])
+    except (InvalidTokenError, KeyError):
+        # The token carries no expiration time (e.g. the test bearer token), so it is kept at least as long as
+        # any token issued now.
+        return datetime.utcnow() + timedelta(minutes=_get_and_validate_exp_time())
+
+
+def purge_expired_blacklisted_tokens():
+    """
+    Delete one batch of the blacklisted tokens, that have already expired.
+
+    Return the number of deleted tokens -- if it is lower than the batch size, nothing is left to purge.
+    """
+
+    batch_size = properties.get_blacklist_purge_batch_size()
+    batch_size = int(batch_size) if batch_size else DEFAULT_BLACKLIST_PURGE_BATCH_SIZE
+
+    return blacklisted_token_repository.delete_expired(datetime.utcnow(), batch_size)
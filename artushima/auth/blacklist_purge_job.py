@@ -0,0 +1,48 @@
+"""
+The job deleting the expired tokens from the blacklist.
+
+The job is run on the application startup. It can be also run periodically (e.g. by cron) with:
+    python -m artushima.auth.blacklist_purge_job
+"""
+
+from artushima.auth import auth_service
+from artushima.commons import logger
+from artushima.core import db_access, properties
+
+
+def run():
+    """
+    Delete all expired blacklisted tokens, committing each batch in a separate transaction.
+    """
+
+    deleted_total = 0
+
+    while True:
+        db_session = db_access.Session()
+
+        try:
+            deleted = auth_service.purge_expired_blacklisted_tokens()
+            db_session.commit()
+
+        except Exception as err:
+            db_session.rollback()
+            logger.log_error(f"Error on purging the expired blacklisted tokens: {str(err)}")
+            raise err
+
+        finally:
+            db_session.close()
+
+        deleted_total += deleted
+
+        if deleted == 0:
+            break
+
+    logger.log_info(f"Expired blacklisted tokens purged: {deleted_total}.")
+
+    return deleted_total
+
+
+if __name__ == "__main__":
+    properties.init()
+    db_access.init()
+    run()
@@ -0,0 +1,75 @@
+"""
+The module throttling the login attempts.
+
+The attempts are limited per client address and per user name, so that a burst of attempts is rejected before
+any database or password hashing work is done.
+"""
+
+import threading
+
+from artushima.core import properties
+from artushima.core.rate_limiter import TokenBucketLimiter
+
+DEFAULT_ADDRESS_RATE = 30
+DEFAULT_ADDRESS_BURST = 10
+DEFAULT_USER_RATE = 10
+DEFAULT_USER_BURST = 5
+
+address_limiter = None
+user_limiter = None
+
+_lock = threading.Lock()
+
+
+def init():
+    """
+    Initialize the limiters of the login attempts.
+
+    Until the limiters are initialized, the login attempts are not throttled.
+    """
+
+    global address_limiter, user_limiter
+
+    address_limiter = _create_limiter(
+        properties.get_login_address_rate(),
+        properties.get_login_address_burst(),
+        DEFAULT_ADDRESS_RATE,
+        DEFAULT_ADDRESS_BURST
+    )
+    user_limiter = _create_limiter(
+        properties.get_login_user_rate(),
+        properties.get_login_user_burst(),
+        DEFAULT_USER_RATE,
+        DEFAULT_USER_BURST
+    )
+
+
+def _create_limiter(rate, burst, default_rate, default_burst):
+    rate_per_minute = int(rate) if rate else default_rate
+    burst = int(burst) if burst else default_burst
+
+    return TokenBucketLimiter(rate_per_minute / 60, burst)
+
+
+def is_attempt_allowed(client_address, user_name):
+    """
+    Check if the login attempt from the given address for the given user name is allowed.
+
+    A token is taken from both buckets only if both of them allow the attempt, so that an attempt rejected for the
+    user name does not use up the limit of the address and the other way round.
+    """
+
+    limiters = [
+        (limiter, key)
+        for limiter, key in [(address_limiter, client_address), (user_limiter, user_name)]
+        if limiter is not None
+    ]
+
+    with _lock:
+        if not all(limiter.has_token(key) for limiter, key in limiters):
+            return False
+
+        for limiter, key in limiters:
+            limiter.try_acquire(key)
+
+    return True
@@ -26,14 +26,51 @@ def persist(blacklisted_token):
         raise PersistenceError(f"Error on persisting blacklisted token: {str(err)}")
 
 
-def read_by_token(token):
+def read_by_token_hash(token_hash):
     """
-    Read a blacklisted token entry by the token value.
+    Read a blacklisted token entry by the hash of the token.
     """
 
     try:
         session = db_access.Session()
-        blacklisted_token = session.query(BlacklistedTokenEntity).filter_by(token=token).first()
+        blacklisted_token = session.query(BlacklistedTokenEntity).filter_by(token_hash=token_hash).first()
         return blacklisted_token
     except SQLAlchemyError as err:
-        raise PersistenceError(f"Error on reading blacklisted token: {token}") from err
+        raise PersistenceError(f"Error on reading blacklisted token: {token_hash}") from err
+
+
+def read_all_token_hashes():
+    """
+    Read the hashes of all blacklisted tokens.
+    """
+
+    try:
+        session = db_access.Session()
+        return [row.token_hash for row in session.query(BlacklistedTokenEntity.token_hash).all()]
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on reading all blacklisted tokens: {str(err)}") from err
+
+
+def delete_expired(now, batch_size):
+    """
+    Delete at most the given number of blacklisted tokens, that have expired before the given time.
+
+    Return the number of deleted tokens.
+    """
+
+    try:
+        session = db_access.Session()
+        expired_ids = session.query(BlacklistedTokenEntity.id) \
+            .filter(BlacklistedTokenEntity.expires_on < now) \
+            .limit(batch_size) \
+            .all()
+        expired_ids = [row.id for row in expired_ids]
+
+        if not expired_ids:
+            return 0
+
+        return session.query(BlacklistedTokenEntity) \
+            .filter(BlacklistedTokenEntity.id.in_(expired_ids)) \
+            .delete(synchronize_session=False)
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on deleting expired blacklisted tokens: {str(err)}") from err
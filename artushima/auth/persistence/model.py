@@ -2,7 +2,9 @@
 The module containing the data model for the auth component.
 """
 
-from sqlalchemy import Column, Integer, String
+import hashlib
+
+from sqlalchemy import Column, DateTime, Integer, String
 
 from artushima.core.db_access import BaseEntity
 
@@ -15,4 +17,13 @@ class BlacklistedTokenEntity(BaseEntity):
     __tablename__ = "blacklisted_token"
 
     id = Column("ID", Integer, primary_key=True)
-    token = Column("TOKEN", String(255), nullable=False)
+    token_hash = Column("TOKEN_HASH", String(64), nullable=False, unique=True)
+    expires_on = Column("EXPIRES_ON", DateTime, nullable=False, index=True)
+
+
+def hash_token(token):
+    """
+    Get the fixed-width hash of the token, under which the token is looked up in the blacklist.
+    """
+
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
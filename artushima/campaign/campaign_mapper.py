@@ -11,6 +11,8 @@ from artushima.core.utils.argument_validator import (assert_int, assert_str,
                                                      assert_str_or_none)
 from artushima.core.utils.data_parser import parse_iso_date
 
+MAX_TIMELINE_ENTRIES_BATCH_SIZE = 1000
+
 
 def map_create_timeline_entry_request(data_json: dict, campaign_id: int) -> dict:
     """
@@ -39,6 +41,25 @@ def map_create_timeline_entry_request(data_json: dict, campaign_id: int) -> dict
     }
 
 
+def map_create_timeline_entries_request(data_json: list, campaign_id: int) -> list:
+    """
+    Map the input data of the request creating many entries in the campaign timeline at once.
+
+    All entries are validated before any of them is created.
+    """
+
+    if data_json is None:
+        raise DomainError("Data not provided!", "D0000")
+
+    if not isinstance(data_json, list) or not data_json or len(data_json) > MAX_TIMELINE_ENTRIES_BATCH_SIZE:
+        raise DomainError("Invalid list of timeline entries!", "DC005")
+
+    if any(not isinstance(entry_json, dict) for entry_json in data_json):
+        raise DomainError("Invalid list of timeline entries!", "DC005")
+
+    return [map_create_timeline_entry_request(entry_json, campaign_id) for entry_json in data_json]
+
+
 def map_history_entry_data_to_history_entity(entry_data: dict, timestamp: datetime = None) -> CampaignHistoryEntity:
     """
     Map the data to an entry in a campaign history.
@@ -72,3 +93,34 @@ def map_timeline_entry_data_to_timeline_entity(entry_data: dict, timestamp: date
     entity.session_date = entry_data["sessionDate"]
     entity.summary_text = entry_data["summaryText"]
     return entity
+
+
+def map_timeline_entry_data_to_timeline_row(entry_data: dict, timestamp: datetime) -> dict:
+    """
+    Map the timeline entry data to the column values of a new timeline row.
+    """
+
+    return {
+        "created_on": timestamp,
+        "modified_on": timestamp,
+        "opt_lock": 0,
+        "title": entry_data["title"],
+        "session_date": entry_data["sessionDate"],
+        "summary_text": entry_data["summaryText"],
+        "campaign_id": entry_data["campaignId"]
+    }
+
+
+def map_history_entry_data_to_history_row(entry_data: dict, campaign_id: int, timestamp: datetime) -> dict:
+    """
+    Map the data of an entry in a campaign history to the column values of a new history row.
+    """
+
+    return {
+        "created_on": timestamp,
+        "modified_on": timestamp,
+        "opt_lock": 0,
+        "editor_name": entry_data["editorName"],
+        "message": entry_data["message"],
+        "campaign_id": campaign_id
+    }
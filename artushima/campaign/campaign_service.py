@@ -4,15 +4,16 @@ The service module dealing with the logic behind campaigns.
 
 from datetime import datetime, timedelta
 
-from artushima.campaign import campaign_mapper
+from artushima.campaign import campaign_mapper, timeline_search_index
 from artushima.campaign.persistence import campaign_repository
+from artushima.campaign.persistence.campaign_repository import PROFILE_WITH_GAME_MASTER
 from artushima.campaign.persistence.model import (CampaignEntity,
                                                   CampaignHistoryEntity)
+from artushima.core import db_access
 from artushima.core.exceptions import BusinessError, DomainError
 from artushima.core.history_messages import get_message
 from artushima.core.utils.argument_validator import (assert_int,
                                                      validate_int_arg)
-from artushima.user import user_service
 
 
 def create_campaign(editor_name, campaign_name, begin_date, passed_days, game_master_id, game_master_name):
@@ -68,49 +69,45 @@ def _add_history_entry_to_campaign(campaign, editor_name, timestamp, message):
     campaign.campaign_history_entries.append(campaign_history_entry)
 
 
-def get_campaigns_by_gm_id(gm_id):
+def get_campaign_names_by_gm_id(gm_id):
     """
-    Get the campaigns belonging to the game master of the given ID.
+    Get the IDs and names of the campaigns belonging to the game master of the given ID.
+
+    The campaigns are read, and the game master is checked to exist, with a single query.
     """
 
     validate_int_arg(gm_id, "ID mistrza gry")
 
-    if user_service.get_user_by_id(gm_id) is None:
-        raise BusinessError(f"Użytkownik o ID {gm_id} nie istnieje!")
-
-    campaigns = campaign_repository.read_by_gm_id(gm_id)
-
-    result = list()
-
-    for campaign in campaigns:
-        result.append(_map_campaign_to_dict(campaign))
-
-    return result
+    rows = campaign_repository.read_names_by_gm_id(gm_id)
 
+    if not rows:
+        raise BusinessError(f"Użytkownik o ID {gm_id} nie istnieje!")
 
-def _map_campaign_to_dict(campaign):
-    return {
-        "id": campaign.id,
-        "created_on": campaign.created_on,
-        "modified_on": campaign.modified_on,
-        "opt_lock": campaign.opt_lock,
-        "campaign_name": campaign.campaign_name,
-        "begin_date": campaign.begin_date,
-        "passed_days": campaign.passed_days,
-    }
+    return [{"id": row.id, "campaign_name": row.campaign_name} for row in rows if row.id is not None]
 
 
-def get_campaign_details(campaign_id):
+def get_campaign_details_for_user(user_id, campaign_id):
     """
-    Get the details of a campaign.
+    Get the details of a campaign, if the user of the given ID is related to it, otherwise None.
+
+    The campaign is read together with its game master in a single query, which serves both the access check and
+    the details.
     """
 
+    validate_int_arg(user_id, "ID użytkownika")
     validate_int_arg(campaign_id, "ID kampanii")
 
-    campaign = campaign_repository.read_by_id(campaign_id)
+    campaign = campaign_repository.read_by_id(campaign_id, PROFILE_WITH_GAME_MASTER)
     if campaign is None:
         raise BusinessError(f"Kampania o ID {campaign_id} nie istnieje!")
 
+    if not _is_user_related_to_campaign(user_id, campaign):
+        return None
+
+    return _map_campaign_to_details(campaign)
+
+
+def _map_campaign_to_details(campaign):
     current_date = campaign.begin_date + timedelta(days=campaign.passed_days)
 
     return {
@@ -127,7 +124,8 @@ def get_campaign_details(campaign_id):
 
 def create_timeline_entry(entry_data: dict, editor_name: str) -> int:
     """
-    Create an entry in the timeline of a campaign.
+    Create an entry in the timeline of a campaign. The entry is indexed for the search once the transaction is
+    committed.
     """
 
     campaign = campaign_repository.read_by_id(entry_data["campaignId"])
@@ -148,9 +146,123 @@ def create_timeline_entry(entry_data: dict, editor_name: str) -> int:
 
     campaign_repository.persist(campaign)
 
+    indexed_entry = (campaign.id, timeline_entry.id, timeline_entry.title, timeline_entry.summary_text)
+    db_access.run_after_commit(lambda: timeline_search_index.add_entry(*indexed_entry))
+
     return timeline_entry.id
 
 
+def create_timeline_entries(campaign_id: int, entries_data: list, editor_name: str) -> list:
+    """
+    Create many entries in the timeline of a campaign at once. Return the IDs of the created entries in the order
+    of the given data.
+
+    The history rows are written with a single multi-row statement. The timeline rows are written one by one, to read
+    the ID of each of them from its own statement. The entries are indexed for the search once the transaction is
+    committed.
+    """
+
+    if not campaign_repository.lock_by_id(campaign_id):
+        raise DomainError("Campaign does not extist!", "DC002")
+
+    timestamp = datetime.utcnow()
+    message = get_message("campaign: timeline entry created")
+
+    entry_ids = campaign_repository.insert_timeline_entries([
+        campaign_mapper.map_timeline_entry_data_to_timeline_row(entry_data, timestamp)
+        for entry_data in entries_data
+    ])
+    campaign_repository.insert_history_entries([
+        campaign_mapper.map_history_entry_data_to_history_row(
+            {"editorName": editor_name, "message": message.format(entry_data["title"])},
+            campaign_id,
+            timestamp
+        )
+        for entry_data in entries_data
+    ])
+
+    indexed_entries = [
+        (campaign_id, entry_id, entry_data["title"], entry_data["summaryText"])
+        for entry_id, entry_data in zip(entry_ids, entries_data)
+    ]
+    db_access.run_after_commit(lambda: timeline_search_index.add_entries(indexed_entries))
+
+    return entry_ids
+
+
+def get_timeline_page(campaign_id, after, limit):
+    """
+    Get at most the given number of the timeline entries of a campaign, ordered by the session date, following the
+    entry at the given position -- a dict with the 'sessionDate' and the 'id' of the entry, or None for the first
+    page.
+
+    The position of the last returned entry is given as 'last' if there might be more entries to read, otherwise it
+    is None. The summary texts are not read.
+    """
+
+    assert_int(campaign_id, "DC001")
+
+    after_session_date = None
+    after_id = None
+
+    if after is not None:
+        after_session_date = after["sessionDate"]
+        after_id = after["id"]
+
+    # Reading one entry more to know if there is a next page.
+    entries = campaign_repository.read_timeline_page(campaign_id, after_session_date, after_id, limit + 1)
+    has_next_page = len(entries) > limit
+    entries = entries[:limit]
+
+    last = None
+    if has_next_page:
+        last = {"sessionDate": entries[-1].session_date, "id": entries[-1].id}
+
+    return {
+        "entries": [
+            {"id": entry.id, "title": entry.title, "sessionDate": entry.session_date}
+            for entry in entries
+        ],
+        "last": last
+    }
+
+
+def search_timeline(campaign_id, query, offset, limit):
+    """
+    Find the timeline entries of a campaign matching all words of the query, the best matches first, skipping the
+    given number of matches.
+
+    The offset of the next page is given as 'next_offset' if there might be more matches, otherwise it is None.
+    """
+
+    assert_int(campaign_id, "DC001")
+
+    if not timeline_search_index.is_initialized():
+        raise DomainError("Timeline search index not initialized!", "T0002", 503)
+
+    # Searching for one entry more to know if there is a next page.
+    entry_ids = timeline_search_index.search(campaign_id, query, offset, limit + 1)
+    has_next_page = len(entry_ids) > limit
+    entry_ids = entry_ids[:limit]
+
+    entries_by_id = dict()
+    if entry_ids:
+        entries = campaign_repository.read_timeline_entries_by_ids(campaign_id, entry_ids)
+        entries_by_id = {entry.id: entry for entry in entries}
+
+    result = list()
+
+    for entry_id in entry_ids:
+        if entry_id in entries_by_id:
+            entry = entries_by_id[entry_id]
+            result.append({"id": entry.id, "title": entry.title, "sessionDate": entry.session_date})
+
+    return {
+        "entries": result,
+        "next_offset": offset + limit if has_next_page else None
+    }
+
+
 def check_if_campaign_gm(user_id, campaign_id):
     """
     Check if the user of the given ID is the game master of the campaign of the given ID.
@@ -159,7 +271,7 @@ def check_if_campaign_gm(user_id, campaign_id):
     assert_int(user_id, "DU001")
     assert_int(campaign_id, "DC001")
 
-    campaign = campaign_repository.read_by_id(campaign_id)
+    campaign = campaign_repository.read_by_id(campaign_id, PROFILE_WITH_GAME_MASTER)
 
     if campaign is None:
         raise DomainError("Campaign does not exist!", "DC002")
@@ -179,9 +291,13 @@ def check_if_user_related_to_campaign(user_id, campaign_id):
     validate_int_arg(user_id, "ID użytkownika")
     validate_int_arg(campaign_id, "ID kampanii")
 
-    campaign = campaign_repository.read_by_id(campaign_id)
+    campaign = campaign_repository.read_by_id(campaign_id, PROFILE_WITH_GAME_MASTER)
 
     if campaign is None:
         raise BusinessError(f"Kampania o ID {campaign_id} nie istnieje!")
 
+    return _is_user_related_to_campaign(user_id, campaign)
+
+
+def _is_user_related_to_campaign(user_id, campaign):
     return campaign.game_master.id == user_id
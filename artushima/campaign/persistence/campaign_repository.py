@@ -3,11 +3,24 @@ The repository module providing access to the data related to the campaign
 entity.
 """
 
-from artushima.campaign.persistence.model import CampaignEntity
+from artushima.campaign.persistence.model import (CampaignEntity,
+                                                  CampaignHistoryEntity,
+                                                  CampaignTimelineEntity)
 from artushima.core import db_access
 from artushima.core.exceptions import PersistenceError
+from artushima.user.persistence.model import UserEntity
+from sqlalchemy import and_, or_
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
+
+PROFILE_WITH_GAME_MASTER = "with_game_master"
+
+# The maximal number of values in a single IN clause.
+IN_CLAUSE_CHUNK_SIZE = 500
+
+LOADING_PROFILES = {
+    PROFILE_WITH_GAME_MASTER: lambda: [joinedload(CampaignEntity.game_master)]
+}
 
 
 def persist(campaign):
@@ -21,31 +34,248 @@ def persist(campaign):
     try:
         session: Session = db_access.Session()
         session.add(campaign)
-        session.flush()
+        db_access.flush(session)
         return campaign
     except SQLAlchemyError as err:
         raise PersistenceError(f"Error on persisting a campaign: {str(err)}")
 
 
-def read_by_id(campaign_id: int) -> CampaignEntity:
+def read_by_id(campaign_id: int, profile: str = None) -> CampaignEntity:
     """
-    Read campaign data by its ID.
+    Read campaign data by its ID, loading the relationships of the given loading profile.
     """
 
     try:
         session: Session = db_access.Session()
-        return session.query(CampaignEntity).filter_by(id=campaign_id).first()
+        query = db_access.apply_loading_profile(session.query(CampaignEntity), LOADING_PROFILES, profile)
+        return query.filter_by(id=campaign_id).first()
     except SQLAlchemyError as err:
         raise PersistenceError(f"Error on reading a campaign of the ID: {str(campaign_id)}") from err
 
 
-def read_by_gm_id(gm_id):
+def lock_by_id(campaign_id):
+    """
+    Lock the row of the campaign with the given ID until the end of the transaction. Return False, if the campaign
+    does not exist.
+    """
+
+    try:
+        session: Session = db_access.Session()
+        locked_id = session.query(CampaignEntity.id) \
+            .filter(CampaignEntity.id == campaign_id) \
+            .with_for_update() \
+            .scalar()
+        return locked_id is not None
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on locking the campaign {campaign_id}: {str(err)}") from err
+
+
+def read_names_by_gm_id(gm_id):
+    """
+    Read the IDs and names of the campaigns belonging to the game master of the given ID, ordered by the IDs.
+
+    The user is outer-joined with his/her campaigns, so that a single query tells also if the user exists: no rows
+    are returned for a missing user and a single row without a campaign for a user without campaigns.
+    """
+
+    try:
+        session: Session = db_access.Session()
+        return session.query(UserEntity.id.label("gm_id"), CampaignEntity.id, CampaignEntity.campaign_name) \
+            .outerjoin(CampaignEntity, CampaignEntity.game_master_id == UserEntity.id) \
+            .filter(UserEntity.id == gm_id) \
+            .order_by(CampaignEntity.id) \
+            .all()
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on reading campaign names of the GM (ID: {str(gm_id)}): {str(err)}") from err
+
+
+def read_timeline_page(campaign_id, after_session_date, after_id, limit):
+    """
+    Read at most the given number of the timeline entries of the given campaign, ordered by the session date and
+    the ID, following the entry of the given session date and ID.
+
+    The summary texts are not read.
+    """
+
+    try:
+        session: Session = db_access.Session()
+        query = session.query(
+            CampaignTimelineEntity.id,
+            CampaignTimelineEntity.title,
+            CampaignTimelineEntity.session_date
+        )
+
+        return _filter_timeline_page(query, campaign_id, after_session_date, after_id, limit).all()
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on reading a page of the timeline of the campaign {campaign_id}: {str(err)}") \
+            from err
+
+
+def _filter_timeline_page(query, campaign_id, after_session_date, after_id, limit):
+    query = query.filter(CampaignTimelineEntity.campaign_id == campaign_id)
+
+    if after_id is not None:
+        query = query.filter(or_(
+            CampaignTimelineEntity.session_date > after_session_date,
+            and_(CampaignTimelineEntity.session_date == after_session_date, CampaignTimelineEntity.id > after_id)
+        ))
+
+    return query.order_by(CampaignTimelineEntity.session_date, CampaignTimelineEntity.id).limit(limit)
+
+
+def stream_timeline(campaign_id, chunk_size):
+    """
+    Read all the timeline entries of the given campaign, ordered by the session date and the ID.
+
+    The entries are read lazily, page by page, with a separate query for each page of the given size, so that they
+    are never all kept in memory.
+    """
+
+    after_session_date = None
+    after_id = None
+
+    while True:
+        try:
+            session: Session = db_access.Session()
+            query = session.query(
+                CampaignTimelineEntity.id,
+                CampaignTimelineEntity.title,
+                CampaignTimelineEntity.session_date,
+                CampaignTimelineEntity.summary_text
+            )
+            entries = _filter_timeline_page(query, campaign_id, after_session_date, after_id, chunk_size).all()
+        except SQLAlchemyError as err:
+            raise PersistenceError(f"Error on streaming the timeline of the campaign {campaign_id}: {str(err)}") \
+                from err
+
+        yield from entries
+
+        if len(entries) < chunk_size:
+            return
+
+        after_session_date = entries[-1].session_date
+        after_id = entries[-1].id
+
+
+def stream_all_timelines(chunk_size):
+    """
+    Read the timeline entries of all campaigns, ordered by the ID, lazily, with a separate query for each page of
+    the given size.
+    """
+
+    after_id = None
+
+    while True:
+        try:
+            session: Session = db_access.Session()
+            query = session.query(
+                CampaignTimelineEntity.id,
+                CampaignTimelineEntity.campaign_id,
+                CampaignTimelineEntity.title,
+                CampaignTimelineEntity.summary_text
+            )
+
+            if after_id is not None:
+                query = query.filter(CampaignTimelineEntity.id > after_id)
+
+            entries = query.order_by(CampaignTimelineEntity.id).limit(chunk_size).all()
+        except SQLAlchemyError as err:
+            raise PersistenceError(f"Error on streaming the timelines of all campaigns: {str(err)}") from err
+
+        yield from entries
+
+        if len(entries) < chunk_size:
+            return
+
+        after_id = entries[-1].id
+
+
+def read_all_timeline_entry_ids():
+    """
+    Read the IDs of the timeline entries of all campaigns.
+    """
+
+    try:
+        session: Session = db_access.Session()
+        return {row.id for row in session.query(CampaignTimelineEntity.id).all()}
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on reading the IDs of all timeline entries: {str(err)}") from err
+
+
+def read_timeline_entries_with_summaries_by_ids(entry_ids):
     """
-    Get all campaigns belonging to the game master of the given ID.
+    Read the IDs, campaign IDs, titles and summaries of the timeline entries with the given IDs, of any campaign.
     """
 
+    entry_ids = list(entry_ids)
+    entries = list()
+
+    try:
+        session: Session = db_access.Session()
+
+        for i in range(0, len(entry_ids), IN_CLAUSE_CHUNK_SIZE):
+            chunk = entry_ids[i:i + IN_CLAUSE_CHUNK_SIZE]
+            entries.extend(session.query(
+                CampaignTimelineEntity.id,
+                CampaignTimelineEntity.campaign_id,
+                CampaignTimelineEntity.title,
+                CampaignTimelineEntity.summary_text
+            ).filter(CampaignTimelineEntity.id.in_(chunk)).all())
+
+        return entries
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on reading timeline entries: {str(err)}") from err
+
+
+def read_timeline_entries_by_ids(campaign_id, entry_ids):
+    """
+    Read the IDs, titles and session dates of the timeline entries of the given campaign with the given IDs.
+    """
+
+    try:
+        session: Session = db_access.Session()
+        return session.query(
+            CampaignTimelineEntity.id,
+            CampaignTimelineEntity.title,
+            CampaignTimelineEntity.session_date
+        ).filter(CampaignTimelineEntity.campaign_id == campaign_id) \
+            .filter(CampaignTimelineEntity.id.in_(list(entry_ids))) \
+            .all()
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on reading the timeline entries of the campaign {campaign_id}: {str(err)}") \
+            from err
+
+
+def insert_timeline_entries(timeline_entries):
+    """
+    Insert the given timeline entries (dicts of column values) and return their IDs in the order of the entries.
+
+    Each entry is inserted with its own statement, as the generated primary keys of a multi-row statement can not be
+    reliably read back.
+    """
+
+    try:
+        session: Session = db_access.Session()
+        statement = CampaignTimelineEntity.__table__.insert()
+        return [session.execute(statement, entry).inserted_primary_key[0] for entry in timeline_entries]
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on inserting campaign timeline entries: {str(err)}") from err
+
+
+def insert_history_entries(history_entries):
+    """
+    Insert the given campaign history entries (dicts of column values) with a single multi-row statement.
+    """
+
+    _insert_all(CampaignHistoryEntity, history_entries, "campaign history entries")
+
+
+def _insert_all(entity_class, rows, description):
+    if not rows:
+        return
+
     try:
         session: Session = db_access.Session()
-        return session.query(CampaignEntity).filter_by(game_master_id=gm_id).all()
+        session.execute(entity_class.__table__.insert(), rows)
     except SQLAlchemyError as err:
-        raise PersistenceError(f"Error on reading campaigns of the GM (ID: {str(gm_id)}): {str(err)}") from err
+        raise PersistenceError(f"Error on inserting {description}: {str(err)}") from err
@@ -3,8 +3,8 @@ The module containing the data model for the campaign component.
 """
 
 from artushima.core.db_access import BaseEntity
-from sqlalchemy import (Column, Date, DateTime, ForeignKey, Integer, String,
-                        Text)
+from sqlalchemy import (Column, Date, DateTime, ForeignKey, Index, Integer,
+                        String, Text)
 from sqlalchemy.orm import relationship
 
 
@@ -24,8 +24,11 @@ class CampaignEntity(BaseEntity):
     passed_days = Column("passed_days", Integer, nullable=False)
     game_master_id = Column("game_master_id", Integer, ForeignKey("user.id"), nullable=False)
 
-    campaign_history_entries = relationship("CampaignHistoryEntity", back_populates="campaign")
-    campaign_timeline_entries = relationship("CampaignTimelineEntity", back_populates="campaign")
+    __mapper_args__ = {"version_id_col": opt_lock}
+
+    # Dynamic, so that appending an entry does not load all existing ones.
+    campaign_history_entries = relationship("CampaignHistoryEntity", back_populates="campaign", lazy="dynamic")
+    campaign_timeline_entries = relationship("CampaignTimelineEntity", back_populates="campaign", lazy="dynamic")
     game_master = relationship("UserEntity", back_populates="owned_campaigns")
 
 
@@ -44,6 +47,8 @@ class CampaignHistoryEntity(BaseEntity):
     message = Column("message", String(255), nullable=False)
     campaign_id = Column("campaign_id", Integer, ForeignKey("campaign.id"), nullable=False)
 
+    __mapper_args__ = {"version_id_col": opt_lock}
+
     campaign = relationship("CampaignEntity", back_populates="campaign_history_entries")
 
 
@@ -53,6 +58,9 @@ class CampaignTimelineEntity(BaseEntity):
     """
 
     __tablename__ = "campaign_timeline"
+    __table_args__ = (
+        Index("ix_campaign_timeline_campaign_id_session_date", "campaign_id", "session_date", "id"),
+    )
 
     id = Column("id", Integer, primary_key=True)
     created_on = Column("created_on", DateTime, nullable=False)
@@ -63,4 +71,6 @@ class CampaignTimelineEntity(BaseEntity):
     summary_text = Column("summary_text", Text, nullable=True)
     campaign_id = Column("campaign_id", Integer, ForeignKey("campaign.id"), nullable=False)
 
+    __mapper_args__ = {"version_id_col": opt_lock}
+
     campaign = relationship("CampaignEntity", back_populates="campaign_timeline_entries")
@@ -0,0 +1,85 @@
+"""
+The module exporting the timeline of a campaign.
+
+Two formats are available:
+    ndjson -- one JSON object per line: {"id": ..., "title": "...", "sessionDate": "rrrr-mm-dd", "summaryText": "..."},
+    csv -- with the header 'id,title,sessionDate,summaryText'.
+
+The export is produced lazily, line by line, so that it can be streamed to the client.
+"""
+
+import csv
+import io
+import json
+
+from artushima.campaign.persistence import campaign_repository
+from artushima.core.exceptions import DomainError
+from artushima.core.utils.argument_validator import assert_int
+
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+
+MIMETYPES = {
+    FORMAT_NDJSON: "application/x-ndjson",
+    FORMAT_CSV: "text/csv"
+}
+
+CSV_HEADER = ["id", "title", "sessionDate", "summaryText"]
+
+# The number of the timeline entries fetched from the database at once.
+CHUNK_SIZE = 500
+
+
+def validate_format(file_format):
+    """
+    Check if the export format is supported.
+    """
+
+    if file_format not in MIMETYPES:
+        raise DomainError("Incorrect export format!", "D0004", 400)
+
+
+def export_timeline(campaign_id, file_format):
+    """
+    Generate the lines of the export of the timeline of the given campaign in the given format.
+    """
+
+    assert_int(campaign_id, "DC001")
+    validate_format(file_format)
+
+    entries = campaign_repository.stream_timeline(campaign_id, CHUNK_SIZE)
+
+    if file_format == FORMAT_CSV:
+        return _generate_csv_lines(entries)
+
+    return _generate_ndjson_lines(entries)
+
+
+def _generate_ndjson_lines(entries):
+    for entry in entries:
+        yield json.dumps({
+            "id": entry.id,
+            "title": entry.title,
+            "sessionDate": entry.session_date.isoformat(),
+            "summaryText": entry.summary_text
+        }, ensure_ascii=False) + "\n"
+
+
+def _generate_csv_lines(entries):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(CSV_HEADER)
+    yield _flush_buffer(buffer)
+
+    for entry in entries:
+        writer.writerow([entry.id, entry.title, entry.session_date.isoformat(), entry.summary_text])
+        yield _flush_buffer(buffer)
+
+
+def _flush_buffer(buffer):
+    line = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+
+    return line
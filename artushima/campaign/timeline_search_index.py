@@ -0,0 +1,244 @@
+"""
+The module maintaining the full-text search index over the campaign timelines.
+
+The index is kept in a local SQLite FTS5 database, separate from the main database. It is updated incrementally
+when timeline entries are created and can be rebuilt from the main database offline with:
+    python -m artushima.campaign.timeline_search_index
+
+The ID of the campaign is indexed as a term of its own column, so that a search matches only the entries of a
+single campaign instead of filtering the matches of all campaigns.
+
+The texts are tokenized with Polish in mind: the letters are lowercased and stripped of the diacritics (including
+'ł'), and the most common inflectional endings are cut off, so that e.g. 'Molocha' and 'Molochem' both match
+'Moloch'.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+
+from artushima.campaign.persistence import campaign_repository
+from artushima.commons import logger
+from artushima.core import properties
+
+DEFAULT_INDEX_PATH = "timeline_search.db"
+
+# The version of the index schema. An index of another version is recreated and rebuilt on opening.
+INDEX_VERSION = 2
+
+# The number of the timeline entries read from the main database at once on rebuilding the index.
+REBUILD_CHUNK_SIZE = 500
+
+# The inflectional endings cut off the tokens, the longest ones first.
+_POLISH_ENDINGS = sorted([
+    "ami", "ach", "owi", "ego", "emu", "ych", "ymi", "iej", "owie",
+    "em", "om", "ie", "ow", "ej", "ym", "mi",
+    "a", "e", "i", "o", "u", "y"
+], key=len, reverse=True)
+_MIN_STEM_LENGTH = 4
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+_connection = None
+_lock = threading.Lock()
+
+
+def tokenize(text):
+    """
+    Split the text into the normalized tokens, under which it is indexed.
+    """
+
+    if not text:
+        return []
+
+    text = text.casefold().replace("ł", "l")
+    text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+
+    return [_stem(token) for token in _TOKEN_PATTERN.findall(text)]
+
+
+def _stem(token):
+    for ending in _POLISH_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= _MIN_STEM_LENGTH:
+            return token[:-len(ending)]
+
+    return token
+
+
+def init():
+    """
+    Open the index, creating it if it does not exist yet.
+
+    A newly created index is filled with the timeline entries from the main database, an existing one is reconciled
+    with it, so it has to be called within a database session. Until the index is initialized, the entries are not
+    indexed and the search is not available.
+    """
+
+    if _open():
+        rebuild()
+    else:
+        reconcile()
+
+
+def _open():
+    global _connection
+
+    index_path = properties.get_timeline_search_index_path() or DEFAULT_INDEX_PATH
+    created = not os.path.exists(index_path)
+
+    with _lock:
+        if _connection is not None:
+            _connection.close()
+
+        _connection = sqlite3.connect(index_path, check_same_thread=False)
+
+        if _connection.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            _connection.execute("DROP TABLE IF EXISTS timeline_search")
+            _connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            created = True
+
+        _connection.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS timeline_search "
+            "USING fts5(content, campaign_id, entry_id UNINDEXED)"
+        )
+        _connection.commit()
+
+    return created
+
+
+def is_initialized():
+    """
+    Check if the index is available.
+    """
+
+    return _connection is not None
+
+
+def add_entry(campaign_id, entry_id, title, summary_text):
+    """
+    Index the timeline entry. If the index is not initialized, nothing is done.
+    """
+
+    add_entries([(campaign_id, entry_id, title, summary_text)])
+
+
+def add_entries(entries):
+    """
+    Index many timeline entries, given as tuples (campaign ID, entry ID, title, summary text), with a single
+    statement and a single commit. If the index is not initialized, nothing is done.
+    """
+
+    if _connection is None:
+        return
+
+    rows = [_create_row(*entry) for entry in entries]
+
+    with _lock:
+        _connection.executemany(
+            "INSERT INTO timeline_search (content, campaign_id, entry_id) VALUES (?, ?, ?)",
+            rows
+        )
+        _connection.commit()
+
+
+def _create_row(campaign_id, entry_id, title, summary_text):
+    return " ".join(tokenize(title) + tokenize(summary_text)), campaign_id, entry_id
+
+
+def rebuild():
+    """
+    Replace the whole content of the index with the timeline entries from the main database.
+    """
+
+    rows = (
+        _create_row(entry.campaign_id, entry.id, entry.title, entry.summary_text)
+        for entry in campaign_repository.stream_all_timelines(REBUILD_CHUNK_SIZE)
+    )
+
+    with _lock:
+        _connection.execute("DELETE FROM timeline_search")
+        _connection.executemany(
+            "INSERT INTO timeline_search (content, campaign_id, entry_id) VALUES (?, ?, ?)",
+            rows
+        )
+        _connection.commit()
+        count = _connection.execute("SELECT COUNT(*) FROM timeline_search").fetchone()[0]
+
+    logger.log_info(f"Timeline search index rebuilt: {count} entries.")
+
+    return count
+
+
+def reconcile():
+    """
+    Bring the index in line with the main database and return the numbers of the added and removed entries.
+
+    The entries missing from the index (e.g. created by another process or host, or while the index was not
+    available) are added. The entries, that do not exist in the main database (e.g. indexed from another database),
+    are removed.
+    """
+
+    entry_ids = campaign_repository.read_all_timeline_entry_ids()
+
+    with _lock:
+        indexed_ids = {row[0] for row in _connection.execute("SELECT entry_id FROM timeline_search").fetchall()}
+
+    missing_ids = entry_ids - indexed_ids
+    stale_ids = indexed_ids - entry_ids
+
+    add_entries(
+        (entry.campaign_id, entry.id, entry.title, entry.summary_text)
+        for entry in campaign_repository.read_timeline_entries_with_summaries_by_ids(missing_ids)
+    )
+
+    with _lock:
+        _connection.executemany(
+            "DELETE FROM timeline_search WHERE entry_id = ?",
+            ((entry_id,) for entry_id in stale_ids)
+        )
+        _connection.commit()
+
+    logger.log_info(f"Timeline search index reconciled: {len(missing_ids)} entries added, {len(stale_ids)} removed.")
+
+    return len(missing_ids), len(stale_ids)
+
+
+def search(campaign_id, query, offset, limit):
+    """
+    Get the IDs of the timeline entries of the given campaign matching all words of the query, the best matches
+    first, skipping the given number of matches.
+    """
+
+    tokens = tokenize(query)
+
+    if not tokens:
+        return []
+
+    match = f'campaign_id : "{int(campaign_id)}" AND content : (' + " ".join(f'"{token}"*' for token in tokens) + ")"
+
+    with _lock:
+        # Only the content is ranked, the campaign ID matches all the entries of the campaign alike.
+        rows = _connection.execute(
+            "SELECT entry_id FROM timeline_search WHERE timeline_search MATCH ? "
+            "ORDER BY bm25(timeline_search, 1.0, 0.0, 0.0) LIMIT ? OFFSET ?",
+            (match, limit, offset)
+        ).fetchall()
+
+    return [row[0] for row in rows]
+
+
+if __name__ == "__main__":
+    from artushima.core import db_access
+
+    properties.init()
+    db_access.init()
+
+    session = db_access.Session()
+
+    try:
+        _open()
+        rebuild()
+    finally:
+        session.close()
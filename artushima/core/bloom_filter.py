@@ -0,0 +1,53 @@
+"""
+The module providing a Bloom filter -- a compact set, which can tell for sure only that a value is not its member.
+"""
+
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """
+    A Bloom filter sized for the given capacity and false positive rate.
+
+    The filter never gives false negatives: if 'might_contain' returns False, the value has never been added.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+
+        capacity = max(capacity, 1)
+
+        self.bit_count = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.bit_count / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.bit_count + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _get_positions(self, value):
+        digest = hashlib.sha256(value.encode("utf-8")).digest()
+        hash_1 = int.from_bytes(digest[:8], "big")
+        hash_2 = int.from_bytes(digest[8:16], "big") | 1
+
+        return [(hash_1 + i * hash_2) % self.bit_count for i in range(self.hash_count)]
+
+    def add(self, value):
+        """
+        Add the value to the filter.
+        """
+
+        positions = self._get_positions(value)
+
+        with self._lock:
+            for position in positions:
+                self._bits[position // 8] |= 1 << (position % 8)
+
+    def might_contain(self, value):
+        """
+        Check if the value might have been added to the filter.
+        """
+
+        for position in self._get_positions(value):
+            if not self._bits[position // 8] & (1 << (position % 8)):
+                return False
+
+        return True
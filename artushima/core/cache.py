@@ -0,0 +1,111 @@
+"""
+The module providing an in-process cache with bounded size and time-limited entries.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    A thread-safe LRU cache, which entries expire after the given time.
+
+    When the cache is full, the least recently used entry is dropped on insertion. The time to live of a single
+    entry can be shortened by passing its own expiration time on insertion.
+    """
+
+    def __init__(self, max_size, ttl):
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get the value stored under the given key or None, if there is no such value or it has expired.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, expires_at=None):
+        """
+        Store the value under the given key.
+
+        The entry expires after the TTL of the cache or on the given expiration time (as a UNIX timestamp),
+        whichever comes first.
+        """
+
+        if self.max_size <= 0:
+            return
+
+        entry_expires_at = time.time() + self.ttl
+
+        if expires_at is not None:
+            entry_expires_at = min(entry_expires_at, expires_at)
+
+        with self._lock:
+            self._entries[key] = (value, entry_expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def evict(self, key):
+        """
+        Remove the entry stored under the given key.
+        """
+
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def evict_where(self, predicate):
+        """
+        Remove all entries for which the predicate, called with the key and the value, returns True.
+        """
+
+        with self._lock:
+            keys = [key for key, (value, _) in self._entries.items() if predicate(key, value)]
+
+            for key in keys:
+                del self._entries[key]
+
+    def clear(self):
+        """
+        Remove all entries from the cache.
+        """
+
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """
+        Get the statistics of the cache usage.
+        """
+
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses
+            }
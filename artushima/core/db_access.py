@@ -2,16 +2,22 @@
 The module providing functionalities necessary to access the database.
 """
 
+from contextlib import contextmanager
+
 import sqlalchemy
 from sqlalchemy import orm
 from sqlalchemy.ext import declarative
+from sqlalchemy.orm.exc import StaleDataError
 
 from artushima.core import properties
+from artushima.core.exceptions import DomainError
 
 SqlEngine = None
 Session = None
 BaseEntity = declarative.declarative_base()
 
+_AFTER_COMMIT_CALLBACKS = "after_commit_callbacks"
+
 
 def init():
     """
@@ -26,4 +32,88 @@ def init():
         raise RuntimeError("Property 'DB_URI' not provided.")
 
     SqlEngine = sqlalchemy.create_engine(db_uri)
-    Session = orm.scoped_session(orm.sessionmaker(SqlEngine))
+
+    session_factory = orm.sessionmaker(SqlEngine)
+    sqlalchemy.event.listen(session_factory, "after_commit", _run_after_commit_callbacks)
+    sqlalchemy.event.listen(session_factory, "after_transaction_end", _discard_after_commit_callbacks)
+
+    Session = orm.scoped_session(session_factory)
+
+
+def run_after_commit(callback):
+    """
+    Run the callback once the transaction of the current session is committed. If the transaction is rolled back,
+    the callback is not run at all.
+
+    It is meant for the actions, that must not see the changes before other transactions can see them, e.g. the
+    eviction of cached data. If the database access is not initialized, the callback is run at once.
+    """
+
+    if Session is None:
+        callback()
+        return
+
+    Session().info.setdefault(_AFTER_COMMIT_CALLBACKS, list()).append(callback)
+
+
+@contextmanager
+def savepoint():
+    """
+    Run the block in a nested transaction of the current session. If the block fails, only its own changes are
+    rolled back and the transaction of the session can go on.
+
+    If the database access is not initialized, the block is run without a nested transaction.
+    """
+
+    if Session is None:
+        yield
+        return
+
+    with Session().begin_nested():
+        yield
+
+
+def _run_after_commit_callbacks(session):
+    if session.transaction is not None and session.transaction.nested:
+        return
+
+    for callback in session.info.pop(_AFTER_COMMIT_CALLBACKS, list()):
+        callback()
+
+
+def _discard_after_commit_callbacks(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_AFTER_COMMIT_CALLBACKS, None)
+
+
+def apply_loading_profile(query, loading_profiles, profile):
+    """
+    Apply the loader options of the given loading profile to the query.
+
+    The loading profiles map the profile names to functions returning the loader options (e.g. 'joinedload'), so
+    that a repository can load exactly the relationships, which the caller needs, in the same or a single extra
+    query. Without a profile all relationships are loaded lazily.
+    """
+
+    if profile is None:
+        return query
+
+    if profile not in loading_profiles:
+        raise ValueError(f"Unknown loading profile: {profile}")
+
+    return query.options(*loading_profiles[profile]())
+
+
+def flush(session):
+    """
+    Flush the pending changes of the session.
+
+    The versioned entities map their 'opt_lock' column as the version counter, so an update or a delete of a row
+    changed by another transaction since it was read affects no rows. Such a version conflict is raised as a domain
+    error with the HTTP status 409.
+    """
+
+    try:
+        session.flush()
+    except StaleDataError as err:
+        raise DomainError(f"Version conflict: {str(err)}", "D0005", 409) from err
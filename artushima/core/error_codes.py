@@ -6,18 +6,27 @@ _error_codes = {
     "default": "Wystąpił problem z aplikacją. Szczegóły błędu nie są znane. Skontaktuj się z administratorem.",
     # Technical errors
     "T0000": "Błąd aplikacji.",
+    "T0001": "Serwer jest obecnie przeciążony. Spróbuj ponownie za chwilę.",
+    "T0002": "Wyszukiwanie jest obecnie niedostępne.",
     # Authentication related errors
     "AC002": "Ta operacja dostępna jest jedynie dla mistrza gry danej kampanii.",
+    "AC003": "Zbyt wiele prób logowania. Spróbuj ponownie później.",
     # Data related errors
     "D0000": "Brakujące dane.",
     "D0001": "Niepoprawny format daty. Akceptowany format to 'rrrr-mm-dd'.",
+    "D0002": "Niepoprawny kursor stronicowania.",
+    "D0003": "Niepoprawny rozmiar strony.",
+    "D0004": "Niepoprawny format eksportu. Akceptowane formaty to 'ndjson' i 'csv'.",
+    "D0005": "Dane zostały w międzyczasie zmienione przez kogoś innego. Odśwież je i spróbuj ponownie.",
+    "D0006": "Niepoprawny format pliku importu.",
     # - user
     "DU001": "Brakujące dane: ID użytkownika",
     # - campaign
     "DC001": "Brakujące dane: ID kampanii",
     "DC002": "Kampania nie istnieje.",
     "DC003": "Brakujące dane: tytuł wpisu",
-    "DC004": "Brakujące dane: data sesji"
+    "DC004": "Brakujące dane: data sesji",
+    "DC005": "Niepoprawna lista wpisów. Należy podać od 1 do 1000 wpisów."
 }
 
 
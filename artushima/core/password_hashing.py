@@ -0,0 +1,152 @@
+"""
+The module hashing and checking passwords.
+
+Password hashing is deliberately slow and holds the GIL, so once the module is initialized, the work is done by
+a bounded pool of worker processes. When too many hashing tasks are waiting, new ones are rejected at once
+instead of queueing up and starving other requests.
+"""
+
+import atexit
+import itertools
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from werkzeug import security
+
+from artushima.commons import logger
+from artushima.core import properties
+from artushima.core.exceptions import DomainError
+
+DEFAULT_HASH_METHOD = "pbkdf2:sha256"
+
+_executor = None
+_queue_slots = None
+_workers = 0
+_hash_method = DEFAULT_HASH_METHOD
+
+
+def init():
+    """
+    Initialize the pool of the hashing worker processes and the hashing method.
+
+    Until the pool is initialized, the passwords are hashed in the calling thread with the default method.
+    """
+
+    global _executor, _queue_slots, _workers, _hash_method
+
+    shutdown()
+
+    _hash_method = properties.get_password_hash_method() or DEFAULT_HASH_METHOD
+
+    workers = properties.get_hashing_workers()
+    workers = int(workers) if workers else (os.cpu_count() or 1)
+
+    queue_limit = properties.get_hashing_queue_limit()
+    queue_limit = int(queue_limit) if queue_limit else workers * 4
+
+    _executor = ProcessPoolExecutor(max_workers=workers)
+    _workers = workers
+    _queue_slots = threading.BoundedSemaphore(queue_limit)
+
+    logger.log_info(
+        f"Password hashing initialized: method {_hash_method}, {workers} workers, queue limit {queue_limit}."
+    )
+
+
+def shutdown():
+    """
+    Shut down the pool of the hashing worker processes.
+    """
+
+    global _executor, _queue_slots, _workers, _hash_method
+
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+
+    _executor = None
+    _queue_slots = None
+    _workers = 0
+    _hash_method = DEFAULT_HASH_METHOD
+
+
+atexit.register(shutdown)
+
+
+@contextmanager
+def _queue_slot(queue_slots):
+    if not queue_slots.acquire(blocking=False):
+        raise DomainError("Password hashing queue is full!", "T0001", 503)
+
+    try:
+        yield
+    finally:
+        queue_slots.release()
+
+
+def _run(func, *args):
+    executor = _executor
+
+    if executor is None:
+        return func(*args)
+
+    with _queue_slot(_queue_slots):
+        return executor.submit(func, *args).result()
+
+
+def generate_password_hash(password):
+    """
+    Generate the hash of the password with the configured method.
+    """
+
+    return _run(security.generate_password_hash, password, _hash_method)
+
+
+def generate_password_hashes(passwords):
+    """
+    Generate the hashes of many passwords with the configured method, spreading the work over all worker processes.
+
+    The whole batch takes a single place in the hashing queue.
+    """
+
+    passwords = list(passwords)
+    executor = _executor
+    hash_method = _hash_method
+
+    if executor is None:
+        return [security.generate_password_hash(password, hash_method) for password in passwords]
+
+    chunk_size = max(len(passwords) // (_workers * 4), 1)
+
+    with _queue_slot(_queue_slots):
+        return list(executor.map(
+            security.generate_password_hash,
+            passwords,
+            itertools.repeat(hash_method, len(passwords)),
+            chunksize=chunk_size
+        ))
+
+
+def check_password_hash(password_hash, password):
+    """
+    Check if the password matches the hash.
+    """
+
+    return _run(security.check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """
+    Check if the hash has been generated with other parameters than the configured ones.
+
+    The method is given in the werkzeug's format, e.g. 'pbkdf2:sha256:600000'. If it does not specify the number
+    of iterations, the hashes of any cost generated with the same algorithm are accepted.
+    """
+
+    if not password_hash or "$" not in password_hash:
+        return True
+
+    method = password_hash.split("$", 1)[0]
+
+    return method != _hash_method and not method.startswith(_hash_method + ":")
@@ -0,0 +1,72 @@
+"""
+The module providing an in-memory index for case-insensitive prefix search (e.g. for typeahead).
+"""
+
+import bisect
+import threading
+
+
+class PrefixIndex:
+    """
+    A thread-safe index keeping values under string keys sorted case-insensitively.
+
+    The values with keys starting with a prefix are found with a binary search, in logarithmic time plus the number
+    of the returned values.
+    """
+
+    def __init__(self, entries=()):
+
+        entries = sorted((self._normalize(key), key, value) for key, value in entries)
+
+        self._normalized_keys = [normalized_key for normalized_key, _, _ in entries]
+        self._entries = [(key, value) for _, key, value in entries]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(key):
+        return key.casefold()
+
+    def add(self, key, value):
+        """
+        Add the value under the given key. A value already stored under the same key is replaced.
+        """
+
+        normalized_key = self._normalize(key)
+
+        with self._lock:
+            position = bisect.bisect_left(self._normalized_keys, normalized_key)
+
+            while position < len(self._entries) and self._normalized_keys[position] == normalized_key:
+                if self._entries[position][0] == key:
+                    self._entries[position] = (key, value)
+                    return
+
+                position += 1
+
+            self._normalized_keys.insert(position, normalized_key)
+            self._entries.insert(position, (key, value))
+
+    def search(self, prefix, limit):
+        """
+        Get at most the given number of (key, value) pairs with keys starting with the prefix, in the key order.
+        """
+
+        normalized_prefix = self._normalize(prefix)
+
+        with self._lock:
+            position = bisect.bisect_left(self._normalized_keys, normalized_prefix)
+            result = list()
+
+            while (
+                len(result) < limit
+                and position < len(self._entries)
+                and self._normalized_keys[position].startswith(normalized_prefix)
+            ):
+                result.append(self._entries[position])
+                position += 1
+
+            return result
+
+    def __len__(self):
+
+        return len(self._entries)
@@ -18,6 +18,21 @@ PROPERTY_DB_URI = "DB_URI"
 PROPERTY_TOKEN_EXPIRATION_TIME = "TOKEN_EXPIRATION_TIME"
 PROPERTY_SUPERUSER_PASSWORD = "SUPERUSER_PASSWORD"
 PROPERTY_TEST_BEARER_ENABLED = "TEST_BEARER_ENABLED"
+PROPERTY_TOKEN_CACHE_SIZE = "TOKEN_CACHE_SIZE"
+PROPERTY_TOKEN_CACHE_TTL = "TOKEN_CACHE_TTL"
+PROPERTY_BLACKLIST_FILTER_REBUILD_INTERVAL = "BLACKLIST_FILTER_REBUILD_INTERVAL"
+PROPERTY_BLACKLIST_PURGE_BATCH_SIZE = "BLACKLIST_PURGE_BATCH_SIZE"
+PROPERTY_AUTH_STATE_CACHE_TTL = "AUTH_STATE_CACHE_TTL"
+PROPERTY_HASHING_WORKERS = "HASHING_WORKERS"
+PROPERTY_HASHING_QUEUE_LIMIT = "HASHING_QUEUE_LIMIT"
+PROPERTY_PASSWORD_HASH_METHOD = "PASSWORD_HASH_METHOD"
+PROPERTY_LOGIN_ADDRESS_RATE = "LOGIN_ADDRESS_RATE"
+PROPERTY_LOGIN_ADDRESS_BURST = "LOGIN_ADDRESS_BURST"
+PROPERTY_LOGIN_USER_RATE = "LOGIN_USER_RATE"
+PROPERTY_LOGIN_USER_BURST = "LOGIN_USER_BURST"
+PROPERTY_USER_CACHE_SIZE = "USER_CACHE_SIZE"
+PROPERTY_USER_CACHE_TTL = "USER_CACHE_TTL"
+PROPERTY_TIMELINE_SEARCH_INDEX_PATH = "TIMELINE_SEARCH_INDEX_PATH"
 
 
 def init():
@@ -105,3 +120,123 @@ def get_test_bearer_enabled():
     """
 
     return get(PROPERTY_TEST_BEARER_ENABLED).lower() in ["true", "1"]
+
+
+def get_token_cache_size():
+    """
+    Get the maximal number of verified tokens kept in the token cache.
+    """
+
+    return get(PROPERTY_TOKEN_CACHE_SIZE)
+
+
+def get_token_cache_ttl():
+    """
+    Get the time in seconds, after which a verified token has to be verified again.
+    """
+
+    return get(PROPERTY_TOKEN_CACHE_TTL)
+
+
+def get_blacklist_filter_rebuild_interval():
+    """
+    Get the time in seconds, after which the filter of blacklisted tokens is rebuilt from the database.
+    """
+
+    return get(PROPERTY_BLACKLIST_FILTER_REBUILD_INTERVAL)
+
+
+def get_blacklist_purge_batch_size():
+    """
+    Get the maximal number of expired blacklisted tokens deleted in a single transaction.
+    """
+
+    return get(PROPERTY_BLACKLIST_PURGE_BATCH_SIZE)
+
+
+def get_auth_state_cache_ttl():
+    """
+    Get the time in seconds, for which the data needed to authenticate a user (e.g. the role epoch) is cached.
+    """
+
+    return get(PROPERTY_AUTH_STATE_CACHE_TTL)
+
+
+def get_hashing_workers():
+    """
+    Get the number of worker processes hashing the passwords.
+    """
+
+    return get(PROPERTY_HASHING_WORKERS)
+
+
+def get_hashing_queue_limit():
+    """
+    Get the maximal number of password hashing tasks that can be processed or wait for processing at once.
+    """
+
+    return get(PROPERTY_HASHING_QUEUE_LIMIT)
+
+
+def get_password_hash_method():
+    """
+    Get the method of password hashing in the werkzeug's format, e.g. 'pbkdf2:sha256:600000'.
+    """
+
+    return get(PROPERTY_PASSWORD_HASH_METHOD)
+
+
+def get_login_address_rate():
+    """
+    Get the number of login attempts per minute allowed from a single client address.
+    """
+
+    return get(PROPERTY_LOGIN_ADDRESS_RATE)
+
+
+def get_login_address_burst():
+    """
+    Get the number of login attempts allowed at once from a single client address.
+    """
+
+    return get(PROPERTY_LOGIN_ADDRESS_BURST)
+
+
+def get_login_user_rate():
+    """
+    Get the number of login attempts per minute allowed for a single user name.
+    """
+
+    return get(PROPERTY_LOGIN_USER_RATE)
+
+
+def get_login_user_burst():
+    """
+    Get the number of login attempts allowed at once for a single user name.
+    """
+
+    return get(PROPERTY_LOGIN_USER_BURST)
+
+
+def get_user_cache_size():
+    """
+    Get the maximal number of users kept in the user identity cache. Zero disables the cache.
+    """
+
+    return get(PROPERTY_USER_CACHE_SIZE)
+
+
+def get_user_cache_ttl():
+    """
+    Get the time in seconds, for which the data of a user is kept in the user identity cache.
+    """
+
+    return get(PROPERTY_USER_CACHE_TTL)
+
+
+def get_timeline_search_index_path():
+    """
+    Get the path of the file with the full-text search index over the campaign timelines.
+    """
+
+    return get(PROPERTY_TIMELINE_SEARCH_INDEX_PATH)
@@ -0,0 +1,62 @@
+"""
+The module providing an in-process rate limiter based on the token bucket algorithm.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """
+    A thread-safe rate limiter keeping a separate token bucket for each key.
+
+    Each bucket holds at most 'burst' tokens and is refilled with 'rate' tokens per second. An action is allowed
+    if a token can be taken from the bucket of its key. The number of tracked keys is bounded -- when it is
+    exceeded, the least recently used bucket is dropped.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000):
+
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def has_token(self, key):
+        """
+        Check if a token can be taken from the bucket of the given key, without taking it.
+        """
+
+        now = time.monotonic()
+
+        with self._lock:
+            return self._get_tokens(key, now) >= 1
+
+    def try_acquire(self, key):
+        """
+        Take a token from the bucket of the given key. Return False, if the bucket is empty.
+        """
+
+        now = time.monotonic()
+
+        with self._lock:
+            tokens = self._get_tokens(key, now)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+            return allowed
+
+    def _get_tokens(self, key, now):
+        tokens, updated_on = self._buckets.get(key, (self.burst, now))
+
+        return min(self.burst, tokens + (now - updated_on) * self.rate)
@@ -0,0 +1,41 @@
+"""
+The module with utils for the opaque cursors used by the paginated endpoints.
+"""
+
+import base64
+import binascii
+import json
+
+from artushima.core.exceptions import DomainError
+
+
+def encode_cursor(position):
+    """
+    Encode the position of the last returned element (a dict of JSON-serializable values) into an opaque cursor.
+    """
+
+    position_json = json.dumps(position, separators=(",", ":"), default=str)
+
+    return base64.urlsafe_b64encode(position_json.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, *keys):
+    """
+    Decode the opaque cursor into the position of the last returned element.
+
+    The position must contain all the given keys, otherwise the cursor is not valid.
+    """
+
+    if cursor is None:
+        return None
+
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(cursor + padding).decode("utf-8"))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise DomainError("Invalid cursor!", "D0002", 400)
+
+    if not isinstance(position, dict) or any(key not in position for key in keys):
+        raise DomainError("Invalid cursor!", "D0002", 400)
+
+    return position
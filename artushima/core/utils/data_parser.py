@@ -16,3 +16,24 @@ def parse_iso_date(date_string):
         return date.fromisoformat(date_string)
     except ValueError:
         raise DomainError("Incorrect date format!", "D0001")
+
+
+def parse_page_limit(limit_string, default_limit, max_limit):
+    """
+    Parse the page size given as a request parameter.
+
+    If the page size is not given, the default one is returned.
+    """
+
+    if limit_string is None:
+        return default_limit
+
+    try:
+        limit = int(limit_string)
+    except ValueError:
+        raise DomainError("Incorrect page size!", "D0003", 400)
+
+    if limit < 1 or limit > max_limit:
+        raise DomainError("Incorrect page size!", "D0003", 400)
+
+    return limit
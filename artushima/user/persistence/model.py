@@ -2,7 +2,7 @@
 The module containing the data model for the user component.
 """
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from artushima.core.db_access import BaseEntity
@@ -21,6 +21,10 @@ class UserEntity(BaseEntity):
     opt_lock = Column("opt_lock", Integer, nullable=False)
     user_name = Column("user_name", String(255), nullable=False, unique=True)
     password_hash = Column("password_hash", String(255))
+    role_epoch = Column("role_epoch", Integer, nullable=False, default=0)
+    tokens_valid_after = Column("tokens_valid_after", DateTime, nullable=True)
+
+    __mapper_args__ = {"version_id_col": opt_lock}
 
     user_history_entries = relationship("UserHistoryEntity", back_populates="user")
     user_roles = relationship("UserRoleEntity", back_populates="user")
@@ -33,6 +37,9 @@ class UserHistoryEntity(BaseEntity):
     """
 
     __tablename__ = "user_history"
+    __table_args__ = (
+        Index("ix_user_history_user_id_id", "user_id", "id"),
+    )
 
     id = Column("id", Integer, primary_key=True)
     created_on = Column("created_on", DateTime, nullable=False)
@@ -42,6 +49,8 @@ class UserHistoryEntity(BaseEntity):
     message = Column("message", String(255), nullable=False)
     user_id = Column("user_id", Integer, ForeignKey("user.id"), nullable=False)
 
+    __mapper_args__ = {"version_id_col": opt_lock}
+
     user = relationship("UserEntity", back_populates="user_history_entries")
 
 
@@ -59,4 +68,6 @@ class UserRoleEntity(BaseEntity):
     user_id = Column("user_id", Integer, ForeignKey("user.id"), nullable=False)
     role_name = Column("role_name", String(255), nullable=False)
 
+    __mapper_args__ = {"version_id_col": opt_lock}
+
     user = relationship("UserEntity", back_populates="user_roles")
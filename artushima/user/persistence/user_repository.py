@@ -3,11 +3,23 @@ The repository for the user entity.
 """
 
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from artushima.core import db_access
 from artushima.core.exceptions import PersistenceError
-from artushima.user.persistence.model import UserEntity
+from artushima.user.persistence.model import (UserEntity, UserHistoryEntity,
+                                              UserRoleEntity)
+
+# The number of values bound in a single IN clause, kept below the limits of the database engines.
+IN_CLAUSE_CHUNK_SIZE = 500
+
+PROFILE_WITH_ROLES = "with_roles"
+PROFILE_WITH_HISTORY = "with_history"
+
+LOADING_PROFILES = {
+    PROFILE_WITH_ROLES: lambda: [joinedload(UserEntity.user_roles)],
+    PROFILE_WITH_HISTORY: lambda: [selectinload(UserEntity.user_history_entries)]
+}
 
 
 def persist(user):
@@ -21,45 +33,262 @@ def persist(user):
     try:
         session: Session = db_access.Session()
         session.add(user)
-        session.flush()
+        db_access.flush(session)
         return user
     except SQLAlchemyError as err:
         raise PersistenceError("Error on persisting user: {}".format(str(err))) from err
 
 
-def read_by_id(id):
+def persist_all(users):
     """
-    Read the user of the given ID.
+    Persist the given users in the database, flushing them together.
     """
 
+    if any(not isinstance(user, UserEntity) for user in users):
+        raise ValueError("The argument contains an element that is not UserEntity.")
+
     try:
         session: Session = db_access.Session()
-        return session.query(UserEntity).filter_by(id=id).first()
+        session.add_all(users)
+        db_access.flush(session)
+        return users
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on persisting users: {str(err)}") from err
+
+
+def read_by_id(id, profile=None):
+    """
+    Read the user of the given ID, loading the relationships of the given loading profile.
+    """
+
+    try:
+        session: Session = db_access.Session()
+        query = db_access.apply_loading_profile(session.query(UserEntity), LOADING_PROFILES, profile)
+        return query.filter_by(id=id).first()
     except SQLAlchemyError as err:
         raise PersistenceError(f"Error on reading user by the ID {id}: {str(err)}") from err
 
 
-def read_by_user_name(name):
+def read_by_user_name(name, profile=None):
     """
-    Read the user of the given name.
+    Read the user of the given name, loading the relationships of the given loading profile.
     """
 
     try:
         session: Session = db_access.Session()
-        return session.query(UserEntity).filter_by(user_name=name).first()
+        query = db_access.apply_loading_profile(session.query(UserEntity), LOADING_PROFILES, profile)
+        return query.filter_by(user_name=name).first()
     except SQLAlchemyError as err:
         raise PersistenceError(f"Error on reading user by the user name {name}: {str(err)}") from err
 
 
-def read_all():
+def read_auth_state_by_user_name(name):
     """
-    Read all users.
+    Read only the data needed to authenticate the user of the given name: the ID, the role epoch and the time,
+    before which all tokens of the user are revoked.
     """
 
-    session: Session = db_access.Session()
+    try:
+        session: Session = db_access.Session()
+        return session.query(UserEntity.id, UserEntity.role_epoch, UserEntity.tokens_valid_after) \
+            .filter_by(user_name=name) \
+            .first()
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on reading the auth state of the user {name}: {str(err)}") from err
+
+
+def read_all_identities():
+    """
+    Read the IDs and names of all users.
+
+    Only the selected columns are read -- no entities are created.
+    """
 
     try:
-        users = session.query(UserEntity).all()
-        return users
+        session: Session = db_access.Session()
+        return session.query(UserEntity.id, UserEntity.user_name).all()
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on reading the identities of all users: {str(err)}") from err
+
+
+def read_page(after_id, limit):
+    """
+    Read the IDs and names of at most the given number of users, ordered by ID and following the given ID.
+
+    Only the selected columns are read -- no entities are created.
+    """
+
+    try:
+        session: Session = db_access.Session()
+        query = session.query(UserEntity.id, UserEntity.user_name)
+
+        if after_id is not None:
+            query = query.filter(UserEntity.id > after_id)
+
+        return query.order_by(UserEntity.id).limit(limit).all()
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on reading a page of users: {str(err)}") from err
+
+
+def read_existing_user_names(user_names):
+    """
+    Read which of the given user names are already taken.
+    """
+
+    existing_user_names = set()
+
+    try:
+        session: Session = db_access.Session()
+
+        for chunk in _split_into_chunks(user_names):
+            rows = session.query(UserEntity.user_name).filter(UserEntity.user_name.in_(chunk)).all()
+            existing_user_names.update(row.user_name for row in rows)
+
+        return existing_user_names
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on reading existing user names: {str(err)}") from err
+
+
+def _split_into_chunks(values):
+    values = list(values)
+
+    for i in range(0, len(values), IN_CLAUSE_CHUNK_SIZE):
+        yield values[i:i + IN_CLAUSE_CHUNK_SIZE]
+
+
+def read_history_page(user_id, before_id, limit):
+    """
+    Read at most the given number of the history entries of the given user, newest first, preceding the entry of
+    the given ID.
+    """
+
+    try:
+        session: Session = db_access.Session()
+        query = session.query(
+            UserHistoryEntity.id,
+            UserHistoryEntity.created_on,
+            UserHistoryEntity.editor_name,
+            UserHistoryEntity.message
+        ).filter(UserHistoryEntity.user_id == user_id)
+
+        if before_id is not None:
+            query = query.filter(UserHistoryEntity.id < before_id)
+
+        return query.order_by(UserHistoryEntity.id.desc()).limit(limit).all()
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on reading a page of the history of the user {user_id}: {str(err)}") from err
+
+
+def read_ids_by_user_names(user_names):
+    """
+    Read the IDs of the users of the given names, as a dict mapping the user names to the IDs.
+    """
+
+    user_ids = dict()
+
+    try:
+        session: Session = db_access.Session()
+
+        for chunk in _split_into_chunks(user_names):
+            rows = session.query(UserEntity.user_name, UserEntity.id) \
+                .filter(UserEntity.user_name.in_(chunk)) \
+                .all()
+            user_ids.update((row.user_name, row.id) for row in rows)
+
+        return user_ids
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on reading the IDs of users: {str(err)}") from err
+
+
+def read_user_role_pairs(user_ids, role_names):
+    """
+    Read which of the given roles the given users have, as a set of (user ID, role name) pairs.
+    """
+
+    role_names = list(role_names)
+    user_role_pairs = set()
+
+    try:
+        session: Session = db_access.Session()
+
+        for chunk in _split_into_chunks(user_ids):
+            rows = session.query(UserRoleEntity.user_id, UserRoleEntity.role_name) \
+                .filter(UserRoleEntity.user_id.in_(chunk)) \
+                .filter(UserRoleEntity.role_name.in_(role_names)) \
+                .all()
+            user_role_pairs.update((row.user_id, row.role_name) for row in rows)
+
+        return user_role_pairs
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on reading the roles of users: {str(err)}") from err
+
+
+def insert_user_roles(user_roles):
+    """
+    Insert the given user roles (dicts of column values) with a single multi-row statement.
+    """
+
+    _insert_all(UserRoleEntity, user_roles, "user roles")
+
+
+def insert_user_history_entries(user_history_entries):
+    """
+    Insert the given user history entries (dicts of column values) with a single multi-row statement.
+    """
+
+    _insert_all(UserHistoryEntity, user_history_entries, "user history entries")
+
+
+def _insert_all(entity_class, rows, description):
+    if not rows:
+        return
+
+    try:
+        session: Session = db_access.Session()
+        session.execute(entity_class.__table__.insert(), rows)
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on inserting {description}: {str(err)}") from err
+
+
+def delete_user_roles(user_ids, role_names):
+    """
+    Delete the given roles of the given users, with a single statement per chunk of the users.
+    """
+
+    try:
+        session: Session = db_access.Session()
+        role_names = list(role_names)
+
+        for chunk in _split_into_chunks(user_ids):
+            session.query(UserRoleEntity) \
+                .filter(UserRoleEntity.user_id.in_(chunk)) \
+                .filter(UserRoleEntity.role_name.in_(role_names)) \
+                .delete(synchronize_session=False)
+    except SQLAlchemyError as err:
+        raise PersistenceError(f"Error on deleting the roles of users: {str(err)}") from err
+
+
+def increment_role_epochs(user_ids, timestamp):
+    """
+    Increment the role epochs of the given users with a single statement per chunk of the users, marking them as
+    modified on the given time.
+
+    The statement bypasses the ORM, so it increments the versions of the users explicitly.
+    """
+
+    try:
+        session: Session = db_access.Session()
+
+        for chunk in _split_into_chunks(user_ids):
+            session.query(UserEntity) \
+                .filter(UserEntity.id.in_(chunk)) \
+                .update(
+                    {
+                        UserEntity.role_epoch: UserEntity.role_epoch + 1,
+                        UserEntity.modified_on: timestamp,
+                        UserEntity.opt_lock: UserEntity.opt_lock + 1
+                    },
+                    synchronize_session=False
+                )
     except SQLAlchemyError as err:
-        raise PersistenceError(f"Error on reading all users: {str(err)}") from err
+        raise PersistenceError(f"Error on incrementing the role epochs of users: {str(err)}") from err
@@ -15,3 +15,43 @@ ALL_ROLES = [
     ROLE_START_CAMPAIGN,
     ROLE_CREATE_SESSION_SUMMARY,
 ]
+
+# Each role is assigned a bit, so that a set of roles can be represented as an integer mask.
+# New roles have to be appended to ALL_ROLES to keep the bits of the existing roles unchanged.
+ROLE_BITS = {role: 1 << position for position, role in enumerate(ALL_ROLES)}
+
+
+def get_role_mask(role_names):
+    """
+    Compile the given role names into an integer mask.
+
+    Roles unknown to the application are ignored.
+    """
+
+    mask = 0
+
+    for role_name in role_names:
+        mask |= ROLE_BITS.get(role_name, 0)
+
+    return mask
+
+
+def get_required_role_mask(role_names):
+    """
+    Compile the given required role names into an integer mask.
+
+    Unlike 'get_role_mask', this raises an error on a role unknown to the application, as such a requirement
+    could never be met.
+    """
+
+    if role_names is None:
+        return 0
+
+    for role_name in role_names:
+        if role_name not in ROLE_BITS:
+            raise ValueError(f"Unknown role: {role_name}")
+
+    return get_role_mask(role_names)
+
+
+ALL_ROLES_MASK = get_role_mask(ALL_ROLES)
@@ -0,0 +1,38 @@
+"""
+The module notifying other components about changes of the users.
+
+Components that keep data derived from users (e.g. caches) can subscribe to be notified when a user changes.
+"""
+
+from artushima.core import db_access
+
+_user_changed_listeners = list()
+
+
+def subscribe_user_changed(listener):
+    """
+    Register a function that will be called with the user name each time a user changes.
+    """
+
+    if listener not in _user_changed_listeners:
+        _user_changed_listeners.append(listener)
+
+
+def publish_user_changed(user_name):
+    """
+    Notify all subscribed listeners that the user of the given name has changed.
+    """
+
+    for listener in _user_changed_listeners:
+        listener(user_name)
+
+
+def publish_user_changed_on_commit(user_name):
+    """
+    Notify all subscribed listeners that the user of the given name has changed, once the current transaction is
+    committed.
+
+    Otherwise a request running before the commit could read the old data of the user and cache it again.
+    """
+
+    db_access.run_after_commit(lambda: publish_user_changed(user_name))
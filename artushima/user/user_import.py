@@ -0,0 +1,108 @@
+"""
+The module parsing the files with users to import.
+
+Two formats are accepted:
+    CSV -- with the header 'userName,password,roles', the roles separated with semicolons,
+    JSON lines -- one object per line: {"userName": "<userName>", "password": "<password>", "roles": [...]}.
+
+Each parsed row is a dict accepted by 'user_service.import_users', None, if the row is malformed, or BLANK_ROW for
+a blank JSON line, so that the row numbers match the line numbers. The repeated roles of a row are given only once.
+"""
+
+import csv
+import io
+import json
+
+from artushima.core.exceptions import DomainError
+
+FORMAT_CSV = "csv"
+FORMAT_JSON_LINES = "jsonl"
+
+ROLES_SEPARATOR = ";"
+
+BLANK_ROW = "blank"
+
+
+def parse(text, file_format):
+    """
+    Parse the rows of the given text in the given format.
+    """
+
+    if file_format == FORMAT_CSV:
+        return parse_csv(text)
+
+    if file_format == FORMAT_JSON_LINES:
+        return parse_json_lines(text)
+
+    raise ValueError(f"Unknown import format: {file_format}")
+
+
+def parse_csv(text):
+    """
+    Parse the rows of the given CSV text. If the text is not a valid CSV, a domain error is raised.
+    """
+
+    rows = list()
+
+    try:
+        for record in csv.DictReader(io.StringIO(text)):
+            roles = record.get("roles")
+
+            rows.append({
+                "user_name": record.get("userName"),
+                "password": record.get("password"),
+                "roles": _split_roles(roles) if roles else None
+            })
+    except csv.Error as err:
+        raise DomainError(f"Malformed CSV: {str(err)}", "D0006", 400) from err
+
+    return rows
+
+
+def _split_roles(roles):
+    return _deduplicate([role.strip() for role in roles.split(ROLES_SEPARATOR) if role.strip()])
+
+
+def parse_json_lines(text):
+    """
+    Parse the rows of the given JSON lines text, one row per line. Blank lines are given as BLANK_ROW.
+    """
+
+    rows = list()
+
+    for line in text.splitlines():
+        if not line.strip():
+            rows.append(BLANK_ROW)
+            continue
+
+        try:
+            record = json.loads(line)
+        except ValueError:
+            rows.append(None)
+            continue
+
+        if not isinstance(record, dict):
+            rows.append(None)
+            continue
+
+        rows.append({
+            "user_name": record.get("userName"),
+            "password": record.get("password"),
+            "roles": _deduplicate(record.get("roles"))
+        })
+
+    return rows
+
+
+def _deduplicate(roles):
+    # The roles of the JSON lines are validated later, so they might be anything here, e.g. unhashable values.
+    if not isinstance(roles, list):
+        return roles
+
+    unique_roles = list()
+
+    for role in roles:
+        if role not in unique_roles:
+            unique_roles.append(role)
+
+    return unique_roles
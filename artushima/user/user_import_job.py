@@ -0,0 +1,68 @@
+"""
+The job importing users from a file in a single transaction.
+
+Usage:
+    python -m artushima.user.user_import_job <file> [--format csv|jsonl]
+
+If the format is not given, it is guessed from the file extension. The rows with errors are reported and skipped.
+"""
+
+import argparse
+
+import artushima.campaign.persistence.model as campaign_model
+from artushima.commons import logger
+from artushima.core import db_access, password_hashing, properties
+from artushima.user import user_import, user_service
+
+EDITOR_NAME = "SYSTEM"
+
+
+def run(file_path, file_format=None):
+    """
+    Import the users from the given file and commit them.
+    """
+
+    # Making sure that the campaign entity, referenced by the user entity, has been initialized.
+    assert campaign_model is not None
+
+    if file_format is None:
+        file_format = user_import.FORMAT_CSV if file_path.lower().endswith(".csv") else user_import.FORMAT_JSON_LINES
+
+    with open(file_path, encoding="utf-8", newline="") as file:
+        rows = user_import.parse(file.read(), file_format)
+
+    db_session = db_access.Session()
+
+    try:
+        result = user_service.import_users(EDITOR_NAME, rows)
+        db_session.commit()
+
+    except Exception as err:
+        db_session.rollback()
+        logger.log_error(f"Error on importing users: {str(err)}")
+        raise err
+
+    finally:
+        db_session.close()
+
+    logger.log_info(f"Users imported from {file_path}: {result['created']}, rows with errors: {len(result['errors'])}.")
+
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import users from a CSV or JSON lines file.")
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=[user_import.FORMAT_CSV, user_import.FORMAT_JSON_LINES])
+    args = parser.parse_args()
+
+    properties.init()
+    db_access.init()
+    password_hashing.init()
+
+    import_result = run(args.file, args.format)
+
+    for error in import_result["errors"]:
+        print(f"Row {error['row']}: {error['message']}")
+
+    print(f"Created users: {import_result['created']}")
@@ -7,8 +7,10 @@ from datetime import datetime
 from artushima.core.exceptions import BusinessError
 from artushima.core.utils.argument_validator import (validate_list_arg,
                                                      validate_str_arg)
+from artushima.user import user_events
 from artushima.user.persistence import user_repository
-from artushima.user.persistence.model import UserHistoryEntity, UserRoleEntity
+from artushima.user.persistence.user_repository import PROFILE_WITH_ROLES
+from artushima.user.roles import ALL_ROLES
 
 
 def get_user_roles(user_name):
@@ -18,7 +20,7 @@ def get_user_roles(user_name):
 
     validate_str_arg(user_name, "User name")
 
-    user = user_repository.read_by_user_name(user_name)
+    user = user_repository.read_by_user_name(user_name, PROFILE_WITH_ROLES)
 
     if not user:
         raise BusinessError(f"User {user_name} does not exist!")
@@ -26,39 +28,107 @@ def get_user_roles(user_name):
     return [role.role_name for role in user.user_roles]
 
 
-def grant_roles(editor_name, user_name, roles):
+def grant_roles_to_users(editor_name, user_names, roles):
     """
-    Grant the roles to the given user.
+    Grant the roles to all given users at once. Return the number of the granted roles.
+
+    The roles that the users already have are skipped. The missing ones, together with the history entries, are
+    inserted with multi-row statements.
     """
 
     validate_str_arg(editor_name, "Editor name")
-    validate_str_arg(user_name, "User name")
+    validate_list_arg(user_names, "User names")
     validate_list_arg(roles, "Roles")
 
-    user = user_repository.read_by_user_name(user_name)
+    if not user_names or not roles:
+        return 0
 
-    if not user:
-        raise BusinessError(f"User {user_name} does not exist!")
+    _validate_roles(roles)
+
+    user_ids = _read_user_ids(user_names)
+    existing_pairs = user_repository.read_user_role_pairs(user_ids.values(), roles)
+
+    granted_pairs = [
+        (user_name, role)
+        for user_name in dict.fromkeys(user_names)
+        for role in dict.fromkeys(roles)
+        if (user_ids[user_name], role) not in existing_pairs
+    ]
+
+    timestamp = datetime.utcnow()
+
+    user_repository.insert_user_roles([
+        _create_row(timestamp, user_id=user_ids[user_name], role_name=role)
+        for user_name, role in granted_pairs
+    ])
+    _apply_role_changes(editor_name, user_ids, granted_pairs, "Przyznano rolę '{}'.", timestamp)
+
+    return len(granted_pairs)
+
+
+def revoke_roles_from_users(editor_name, user_names, roles):
+    """
+    Revoke the roles from all given users at once. Return the number of the revoked roles.
+    """
+
+    validate_str_arg(editor_name, "Editor name")
+    validate_list_arg(user_names, "User names")
+    validate_list_arg(roles, "Roles")
+
+    if not user_names or not roles:
+        return 0
 
-    previous_user_roles = [role.role_name for role in user.user_roles]
+    _validate_roles(roles)
+
+    user_ids = _read_user_ids(user_names)
+    existing_pairs = user_repository.read_user_role_pairs(user_ids.values(), roles)
+
+    user_names_by_id = {user_id: user_name for user_name, user_id in user_ids.items()}
+    revoked_pairs = [(user_names_by_id[user_id], role) for user_id, role in sorted(existing_pairs)]
 
     timestamp = datetime.utcnow()
 
-    for role in roles:
-        if role not in previous_user_roles:
-            new_role = UserRoleEntity()
-            new_role.created_on = timestamp
-            new_role.modified_on = timestamp
-            new_role.opt_lock = 0
-            new_role.role_name = role
-            new_role.user = user
-
-            user_history_entry = UserHistoryEntity()
-            user_history_entry.created_on = timestamp
-            user_history_entry.modified_on = timestamp
-            user_history_entry.opt_lock = 0
-            user_history_entry.editor_name = editor_name
-            user_history_entry.message = f"Przyznano rolę '{role}'."
-            user_history_entry.user = user
-
-    user_repository.persist(user)
+    if revoked_pairs:
+        user_repository.delete_user_roles(user_ids.values(), roles)
+    _apply_role_changes(editor_name, user_ids, revoked_pairs, "Odebrano rolę '{}'.", timestamp)
+
+    return len(revoked_pairs)
+
+
+def _validate_roles(roles):
+    unknown_roles = [role for role in dict.fromkeys(roles) if role not in ALL_ROLES]
+
+    if unknown_roles:
+        raise BusinessError(f"Roles {', '.join(unknown_roles)} do not exist!")
+
+
+def _read_user_ids(user_names):
+    user_ids = user_repository.read_ids_by_user_names(set(user_names))
+
+    missing_user_names = [user_name for user_name in user_names if user_name not in user_ids]
+
+    if missing_user_names:
+        raise BusinessError(f"Users {', '.join(missing_user_names)} do not exist!")
+
+    return user_ids
+
+
+def _apply_role_changes(editor_name, user_ids, changed_pairs, message_template, timestamp):
+    user_repository.insert_user_history_entries([
+        _create_row(timestamp, user_id=user_ids[user_name], editor_name=editor_name,
+                    message=message_template.format(role))
+        for user_name, role in changed_pairs
+    ])
+
+    changed_user_names = list(dict.fromkeys(user_name for user_name, _ in changed_pairs))
+
+    if changed_user_names:
+        # Invalidating the roles embedded in the tokens issued so far.
+        user_repository.increment_role_epochs([user_ids[user_name] for user_name in changed_user_names], timestamp)
+
+    for user_name in changed_user_names:
+        user_events.publish_user_changed_on_commit(user_name)
+
+
+def _create_row(timestamp, **values):
+    return dict(created_on=timestamp, modified_on=timestamp, opt_lock=0, **values)
@@ -4,34 +4,152 @@ The service for management of users.
 
 from datetime import datetime
 
-from werkzeug import security
-
+from artushima.core import db_access, password_hashing, properties
+from artushima.core.cache import TTLCache
+from artushima.core.prefix_index import PrefixIndex
 from artushima.core.exceptions import BusinessError
 from artushima.core.utils.argument_validator import (
     validate_list_arg_nullable, validate_str_arg, validate_int_arg)
+from artushima.user import user_events, user_import
 from artushima.user.persistence import user_repository
+from artushima.user.persistence.user_repository import PROFILE_WITH_ROLES
 from artushima.user.persistence.model import (UserEntity, UserHistoryEntity,
                                               UserRoleEntity)
+from artushima.user.roles import ALL_ROLES
 
+DEFAULT_USER_CACHE_SIZE = 1024
+DEFAULT_USER_CACHE_TTL = 60
 
-def get_user_by_id(id):
+IMPORT_BATCH_SIZE = 500
+
+user_cache = None
+user_search_index = None
+
+
+def init_user_cache():
     """
-    Get the user data by his/her ID.
+    Initialize the user identity cache, which keeps the identities of the users by their IDs and names.
+
+    Until the cache is initialized (e.g. in tests), the users are always read from the database. The entries of
+    a user are evicted each time the user changes.
     """
 
-    validate_int_arg(id, "ID użytkownika")
+    global user_cache
+
+    cache_size = properties.get_user_cache_size()
+    cache_ttl = properties.get_user_cache_ttl()
+
+    user_cache = TTLCache(
+        int(cache_size) if cache_size else DEFAULT_USER_CACHE_SIZE,
+        int(cache_ttl) if cache_ttl else DEFAULT_USER_CACHE_TTL
+    )
+
+
+def get_user_cache_stats():
+    """
+    Get the statistics of the user identity cache or None, if the cache is not initialized.
+    """
+
+    if user_cache is None:
+        return None
+
+    return user_cache.get_stats()
+
+
+def _evict_user_from_user_cache(user_name):
+    if user_cache is not None:
+        user_cache.evict_where(lambda key, user: user["user_name"] == user_name)
+
+
+user_events.subscribe_user_changed(_evict_user_from_user_cache)
+
+
+def _get_cached_user(key, read_user):
+    if user_cache is not None:
+        user_data = user_cache.get(key)
+
+        if user_data is not None:
+            return dict(user_data)
 
-    user = user_repository.read_by_id(id)
+    user = read_user()
 
     if user is None:
         return None
 
-    return _map_user_entity_to_dict(user)
+    user_data = _map_user_entity_to_identity(user)
+
+    if user_cache is not None:
+        user_cache.put(("id", user_data["id"]), user_data)
+        user_cache.put(("user_name", user_data["user_name"]), user_data)
+
+    return dict(user_data)
+
+
+def init_user_search_index():
+    """
+    Build the index of the user names for the user search from the database.
+
+    The index is then kept current by the functions creating users, once their transactions are committed. If it
+    is not built on startup, it is built on the first search.
+    """
+
+    global user_search_index
+
+    user_search_index = PrefixIndex((user.user_name, user.id) for user in user_repository.read_all_identities())
+
+
+def _add_users_to_search_index(users):
+    identities = [(user.user_name, user.id) for user in users]
+
+    def add_identities():
+        if user_search_index is not None:
+            for user_name, user_id in identities:
+                user_search_index.add(user_name, user_id)
+
+    db_access.run_after_commit(add_identities)
+
+
+def search_users(prefix, limit):
+    """
+    Get at most the given number of users, which names start with the given prefix (case-insensitively), ordered
+    by the names.
+
+    The users are found in the in-memory index, without querying the database.
+    """
+
+    validate_int_arg(limit, "Rozmiar strony")
+
+    if user_search_index is None:
+        init_user_search_index()
+
+    return [{"id": user_id, "user_name": user_name} for user_name, user_id in user_search_index.search(prefix, limit)]
+
+
+def get_user_by_id(id):
+    """
+    Get the identity of the user (ID, name, role epoch and the time of the tokens revocation) by his/her ID.
+    """
+
+    validate_int_arg(id, "ID użytkownika")
+
+    return _get_cached_user(("id", id), lambda: user_repository.read_by_id(id))
 
 
 def get_user_by_user_name(name):
     """
-    Get the user data by his/her user name.
+    Get the identity of the user (ID, name, role epoch and the time of the tokens revocation) by his/her user name.
+    """
+
+    validate_str_arg(name, "Name")
+
+    return _get_cached_user(("user_name", name), lambda: user_repository.read_by_user_name(name))
+
+
+def get_user_credentials(name):
+    """
+    Get the data needed to log the user of the given name in, including the password hash.
+
+    The data is always read from the database, so that the password hash is never cached.
     """
 
     validate_str_arg(name, "Name")
@@ -41,22 +159,171 @@ def get_user_by_user_name(name):
     if user is None:
         return None
 
-    return _map_user_entity_to_dict(user)
+    return {
+        "id": user.id,
+        "user_name": user.user_name,
+        "password_hash": user.password_hash,
+        "role_epoch": user.role_epoch
+    }
 
 
-def get_all_users():
+def get_user_with_roles_by_user_name(name):
     """
-    Get all users.
+    Get the user data together with the names of his/her roles by his/her user name.
     """
 
-    users = user_repository.read_all()
+    validate_str_arg(name, "Name")
+
+    user = user_repository.read_by_user_name(name, PROFILE_WITH_ROLES)
 
-    result = list()
+    if user is None:
+        return None
 
-    for user in users:
-        result.append(_map_user_entity_to_dict(user))
+    user_data = _map_user_entity_to_dict(user)
+    user_data["roles"] = [role.role_name for role in user.user_roles]
 
-    return result
+    return user_data
+
+
+def get_user_auth_state(name):
+    """
+    Get the data needed to authenticate the user of the given name.
+
+    The role epoch changes each time the roles of the user change. The tokens issued before 'tokens_valid_after'
+    are revoked.
+    """
+
+    validate_str_arg(name, "Name")
+
+    user = user_repository.read_auth_state_by_user_name(name)
+
+    if user is None:
+        return None
+
+    return {
+        "id": user.id,
+        "role_epoch": user.role_epoch,
+        "tokens_valid_after": user.tokens_valid_after
+    }
+
+
+def change_password_hash(user_name, password_hash):
+    """
+    Replace the password hash of the given user, e.g. with one generated with the current hashing parameters.
+    """
+
+    validate_str_arg(user_name, "Nazwa użytkownika")
+    validate_str_arg(password_hash, "Hash hasła")
+
+    user = user_repository.read_by_user_name(user_name)
+
+    if user is None:
+        raise BusinessError(f"Użytkownik {user_name} nie istnieje!")
+
+    user.password_hash = password_hash
+    user.modified_on = datetime.utcnow()
+
+    user_repository.persist(user)
+    user_events.publish_user_changed_on_commit(user_name)
+
+
+def revoke_tokens(editor_name, user_id):
+    """
+    Revoke all authentication tokens issued to the user of the given ID so far.
+    """
+
+    validate_str_arg(editor_name, "Nazwa użytkownika wprowadzającego zmianę")
+    validate_int_arg(user_id, "ID użytkownika")
+
+    user = user_repository.read_by_id(user_id)
+
+    if user is None:
+        raise BusinessError(f"Użytkownik o ID {user_id} nie istnieje!")
+
+    # The token's 'iat' claim has the resolution of one second.
+    timestamp = datetime.utcnow().replace(microsecond=0)
+
+    user.tokens_valid_after = timestamp
+    user.modified_on = timestamp
+
+    user_history_entry = UserHistoryEntity()
+    user_history_entry.created_on = timestamp
+    user_history_entry.modified_on = timestamp
+    user_history_entry.opt_lock = 0
+    user_history_entry.editor_name = editor_name
+    user_history_entry.message = "Unieważniono wszystkie sesje użytkownika."
+    user_history_entry.user = user
+
+    user_repository.persist(user)
+    user_events.publish_user_changed_on_commit(user.user_name)
+
+
+def get_users_page(after_id, limit):
+    """
+    Get the IDs and names of at most the given number of users following the user of the given ID.
+
+    The ID of the last returned user is given as 'last_id' if there might be more users to read, otherwise it is
+    None.
+    """
+
+    if after_id is not None:
+        validate_int_arg(after_id, "ID użytkownika")
+    validate_int_arg(limit, "Rozmiar strony")
+
+    # Reading one user more to know if there is a next page.
+    users = user_repository.read_page(after_id, limit + 1)
+    has_next_page = len(users) > limit
+    users = users[:limit]
+
+    return {
+        "users": [{"id": user.id, "user_name": user.user_name} for user in users],
+        "last_id": users[-1].id if has_next_page else None
+    }
+
+
+def get_user_history_page(user_id, before_id, limit):
+    """
+    Get at most the given number of the history entries of the given user, newest first, preceding the entry of
+    the given ID.
+
+    The ID of the last returned entry is given as 'last_id' if there might be more entries to read, otherwise it
+    is None.
+    """
+
+    validate_int_arg(user_id, "ID użytkownika")
+    if before_id is not None:
+        validate_int_arg(before_id, "ID wpisu historii")
+    validate_int_arg(limit, "Rozmiar strony")
+
+    if get_user_by_id(user_id) is None:
+        raise BusinessError(f"Użytkownik o ID {user_id} nie istnieje!")
+
+    # Reading one entry more to know if there is a next page.
+    entries = user_repository.read_history_page(user_id, before_id, limit + 1)
+    has_next_page = len(entries) > limit
+    entries = entries[:limit]
+
+    return {
+        "entries": [
+            {
+                "id": entry.id,
+                "created_on": entry.created_on,
+                "editor_name": entry.editor_name,
+                "message": entry.message
+            }
+            for entry in entries
+        ],
+        "last_id": entries[-1].id if has_next_page else None
+    }
+
+
+def _map_user_entity_to_identity(user):
+    return {
+        "id": user.id,
+        "user_name": user.user_name,
+        "role_epoch": user.role_epoch,
+        "tokens_valid_after": user.tokens_valid_after
+    }
 
 
 def _map_user_entity_to_dict(user):
@@ -66,7 +333,9 @@ def _map_user_entity_to_dict(user):
         "created_on": user.created_on,
         "modified_on": user.modified_on,
         "opt_lock": user.opt_lock,
-        "password_hash": user.password_hash
+        "password_hash": user.password_hash,
+        "role_epoch": user.role_epoch,
+        "tokens_valid_after": user.tokens_valid_after
     }
 
 
@@ -84,20 +353,124 @@ def create_user(editor_name, user_name, password, roles=None):
         raise BusinessError("Użytkownik {} już istnieje!".format(user_name))
 
     timestamp = datetime.utcnow()
-    user = _create_user_entity(user_name, password, timestamp)
+    user = _create_user_entity(user_name, password_hashing.generate_password_hash(password), timestamp)
     _grant_roles(user, roles, timestamp)
     _create_and_assing_history_entry_creation(user, editor_name, timestamp)
 
     user_repository.persist(user)
+    _add_users_to_search_index([user])
+    user_events.publish_user_changed_on_commit(user_name)
+
+
+def import_users(editor_name, rows):
+    """
+    Create many users at once in the current transaction.
+
+    Each row is a dict with the keys 'user_name', 'password' and optionally 'roles', None if the row could not
+    be parsed, or 'user_import.BLANK_ROW', which is skipped silently, but still counted. Invalid rows are skipped and
+    reported as errors with their numbers (starting from 1) without stopping the import of the other rows.
+
+    The users are flushed in batches to obtain their IDs, then their roles and history entries are inserted with
+    multi-row statements.
+    """
+
+    validate_str_arg(editor_name, "Nazwa użytkownika wprowadzającego zmianę")
+
+    user_names = [row.get("user_name") for row in rows if isinstance(row, dict)]
+    existing_user_names = user_repository.read_existing_user_names(
+        {user_name for user_name in user_names if isinstance(user_name, str)}
+    )
+
+    errors = list()
+    valid_rows = list()
+    imported_user_names = set()
+
+    for row_number, row in enumerate(rows, start=1):
+        if row == user_import.BLANK_ROW:
+            continue
+
+        error = _validate_import_row(row, existing_user_names, imported_user_names)
+
+        if error is not None:
+            errors.append({"row": row_number, "message": error})
+            continue
+
+        imported_user_names.add(row["user_name"])
+        valid_rows.append(row)
+
+    password_hashes = password_hashing.generate_password_hashes([row["password"] for row in valid_rows])
+
+    timestamp = datetime.utcnow()
+    users = list()
+
+    for row, password_hash in zip(valid_rows, password_hashes):
+        users.append(_create_user_entity(row["user_name"], password_hash, timestamp))
+
+    for i in range(0, len(users), IMPORT_BATCH_SIZE):
+        batch = users[i:i + IMPORT_BATCH_SIZE]
+        batch_rows = valid_rows[i:i + IMPORT_BATCH_SIZE]
+
+        user_repository.persist_all(batch)
+        user_repository.insert_user_roles([
+            _create_import_row(timestamp, user_id=user.id, role_name=role_name)
+            for user, row in zip(batch, batch_rows) for role_name in row.get("roles") or []
+        ])
+        user_repository.insert_user_history_entries([
+            _create_import_row(timestamp, user_id=user.id, editor_name=editor_name,
+                               message="Użytkownik {} został utworzony.".format(user.user_name))
+            for user in batch
+        ])
+
+    _add_users_to_search_index(users)
+
+    return {
+        "created": len(users),
+        "errors": errors
+    }
+
+
+def _create_import_row(timestamp, **values):
+    return dict(created_on=timestamp, modified_on=timestamp, opt_lock=0, **values)
+
+
+def _validate_import_row(row, existing_user_names, imported_user_names):
+    if row is None:
+        return "Niepoprawny format wiersza."
+
+    user_name = row.get("user_name")
+    password = row.get("password")
+    roles = row.get("roles")
+
+    if not isinstance(user_name, str) or not user_name:
+        return "Brakująca nazwa użytkownika."
+
+    if not isinstance(password, str) or not password:
+        return "Brakujące hasło."
+
+    if roles is not None and not isinstance(roles, list):
+        return "Niepoprawna lista ról."
+
+    for role in roles or []:
+        if role not in ALL_ROLES:
+            return f"Nieznana rola: {role}."
+
+    if user_name in existing_user_names:
+        return f"Użytkownik {user_name} już istnieje!"
+
+    if user_name in imported_user_names:
+        return f"Użytkownik {user_name} występuje w imporcie więcej niż raz."
+
+    return None
 
 
-def _create_user_entity(user_name, password, timestamp):
+def _create_user_entity(user_name, password_hash, timestamp):
     user = UserEntity()
     user.user_name = user_name
-    user.password_hash = security.generate_password_hash(password)
+    user.password_hash = password_hash
     user.created_on = timestamp
     user.modified_on = timestamp
     user.opt_lock = 0
+    user.role_epoch = 0
 
     return user
 
@@ -4,10 +4,13 @@ The module defining the edpoint for the authentication web-methods.
 
 import flask
 
-from artushima.auth import auth_service
+from artushima.auth import auth_service, login_throttle
+from artushima.auth.auth_decorators import allow_authorized, get_principal
 from artushima.commons import logger
 from artushima.core import db_access
-from artushima.core.exceptions import BusinessError
+from artushima.core.error_codes import get_error_message
+from artushima.core.exceptions import BusinessError, DomainError
+from artushima.user import user_service
 
 AUTH_BLUEPRINT = flask.Blueprint("auth_endpoint", __name__, url_prefix="/api/auth")
 
@@ -43,6 +46,18 @@ def log_in():
             "message": "Brakujące hasło."
         }), 200
 
+    if not isinstance(user_name, str) or not isinstance(password, str):
+        return flask.jsonify({
+            "status": "failure",
+            "message": "Niepoprawna nazwa użytkownika lub hasło."
+        }), 400
+
+    if not login_throttle.is_attempt_allowed(flask.request.remote_addr, user_name):
+        return flask.jsonify({
+            "status": "failure",
+            "message": get_error_message("AC003")
+        }), 429
+
     db_session = db_access.Session()
 
     try:
@@ -55,6 +70,14 @@ def log_in():
             "message": "Błąd autentykacji"
         }), 401
 
+    except DomainError as err:
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": get_error_message(err.error_code)
+        }), err.http_status
+
     except Exception as err:
         logger.log_error(str(err))
         db_session.rollback()
@@ -117,3 +140,44 @@ def log_out():
         "status": "success",
         "message": ""
     }), 200
+
+
+@AUTH_BLUEPRINT.route("/logout_all", methods=["POST"])
+@allow_authorized
+def log_out_all():
+    """
+    Revoke all tokens of the logged in user, i.e. log him/her out of all sessions.
+    """
+
+    principal = get_principal()
+
+    db_session = db_access.Session()
+
+    try:
+        user_service.revoke_tokens(principal["user_name"], principal["user_id"])
+        db_session.commit()
+
+    except DomainError as err:
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": get_error_message(err.error_code)
+        }), err.http_status
+
+    except Exception as err:
+        logger.log_error(str(err))
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": "Błąd aplikacji"
+        }), 500
+
+    finally:
+        db_session.close()
+
+    return flask.jsonify({
+        "status": "success",
+        "message": ""
+    }), 200
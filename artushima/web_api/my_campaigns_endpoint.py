@@ -6,19 +6,28 @@ game master.
 from datetime import date
 
 import flask
-from artushima.auth import auth_service
-from artushima.auth.auth_decorators import allow_authorized_with_roles
-from artushima.campaign import campaign_mapper, campaign_service
+from artushima.auth.auth_decorators import (allow_authorized_with_roles,
+                                            get_principal)
+from artushima.campaign import (campaign_mapper, campaign_service,
+                                 timeline_export)
 from artushima.commons import logger
 from artushima.core import db_access
 from artushima.core.error_codes import get_error_message
 from artushima.core.exceptions import BusinessError, DomainError
+from artushima.core.utils.cursor import decode_cursor, encode_cursor
+from artushima.core.utils.data_parser import parse_page_limit
 from artushima.user.roles import (ROLE_CREATE_SESSION_SUMMARY,
                                   ROLE_SHOW_OWNED_CAMPAIGNS,
                                   ROLE_START_CAMPAIGN)
 
 MY_CAMPAIGNS_BLUEPRINT = flask.Blueprint("my_campaigns_endpoint", __name__, url_prefix="/api/my_campaigns")
 
+DEFAULT_TIMELINE_PAGE_LIMIT = 50
+MAX_TIMELINE_PAGE_LIMIT = 500
+
+DEFAULT_SEARCH_PAGE_LIMIT = 20
+MAX_SEARCH_PAGE_LIMIT = 100
+
 
 @MY_CAMPAIGNS_BLUEPRINT.route("/list", methods=["GET"])
 @allow_authorized_with_roles([ROLE_SHOW_OWNED_CAMPAIGNS])
@@ -27,16 +36,12 @@ def my_campaigns_list():
     Get the list of campaigns belonging to the currently logged in user.
     """
 
-    user_id = None
-
-    if flask.request.headers.get("Authorization") is not None:
-        token = flask.request.headers.get("Authorization")
-        user_id = auth_service.get_user_id(token)
+    user_id = get_principal()["user_id"]
 
     db_session = db_access.Session()
 
     try:
-        campaigns = campaign_service.get_campaigns_by_gm_id(user_id)
+        campaigns = campaign_service.get_campaign_names_by_gm_id(user_id)
 
         result = list()
 
@@ -87,10 +92,10 @@ def my_campaigns_start():
     """
 
     # The decorator has assured that the user had been logged in.
-    # No need for checking the existence of the header at this point.
-    token = flask.request.headers.get("Authorization")
-    user_id = auth_service.get_user_id(token)
-    user_name = auth_service.get_user_name(token)
+    # No need for checking the existence of the principal at this point.
+    principal = get_principal()
+    user_id = principal["user_id"]
+    user_name = principal["user_name"]
 
     # If the request doesn't contain JSON, it is a bad request.
     if not flask.request.is_json:
@@ -135,24 +140,218 @@ def my_campaigns_details(campaign_id):
     """
 
     # The decorator has assured that the user had been logged in.
-    # No need for checking the existence of the header at this point.
-    token = flask.request.headers.get("Authorization")
-    user_id = auth_service.get_user_id(token)
+    # No need for checking the existence of the principal at this point.
+    user_id = get_principal()["user_id"]
 
     # Create the DB session.
     db_session = db_access.Session()
 
+    try:
+        # Only the users who are somehow related to the campaign should be able to access its data.
+        campaign_details = campaign_service.get_campaign_details_for_user(user_id, campaign_id)
+
+        if campaign_details is None:
+            return _create_failure(f"Nie masz dostępu do danych kampani o ID {str(campaign_id)}."), 403
+
+        return flask.jsonify({
+            "status": "success",
+            "message": "",
+            "campaignDetails": campaign_details
+        }), 200
+
+    except BusinessError as err:
+        db_session.rollback()
+
+        return _create_failure(err.message), 200
+
+    except Exception as err:
+        db_session.rollback()
+        logger.log_error(str(err))
+
+        return _create_failure("Błąd aplikacji."), 500
+
+    finally:
+        db_session.close()
+
+
+@MY_CAMPAIGNS_BLUEPRINT.route("/<int:campaign_id>/timeline", methods=["GET"])
+@allow_authorized_with_roles([ROLE_SHOW_OWNED_CAMPAIGNS])
+def my_campaigns_timeline(campaign_id):
+    """
+    Get a page of the timeline of a campaign, ordered by the session dates. The summary texts are not included.
+
+    Accepts the optional query parameters:
+        limit -- the maximal number of entries on the page (default: 50, at most 500),
+        after -- the cursor returned as 'nextCursor' with the previous page.
+
+    The 'nextCursor' is null on the last page.
+    """
+
+    user_id = get_principal()["user_id"]
+    db_session = db_access.Session()
+
     try:
         # Only the users who are somehow related to the campaign should be able to access its data.
         if not campaign_service.check_if_user_related_to_campaign(user_id, campaign_id):
             return _create_failure(f"Nie masz dostępu do danych kampani o ID {str(campaign_id)}."), 403
 
-        campaign_details = campaign_service.get_campaign_details(campaign_id)
+        limit = parse_page_limit(flask.request.args.get("limit"), DEFAULT_TIMELINE_PAGE_LIMIT, MAX_TIMELINE_PAGE_LIMIT)
+        after = _decode_timeline_cursor(flask.request.args.get("after"))
+        timeline_page = campaign_service.get_timeline_page(campaign_id, after, limit)
+
+        result = list()
+
+        for entry in timeline_page["entries"]:
+            result.append({
+                "id": entry["id"],
+                "title": entry["title"],
+                "sessionDate": entry["sessionDate"].isoformat()
+            })
+
+        next_cursor = None
+        if timeline_page["last"] is not None:
+            next_cursor = encode_cursor({
+                "sessionDate": timeline_page["last"]["sessionDate"].isoformat(),
+                "id": timeline_page["last"]["id"]
+            })
 
         return flask.jsonify({
             "status": "success",
             "message": "",
-            "campaignDetails": campaign_details
+            "timeline": result,
+            "nextCursor": next_cursor
+        }), 200
+
+    except BusinessError as err:
+        db_session.rollback()
+
+        return _create_failure(err.message), 200
+
+    except DomainError as err:
+        db_session.rollback()
+        error_message = get_error_message(err.error_code)
+        return _create_failure(error_message), err.http_status
+
+    except Exception as err:
+        db_session.rollback()
+        logger.log_error(str(err))
+
+        return _create_failure("Błąd aplikacji."), 500
+
+    finally:
+        db_session.close()
+
+
+@MY_CAMPAIGNS_BLUEPRINT.route("/<int:campaign_id>/timeline/export", methods=["GET"])
+@allow_authorized_with_roles([ROLE_SHOW_OWNED_CAMPAIGNS])
+def my_campaigns_timeline_export(campaign_id):
+    """
+    Download the whole timeline of a campaign, including the summary texts.
+
+    Accepts the optional query parameter:
+        format -- 'ndjson' (default) or 'csv'.
+
+    The export is streamed: the entries are read from the database in chunks while the response is being sent.
+    """
+
+    user_id = get_principal()["user_id"]
+    file_format = flask.request.args.get("format", timeline_export.FORMAT_NDJSON)
+    db_session = db_access.Session()
+
+    try:
+        # Only the users who are somehow related to the campaign should be able to access its data.
+        if not campaign_service.check_if_user_related_to_campaign(user_id, campaign_id):
+            return _create_failure(f"Nie masz dostępu do danych kampani o ID {str(campaign_id)}."), 403
+
+        timeline_export.validate_format(file_format)
+
+    except BusinessError as err:
+        db_session.rollback()
+
+        return _create_failure(err.message), 200
+
+    except DomainError as err:
+        db_session.rollback()
+        error_message = get_error_message(err.error_code)
+        return _create_failure(error_message), err.http_status
+
+    except Exception as err:
+        db_session.rollback()
+        logger.log_error(str(err))
+
+        return _create_failure("Błąd aplikacji."), 500
+
+    finally:
+        db_session.close()
+
+    def generate_export():
+        # The response is generated after this function returns, so the export uses its own session.
+        export_session = db_access.Session()
+
+        try:
+            yield from timeline_export.export_timeline(campaign_id, file_format)
+
+        except Exception as err:
+            export_session.rollback()
+            logger.log_error(f"Error on exporting the timeline of the campaign {campaign_id}: {str(err)}")
+            raise err
+
+        finally:
+            export_session.close()
+
+    return flask.Response(
+        flask.stream_with_context(generate_export()),
+        mimetype=timeline_export.MIMETYPES[file_format],
+        headers={
+            "Content-Disposition": f"attachment; filename=campaign_{campaign_id}_timeline.{file_format}"
+        }
+    )
+
+
+@MY_CAMPAIGNS_BLUEPRINT.route("/<int:campaign_id>/timeline/search", methods=["GET"])
+@allow_authorized_with_roles([ROLE_SHOW_OWNED_CAMPAIGNS])
+def my_campaigns_timeline_search(campaign_id):
+    """
+    Search the titles and the summaries of the timeline entries of a campaign, the best matches first.
+
+    Accepts the query parameters:
+        q -- the words to search for,
+        limit -- the maximal number of entries on the page (optional, default: 20, at most 100),
+        after -- the cursor returned as 'nextCursor' with the previous page (optional).
+
+    The 'nextCursor' is null on the last page.
+    """
+
+    user_id = get_principal()["user_id"]
+    db_session = db_access.Session()
+
+    try:
+        # Only the users who are somehow related to the campaign should be able to access its data.
+        if not campaign_service.check_if_user_related_to_campaign(user_id, campaign_id):
+            return _create_failure(f"Nie masz dostępu do danych kampani o ID {str(campaign_id)}."), 403
+
+        limit = parse_page_limit(flask.request.args.get("limit"), DEFAULT_SEARCH_PAGE_LIMIT, MAX_SEARCH_PAGE_LIMIT)
+        offset = _decode_search_cursor(flask.request.args.get("after"))
+        search_page = campaign_service.search_timeline(campaign_id, flask.request.args.get("q", ""), offset, limit)
+
+        result = list()
+
+        for entry in search_page["entries"]:
+            result.append({
+                "id": entry["id"],
+                "title": entry["title"],
+                "sessionDate": entry["sessionDate"].isoformat()
+            })
+
+        next_cursor = None
+        if search_page["next_offset"] is not None:
+            next_cursor = encode_cursor({"offset": search_page["next_offset"]})
+
+        return flask.jsonify({
+            "status": "success",
+            "message": "",
+            "timeline": result,
+            "nextCursor": next_cursor
         }), 200
 
     except BusinessError as err:
@@ -160,6 +359,11 @@ def my_campaigns_details(campaign_id):
 
         return _create_failure(err.message), 200
 
+    except DomainError as err:
+        db_session.rollback()
+        error_message = get_error_message(err.error_code)
+        return _create_failure(error_message), err.http_status
+
     except Exception as err:
         db_session.rollback()
         logger.log_error(str(err))
@@ -170,6 +374,34 @@ def my_campaigns_details(campaign_id):
         db_session.close()
 
 
+def _decode_search_cursor(cursor):
+    after = decode_cursor(cursor, "offset")
+
+    if after is None:
+        return 0
+
+    if not isinstance(after["offset"], int) or after["offset"] < 0:
+        raise DomainError("Invalid cursor!", "D0002", 400)
+
+    return after["offset"]
+
+
+def _decode_timeline_cursor(cursor):
+    after = decode_cursor(cursor, "sessionDate", "id")
+
+    if after is None:
+        return None
+
+    session_date = None
+    if isinstance(after["sessionDate"], str):
+        session_date = _parse_date(after["sessionDate"])
+
+    if session_date is None or not isinstance(after["id"], int):
+        raise DomainError("Invalid cursor!", "D0002", 400)
+
+    return {"sessionDate": session_date, "id": after["id"]}
+
+
 @MY_CAMPAIGNS_BLUEPRINT.route("/<int:campaign_id>/timeline/entry", methods=['POST'])
 @allow_authorized_with_roles([ROLE_CREATE_SESSION_SUMMARY])
 def my_campaigns_timeline_entry(campaign_id):
@@ -177,9 +409,9 @@ def my_campaigns_timeline_entry(campaign_id):
     Create an entry of the campaign timeline.
     """
 
-    token = flask.request.headers.get("Authorization")
-    user_id = auth_service.get_user_id(token)
-    user_name = auth_service.get_user_name(token)
+    principal = get_principal()
+    user_id = principal["user_id"]
+    user_name = principal["user_name"]
     db_session = db_access.Session()
 
     try:
@@ -210,6 +442,47 @@ def my_campaigns_timeline_entry(campaign_id):
         db_session.close()
 
 
+@MY_CAMPAIGNS_BLUEPRINT.route("/<int:campaign_id>/timeline/entries", methods=['POST'])
+@allow_authorized_with_roles([ROLE_CREATE_SESSION_SUMMARY])
+def my_campaigns_timeline_entries(campaign_id):
+    """
+    Create many entries of the campaign timeline in a single transaction.
+    """
+
+    principal = get_principal()
+    user_id = principal["user_id"]
+    user_name = principal["user_name"]
+    db_session = db_access.Session()
+
+    try:
+        entries_data = campaign_mapper.map_create_timeline_entries_request(flask.request.json, campaign_id)
+
+        if not campaign_service.check_if_campaign_gm(user_id, campaign_id):
+            raise DomainError("User is not a GM!", "AC002", 403)
+
+        timeline_entry_ids = campaign_service.create_timeline_entries(campaign_id, entries_data, user_name)
+        db_session.commit()
+        return flask.jsonify({
+            "status": "success",
+            "message": "",
+            "campaignTimelineEntryIds": timeline_entry_ids
+        })
+
+    except DomainError as err:
+        db_session.rollback()
+        error_message = get_error_message(err.error_code)
+        return _create_failure(error_message), err.http_status
+
+    except Exception as err:
+        db_session.rollback()
+        logger.log_error(str(err))
+        error_message = get_error_message("T0000")
+        return _create_failure(error_message), 500
+
+    finally:
+        db_session.close()
+
+
 def _create_success():
     return flask.jsonify({
         "status": "success",
@@ -4,28 +4,101 @@ The module defining the endpoint for managing and displaying users.
 
 import flask
 
-from artushima.auth import auth_service
-from artushima.auth.auth_decorators import allow_authorized_with_roles
+from artushima.auth.auth_decorators import (allow_authorized_with_roles,
+                                            get_principal)
 from artushima.commons import logger
 from artushima.core import db_access
-from artushima.core.exceptions import BusinessError
-from artushima.user import user_service
+from artushima.core.error_codes import get_error_message
+from artushima.core.exceptions import BusinessError, DomainError
+from artushima.core.utils.cursor import decode_cursor, encode_cursor
+from artushima.core.utils.data_parser import parse_page_limit
+from artushima.user import user_import, user_roles_service, user_service
 from artushima.user.roles import ROLE_CREATE_USER, ROLE_SHOW_USERS
 
 USERS_BLUEPRINT = flask.Blueprint("users_endpoint", __name__, url_prefix="/api/users")
 
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
 
 @USERS_BLUEPRINT.route("/list", methods=["GET"])
 @allow_authorized_with_roles([ROLE_SHOW_USERS])
 def users_list():
     """
-    Get the list of all users.
+    Get a page of the list of all users, ordered by ID.
+
+    Accepts the optional query parameters:
+        limit -- the maximal number of users on the page (default: 100, at most 1000),
+        after -- the cursor returned as 'nextCursor' with the previous page.
+
+    The 'nextCursor' is null on the last page. To get the whole list, the pages have to be read one after another.
     """
 
     db_session = db_access.Session()
 
     try:
-        users = user_service.get_all_users()
+        limit, after_id = _read_page_args()
+        users_page = user_service.get_users_page(after_id, limit)
+
+        result = list()
+
+        for user in users_page["users"]:
+            result.append({
+                "id": user["id"],
+                "userName": user["user_name"]
+            })
+
+        next_cursor = None
+        if users_page["last_id"] is not None:
+            next_cursor = encode_cursor({"id": users_page["last_id"]})
+
+        return flask.jsonify({
+            "status": "success",
+            "message": "",
+            "users": result,
+            "nextCursor": next_cursor
+        }), 200
+
+    except DomainError as err:
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": get_error_message(err.error_code)
+        }), err.http_status
+
+    except Exception as err:
+        logger.log_error(str(err))
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": "Błąd aplikacji"
+        }), 500
+
+    finally:
+        db_session.close()
+
+
+@USERS_BLUEPRINT.route("/search", methods=["GET"])
+@allow_authorized_with_roles([ROLE_SHOW_USERS])
+def users_search():
+    """
+    Find the users, which names start with the given prefix (case-insensitively), ordered by the names.
+
+    Accepts the query parameters:
+        q -- the prefix of the user names,
+        limit -- the maximal number of found users (optional, default: 10, at most 50).
+    """
+
+    db_session = db_access.Session()
+
+    try:
+        limit = parse_page_limit(flask.request.args.get("limit"), DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT)
+        users = user_service.search_users(flask.request.args.get("q", ""), limit)
 
         result = list()
 
@@ -41,13 +114,99 @@ def users_list():
             "users": result
         }), 200
 
+    except DomainError as err:
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": get_error_message(err.error_code)
+        }), err.http_status
+
     except Exception as err:
         logger.log_error(str(err))
         db_session.rollback()
 
         return flask.jsonify({
             "status": "failure",
-            "message": "Błąd aplikacji"
+            "message": "Błąd aplikacji."
+        }), 500
+
+    finally:
+        db_session.close()
+
+
+def _read_page_args():
+    limit = parse_page_limit(flask.request.args.get("limit"), DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT)
+    after = decode_cursor(flask.request.args.get("after"), "id")
+
+    if after is None:
+        return limit, None
+
+    if not isinstance(after["id"], int):
+        raise DomainError("Invalid cursor!", "D0002", 400)
+
+    return limit, after["id"]
+
+
+@USERS_BLUEPRINT.route("/<int:user_id>/history", methods=["GET"])
+@allow_authorized_with_roles([ROLE_SHOW_USERS])
+def users_history(user_id):
+    """
+    Get a page of the history of the given user, newest first.
+
+    Accepts the same optional query parameters as the '/list' endpoint.
+    """
+
+    db_session = db_access.Session()
+
+    try:
+        limit, before_id = _read_page_args()
+        history_page = user_service.get_user_history_page(user_id, before_id, limit)
+
+        result = list()
+
+        for entry in history_page["entries"]:
+            result.append({
+                "id": entry["id"],
+                "createdOn": entry["created_on"].isoformat(),
+                "editorName": entry["editor_name"],
+                "message": entry["message"]
+            })
+
+        next_cursor = None
+        if history_page["last_id"] is not None:
+            next_cursor = encode_cursor({"id": history_page["last_id"]})
+
+        return flask.jsonify({
+            "status": "success",
+            "message": "",
+            "history": result,
+            "nextCursor": next_cursor
+        }), 200
+
+    except BusinessError as err:
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": err.message
+        }), 200
+
+    except DomainError as err:
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": get_error_message(err.error_code)
+        }), err.http_status
+
+    except Exception as err:
+        logger.log_error(str(err))
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": "Błąd aplikacji."
         }), 500
 
     finally:
@@ -71,15 +230,11 @@ def users_add():
         }
     """
 
-    editor_name = None
+    editor_name = get_principal()["user_name"]
     user_name = None
     password = None
     roles = None
 
-    if flask.request.headers.get("Authorization") is not None:
-        token = flask.request.headers.get("Authorization")
-        editor_name = auth_service.get_user_name(token)
-
     if flask.request.json is not None:
         user_name = flask.request.json.get("userName")
         password = flask.request.json.get("password")
@@ -104,6 +259,208 @@ def users_add():
             "message": err.message
         }), 200
 
+    except DomainError as err:
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": get_error_message(err.error_code)
+        }), err.http_status
+
+    except Exception as err:
+        logger.log_error(str(err))
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": "Błąd aplikacji."
+        }), 500
+
+    finally:
+        db_session.close()
+
+
+@USERS_BLUEPRINT.route("/import", methods=["POST"])
+@allow_authorized_with_roles([ROLE_CREATE_USER])
+def users_import():
+    """
+    Import many users at once.
+
+    Requires the request body in the CSV format (with the 'text/csv' content type) or in the JSON lines format
+    (with any other content type), as described in the 'user_import' module. The rows with errors are skipped and
+    reported in the response:
+        {
+            "status": "success",
+            "message": "",
+            "created": <number of created users>,
+            "errors": [
+                {"row": <row number>, "message": "<message>"},
+                ...
+            ]
+        }
+    """
+
+    editor_name = get_principal()["user_name"]
+
+    file_format = user_import.FORMAT_JSON_LINES
+    if flask.request.mimetype == "text/csv":
+        file_format = user_import.FORMAT_CSV
+
+    db_session = db_access.Session()
+
+    try:
+        rows = user_import.parse(flask.request.get_data(as_text=True), file_format)
+        result = user_service.import_users(editor_name, rows)
+        db_session.commit()
+
+        return flask.jsonify({
+            "status": "success",
+            "message": "",
+            "created": result["created"],
+            "errors": result["errors"]
+        }), 200
+
+    except DomainError as err:
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": get_error_message(err.error_code)
+        }), err.http_status
+
+    except Exception as err:
+        logger.log_error(str(err))
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": "Błąd aplikacji."
+        }), 500
+
+    finally:
+        db_session.close()
+
+
+@USERS_BLUEPRINT.route("/roles/grant", methods=["POST"])
+@allow_authorized_with_roles([ROLE_CREATE_USER])
+def users_roles_grant():
+    """
+    Grant the roles to many users at once.
+
+    Requires the following request body:
+        {
+            "userNames": [
+                <userName1>,
+                ...
+            ],
+            "roles": [
+                <role1>,
+                ...
+            ]
+        }
+    """
+
+    return _change_roles_of_users(user_roles_service.grant_roles_to_users)
+
+
+@USERS_BLUEPRINT.route("/roles/revoke", methods=["POST"])
+@allow_authorized_with_roles([ROLE_CREATE_USER])
+def users_roles_revoke():
+    """
+    Revoke the roles from many users at once.
+
+    Requires the same request body as the '/roles/grant' endpoint.
+    """
+
+    return _change_roles_of_users(user_roles_service.revoke_roles_from_users)
+
+
+def _change_roles_of_users(change_roles):
+    editor_name = get_principal()["user_name"]
+    user_names = None
+    roles = None
+
+    if flask.request.json is not None:
+        user_names = flask.request.json.get("userNames")
+        roles = flask.request.json.get("roles")
+
+    db_session = db_access.Session()
+
+    try:
+        changed = change_roles(editor_name, user_names, roles)
+        db_session.commit()
+
+        return flask.jsonify({
+            "status": "success",
+            "message": "",
+            "changed": changed
+        }), 200
+
+    except BusinessError as err:
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": err.message
+        }), 200
+
+    except DomainError as err:
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": get_error_message(err.error_code)
+        }), err.http_status
+
+    except Exception as err:
+        logger.log_error(str(err))
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": "Błąd aplikacji."
+        }), 500
+
+    finally:
+        db_session.close()
+
+
+@USERS_BLUEPRINT.route("/<int:user_id>/revoke_tokens", methods=["POST"])
+@allow_authorized_with_roles([ROLE_CREATE_USER])
+def users_revoke_tokens(user_id):
+    """
+    Revoke all tokens of the given user, e.g. when his/her account has been compromised.
+    """
+
+    editor_name = get_principal()["user_name"]
+
+    db_session = db_access.Session()
+
+    try:
+        user_service.revoke_tokens(editor_name, user_id)
+        db_session.commit()
+
+        return flask.jsonify({
+            "status": "success",
+            "message": ""
+        }), 200
+
+    except BusinessError as err:
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": err.message
+        }), 200
+
+    except DomainError as err:
+        db_session.rollback()
+
+        return flask.jsonify({
+            "status": "failure",
+            "message": get_error_message(err.error_code)
+        }), err.http_status
+
     except Exception as err:
         logger.log_error(str(err))
         db_session.rollback()
@@ -0,0 +1,134 @@
+"""
+Benchmark of the password hashing cost.
+
+For each given hashing method it measures the p50 and p99 latency of 'auth_service.log_in' (including the reading
+of the user, the time spent waiting for a free hashing worker and the creation of the token) and the number of
+logins per core per second.
+
+Run from the repository root, e.g.:
+    python scripts/benchmarks/password_hashing_benchmark.py --methods pbkdf2:sha256:260000 pbkdf2:sha256:600000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import artushima.campaign.persistence.model  # noqa: E402,F401 -- initializing the entities related to the users
+from artushima.auth import auth_service  # noqa: E402
+from artushima.core import db_access, password_hashing, properties  # noqa: E402
+from artushima.user import user_service  # noqa: E402
+
+PASSWORD = "benchmark-password"
+
+
+def _percentile(samples, percentile):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _run_logins(user_name, logins, latencies, lock):
+    for _ in range(logins):
+        # Each login is done in a new session, as it is done by the endpoint.
+        session = db_access.Session()
+
+        start = time.perf_counter()
+        auth_service.log_in(user_name, PASSWORD)
+        session.commit()
+        latency = time.perf_counter() - start
+
+        db_access.Session.remove()
+
+        with lock:
+            latencies.append(latency)
+
+
+def benchmark_method(method, workers, concurrency, samples):
+    """
+    Benchmark a single hashing method and return the results.
+    """
+
+    os.environ[properties.PROPERTY_PASSWORD_HASH_METHOD] = method
+    os.environ[properties.PROPERTY_HASHING_WORKERS] = str(workers)
+    os.environ[properties.PROPERTY_HASHING_QUEUE_LIMIT] = str(max(samples, concurrency))
+
+    password_hashing.init()
+
+    try:
+        user_name = f"benchmark_user_{method}"
+        session = db_access.Session()
+        user_service.create_user("benchmark", user_name, PASSWORD)
+        session.commit()
+        db_access.Session.remove()
+
+        latencies = list()
+        lock = threading.Lock()
+        logins_per_thread = max(samples // concurrency, 1)
+        threads = [
+            threading.Thread(target=_run_logins, args=(user_name, logins_per_thread, latencies, lock))
+            for _ in range(concurrency)
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - start
+
+    finally:
+        password_hashing.shutdown()
+
+    return {
+        "method": method,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "logins_per_core_per_second": len(latencies) / duration / workers
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the password hashing cost.")
+    parser.add_argument("--methods", nargs="+", default=["pbkdf2:sha256:150000", "pbkdf2:sha256:260000",
+                                                          "pbkdf2:sha256:600000"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="The number of hashing worker processes.")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="The number of simultaneous logins (default: twice the number of workers).")
+    parser.add_argument("--samples", type=int, default=200, help="The number of logins per method.")
+    parser.add_argument("--db-uri", default=None,
+                        help="The URI of the database to run the benchmark on (default: a temporary SQLite file).")
+    args = parser.parse_args()
+
+    concurrency = args.concurrency or args.workers * 2
+    db_uri = args.db_uri or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+
+    # The application logger writes to the 'logs' directory.
+    os.makedirs("logs", exist_ok=True)
+
+    os.environ[properties.PROPERTY_DB_URI] = db_uri
+    os.environ[properties.PROPERTY_APP_SECRET_KEY] = "benchmark-secret"
+    os.environ[properties.PROPERTY_TOKEN_EXPIRATION_TIME] = "60"
+    db_access.init()
+    db_access.BaseEntity.metadata.create_all(db_access.SqlEngine)
+
+    print(f"workers: {args.workers}, concurrency: {concurrency}, samples: {args.samples}, database: {db_uri}")
+    print(f"{'method':<28} {'p50 [ms]':>10} {'p99 [ms]':>10} {'mean [ms]':>10} {'logins/core/s':>14}")
+
+    for method in args.methods:
+        result = benchmark_method(method, args.workers, concurrency, args.samples)
+        print(
+            f"{result['method']:<28} {result['p50_ms']:>10.1f} {result['p99_ms']:>10.1f} "
+            f"{result['mean_ms']:>10.1f} {result['logins_per_core_per_second']:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Benchmark of adding an entry to the timeline of a campaign.
+
+For campaigns with a growing number of existing timeline and history entries it measures the p50 and p99 latency
+of 'campaign_service.create_timeline_entry' together with the number of SQL statements and of the entities loaded
+per call. Adding an entry should only insert the new rows, so all of them should stay constant. The script exits
+with the status 1 if the p50 latency for the largest campaign exceeds the one for the smallest campaign more than
+'--max-ratio' times.
+
+Run from the repository root, e.g.:
+    python scripts/benchmarks/timeline_append_benchmark.py --sizes 10 100 1000 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from sqlalchemy import event  # noqa: E402
+
+from artushima.campaign import campaign_service  # noqa: E402
+from artushima.campaign.persistence.model import (CampaignEntity,  # noqa: E402
+                                                  CampaignHistoryEntity,
+                                                  CampaignTimelineEntity)
+from artushima.core import db_access, properties  # noqa: E402
+from artushima.user.persistence.model import UserEntity  # noqa: E402
+
+
+def _percentile(samples, percentile):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _create_campaign(size):
+    session = db_access.Session()
+    timestamp = datetime.utcnow()
+
+    user = UserEntity()
+    user.user_name = f"benchmark_gm_{size}"
+    user.created_on = timestamp
+    user.modified_on = timestamp
+    user.opt_lock = 0
+
+    campaign = CampaignEntity()
+    campaign.created_on = timestamp
+    campaign.modified_on = timestamp
+    campaign.opt_lock = 0
+    campaign.campaign_name = f"Benchmark campaign {size}"
+    campaign.begin_date = date(2055, 1, 1)
+    campaign.passed_days = 0
+    campaign.game_master = user
+
+    session.add(campaign)
+    session.flush()
+
+    session.execute(CampaignTimelineEntity.__table__.insert(), [
+        {"created_on": timestamp, "modified_on": timestamp, "opt_lock": 0, "title": f"Entry {i}",
+         "session_date": date(2020, 1, 1) + timedelta(days=i), "summary_text": "Summary " * 50,
+         "campaign_id": campaign.id}
+        for i in range(size)
+    ])
+    session.execute(CampaignHistoryEntity.__table__.insert(), [
+        {"created_on": timestamp, "modified_on": timestamp, "opt_lock": 0, "editor_name": user.user_name,
+         "message": f"Entry {i}", "campaign_id": campaign.id}
+        for i in range(size)
+    ])
+
+    session.commit()
+    campaign_id = campaign.id
+    db_access.Session.remove()
+
+    return campaign_id
+
+
+def benchmark_size(size, samples, counters):
+    """
+    Benchmark adding entries to a campaign with the given number of existing entries and return the results.
+    """
+
+    campaign_id = _create_campaign(size)
+
+    latencies = list()
+    statements = list()
+    loaded_rows = list()
+
+    for i in range(samples):
+        entry_data = {
+            "title": f"New entry {i}",
+            "sessionDate": date(2100, 1, 1),
+            "summaryText": "New summary",
+            "campaignId": campaign_id
+        }
+
+        # Each entry is added in a new session, as it is done by the endpoint.
+        session = db_access.Session()
+        counters["statements"] = 0
+        counters["rows"] = 0
+
+        start = time.perf_counter()
+        campaign_service.create_timeline_entry(entry_data, "benchmark")
+        session.commit()
+        latency = time.perf_counter() - start
+
+        db_access.Session.remove()
+
+        latencies.append(latency)
+        statements.append(counters["statements"])
+        loaded_rows.append(counters["rows"])
+
+    return {
+        "size": size,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "statements": max(statements),
+        "loaded_rows": max(loaded_rows)
+    }
+
+
+def _install_counters(counters):
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        counters["statements"] += 1
+
+    def count_loaded_entity(target, context):
+        counters["rows"] += 1
+
+    event.listen(db_access.SqlEngine, "before_cursor_execute", count_statement)
+
+    for entity_class in [CampaignEntity, CampaignHistoryEntity, CampaignTimelineEntity]:
+        event.listen(entity_class, "load", count_loaded_entity)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of adding an entry to the timeline of a campaign.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000],
+                        help="The numbers of the existing timeline and history entries of the campaigns.")
+    parser.add_argument("--samples", type=int, default=50, help="The number of entries added per campaign.")
+    parser.add_argument("--db-uri", default="sqlite://",
+                        help="The URI of the database to run the benchmark on (default: in-memory SQLite).")
+    parser.add_argument("--max-ratio", type=float, default=3.0,
+                        help="The maximal accepted ratio of the p50 latencies for the largest and smallest campaign.")
+    args = parser.parse_args()
+
+    # The application logger writes to the 'logs' directory, already on loading the properties.
+    os.makedirs("logs", exist_ok=True)
+
+    os.environ[properties.PROPERTY_DB_URI] = args.db_uri
+    properties.init()
+    db_access.init()
+    db_access.BaseEntity.metadata.create_all(db_access.SqlEngine)
+
+    counters = {"statements": 0, "rows": 0}
+    _install_counters(counters)
+
+    print(f"samples: {args.samples}, database: {args.db_uri}")
+    print(f"{'entries':>10} {'p50 [ms]':>10} {'p99 [ms]':>10} {'statements':>11} {'loaded rows':>13}")
+
+    results = list()
+
+    for size in args.sizes:
+        result = benchmark_size(size, args.samples, counters)
+        results.append(result)
+        print(
+            f"{result['size']:>10} {result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f} "
+            f"{result['statements']:>11} {result['loaded_rows']:>13}"
+        )
+
+    ratio = results[-1]["p50_ms"] / results[0]["p50_ms"]
+    print(f"p50 ratio ({results[-1]['size']} / {results[0]['size']} entries): {ratio:.2f}")
+
+    if ratio > args.max_ratio:
+        print(f"FAILED: the ratio exceeds {args.max_ratio}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,22 @@
 The testing module for the auth service.
 """
 
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone
 from unittest import TestCase
 from unittest.mock import create_autospec
 
 import jwt
-import werkzeug
 from artushima.auth import auth_service
 from artushima.auth.persistence import blacklisted_token_repository
-from artushima.auth.persistence.model import BlacklistedTokenEntity
-from artushima.core import properties
-from artushima.core.exceptions import BusinessError
-from artushima.user import user_roles_service, user_service
+from artushima.auth.persistence.model import BlacklistedTokenEntity, hash_token
+from artushima.commons import logger
+from artushima.core import db_access, password_hashing, properties
+from artushima.core.exceptions import BusinessError, DomainError
+from artushima.user import user_events, user_roles_service, user_service
+from artushima.user.roles import (ALL_ROLES, ALL_ROLES_MASK, ROLE_CREATE_USER,
+                                  ROLE_SHOW_USERS, ROLE_START_CAMPAIGN,
+                                  get_required_role_mask, get_role_mask)
 from jwt import ExpiredSignatureError, InvalidTokenError
 from tests import assertModelInitialized
 
@@ -25,20 +29,26 @@ class LogInTest(TestCase):
         self.user_service_mock = create_autospec(user_service)
         self.user_roles_service_mock = create_autospec(user_roles_service)
         self.properties_mock = create_autospec(properties)
-        self.werkzeug_mock = create_autospec(werkzeug)
+        self.password_hashing_mock = create_autospec(password_hashing)
         self.jwt_mock = create_autospec(jwt)
         auth_service.user_service = self.user_service_mock
         auth_service.user_roles_service = self.user_roles_service_mock
         auth_service.properties = self.properties_mock
-        auth_service.werkzeug = self.werkzeug_mock
+        auth_service.password_hashing = self.password_hashing_mock
         auth_service.jwt = self.jwt_mock
+        self.db_access_mock = create_autospec(db_access)
+        self.logger_mock = create_autospec(logger)
+        auth_service.db_access = self.db_access_mock
+        auth_service.logger = self.logger_mock
 
     def tearDown(self):
         auth_service.user_service = user_service
         auth_service.user_roles_service = user_roles_service
-        auth_service.werkzeug = werkzeug
+        auth_service.password_hashing = password_hashing
         auth_service.properties = properties
         auth_service.jwt = jwt
+        auth_service.db_access = db_access
+        auth_service.logger = logger
 
     def test_should_authenticate_user(self):
         # given
@@ -62,9 +72,58 @@ class LogInTest(TestCase):
         self.assertIn("test_role_1", response["roles"])
         self.assertIn("test_role_2", response["roles"])
 
+        payload = self.jwt_mock.encode.call_args[0][0]
+        self.assertEqual("test_user", payload["sub"])
+        self.assertEqual(2, len(payload["roles"]))
+        self.assertIn("role_epoch", payload)
+
+    def test_should_rehash_password_hashed_with_outdated_method(self):
+        # given
+        self.properties_mock.get_token_expiration_time.return_value = "60"
+        self.jwt_mock.encode.return_value = b"test_token"
+        self.password_hashing_mock.check_password_hash.return_value = True
+        self.password_hashing_mock.needs_rehash.return_value = True
+        self.password_hashing_mock.generate_password_hash.return_value = "new_hash"
+
+        # when
+        auth_service.log_in("test_user", "password")
+
+        # then
+        self.user_service_mock.change_password_hash.assert_called_once_with("test_user", "new_hash")
+
+    def test_should_log_in_when_rehash_fails(self):
+        # given
+        self.properties_mock.get_token_expiration_time.return_value = "60"
+        self.jwt_mock.encode.return_value = b"test_token"
+        self.password_hashing_mock.check_password_hash.return_value = True
+        self.password_hashing_mock.needs_rehash.return_value = True
+        self.password_hashing_mock.generate_password_hash.return_value = "new_hash"
+        self.user_service_mock.change_password_hash.side_effect = DomainError("Version conflict", "D0005", 409)
+
+        # when
+        response = auth_service.log_in("test_user", "password")
+
+        # then
+        self.assertEqual("test_token", response["token"])
+        self.db_access_mock.savepoint.assert_called_once()
+        self.logger_mock.log_error.assert_called_once()
+
+    def test_should_not_rehash_password_hashed_with_current_method(self):
+        # given
+        self.properties_mock.get_token_expiration_time.return_value = "60"
+        self.jwt_mock.encode.return_value = b"test_token"
+        self.password_hashing_mock.check_password_hash.return_value = True
+        self.password_hashing_mock.needs_rehash.return_value = False
+
+        # when
+        auth_service.log_in("test_user", "password")
+
+        # then
+        self.user_service_mock.change_password_hash.assert_not_called()
+
     def test_should_raise_error_when_user_does_not_exist(self):
         # given
-        self.user_service_mock.get_user_by_user_name.return_value = None
+        self.user_service_mock.get_user_credentials.return_value = None
 
         # when then
         with self.assertRaises(BusinessError):
@@ -72,7 +131,7 @@ class LogInTest(TestCase):
 
     def test_should_raise_error_when_password_is_incorrect(self):
         # given
-        self.werkzeug_mock.security.check_password_hash.return_value = False
+        self.password_hashing_mock.check_password_hash.return_value = False
 
         # when then
         with self.assertRaises(BusinessError):
@@ -134,9 +193,8 @@ class IsTokenOkTest(TestCase):
         # given
         token = "Bearer test"
         blacklisted_token = BlacklistedTokenEntity()
-        blacklisted_token.token = token
 
-        self.blacklisted_token_repository_mock.read_by_token.return_value = blacklisted_token
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = blacklisted_token
 
         # when
         response = auth_service.is_token_ok(token)
@@ -148,7 +206,7 @@ class IsTokenOkTest(TestCase):
         # given
         token = "Bearer test"
 
-        self.blacklisted_token_repository_mock.read_by_token.return_value = None
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = None
         self.jwt_mock.decode.side_effect = ExpiredSignatureError
 
         # when
@@ -161,7 +219,7 @@ class IsTokenOkTest(TestCase):
         # given
         token = "Bearer test"
 
-        self.blacklisted_token_repository_mock.read_by_token.return_value = None
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = None
         self.jwt_mock.decode.side_effect = InvalidTokenError
 
         # when
@@ -174,7 +232,7 @@ class IsTokenOkTest(TestCase):
         # given
         token = "Bearer test"
 
-        self.blacklisted_token_repository_mock.read_by_token.return_value = None
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = None
         self.jwt_mock.decode.return_value = {
             "iat": datetime.utcnow() - timedelta(minutes=10),
             "exp": datetime.utcnow() + timedelta(minutes=10),
@@ -193,7 +251,7 @@ class IsTokenOkTest(TestCase):
         # given
         token = "Bearer test"
 
-        self.blacklisted_token_repository_mock.read_by_token.return_value = None
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = None
         self.jwt_mock.decode.return_value = {
             "iat": datetime.utcnow() - timedelta(minutes=10),
             "exp": datetime.utcnow() + timedelta(minutes=10),
@@ -211,319 +269,550 @@ class IsTokenOkTest(TestCase):
         self.assertTrue(response)
 
 
-class GetUserNameTest(TestCase):
+class AuthenticateTest(TestCase):
 
     def setUp(self):
+        assertModelInitialized()
         self.jwt_mock = create_autospec(jwt)
+        self.properties_mock = create_autospec(properties)
+        self.blacklisted_token_repository_mock = create_autospec(blacklisted_token_repository)
+        self.user_service_mock = create_autospec(user_service)
         auth_service.jwt = self.jwt_mock
+        auth_service.properties = self.properties_mock
+        auth_service.blacklisted_token_repository = self.blacklisted_token_repository_mock
+        auth_service.user_service = self.user_service_mock
 
     def tearDown(self):
         auth_service.jwt = jwt
+        auth_service.properties = properties
+        auth_service.blacklisted_token_repository = blacklisted_token_repository
+        auth_service.user_service = user_service
 
-    def test_should_return_none_when_token_is_none(self):
+    def test_should_get_none_when_token_is_none(self):
+        # when
+        principal = auth_service.authenticate(None)
+
+        # then
+        self.assertIsNone(principal)
+
+    def test_should_get_superuser_principal_for_test_bearer(self):
         # given
-        token = None
+        token = "Bearer " + auth_service.TEST_BEARER_TOKEN
+        self.properties_mock.get_test_bearer_enabled.return_value = True
+        self.user_service_mock.get_user_by_user_name.return_value = {
+            "id": 1,
+            "user_name": "superuser"
+        }
+
+        # when
+        principal = auth_service.authenticate(token)
+
+        # then
+        self.assertEqual(1, principal["user_id"])
+        self.assertEqual("Test", principal["user_name"])
+        self.assertEqual(ALL_ROLES, principal["roles"])
+        self.assertEqual(ALL_ROLES_MASK, principal["role_mask"])
+        self.jwt_mock.decode.assert_not_called()
+
+    def test_should_get_none_when_test_bearer_is_disabled(self):
+        # given
+        token = "Bearer " + auth_service.TEST_BEARER_TOKEN
+        self.properties_mock.get_test_bearer_enabled.return_value = False
 
         # when
-        result = auth_service.get_user_name(token)
+        principal = auth_service.authenticate(token)
 
         # then
-        self.assertIsNone(result)
+        self.assertIsNone(principal)
 
-    def test_should_return_test_when_token_is_test_bearer_token(self):
+    def test_should_get_none_when_token_is_blacklisted(self):
         # given
-        token = f"Bearer {auth_service.TEST_BEARER_TOKEN}"
+        token = "Bearer test"
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = BlacklistedTokenEntity()
 
         # when
-        result = auth_service.get_user_name(token)
+        principal = auth_service.authenticate(token)
 
         # then
-        self.assertEqual("Test", result)
+        self.assertIsNone(principal)
+        self.jwt_mock.decode.assert_not_called()
 
-    def test_should_return_none_when_token_is_invalid(self):
+    def test_should_get_none_when_token_is_invalid(self):
         # given
         token = "Bearer test"
-        self.jwt_mock.decode.side_effect = InvalidTokenError()
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = None
+        self.jwt_mock.decode.side_effect = InvalidTokenError
 
         # when
-        result = auth_service.get_user_name(token)
+        principal = auth_service.authenticate(token)
 
         # then
-        self.assertIsNone(result)
+        self.assertIsNone(principal)
 
-    def test_should_return_user_name(self):
+    def test_should_get_none_when_user_does_not_exist(self):
         # given
         token = "Bearer test"
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = None
         self.jwt_mock.decode.return_value = {"sub": "test_user"}
+        self.user_service_mock.get_user_auth_state.return_value = None
 
         # when
-        result = auth_service.get_user_name(token)
+        principal = auth_service.authenticate(token)
 
         # then
-        self.assertEqual("test_user", result)
+        self.assertIsNone(principal)
 
+    def test_should_get_principal(self):
+        # given
+        token = "Bearer test"
+        decoded_token = {"sub": "test_user"}
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = None
+        self.jwt_mock.decode.return_value = decoded_token
+        self.user_service_mock.get_user_auth_state.return_value = {
+            "id": 100,
+            "role_epoch": 0,
+            "tokens_valid_after": None
+        }
+        self.user_service_mock.get_user_with_roles_by_user_name.return_value = {
+            "id": 100,
+            "user_name": "test_user",
+            "roles": [ROLE_SHOW_USERS]
+        }
 
-class GetUserIdTest(TestCase):
+        # when
+        principal = auth_service.authenticate(token)
+
+        # then
+        self.assertEqual(100, principal["user_id"])
+        self.assertEqual("test_user", principal["user_name"])
+        self.assertEqual([ROLE_SHOW_USERS], principal["roles"])
+        self.assertEqual(get_role_mask([ROLE_SHOW_USERS]), principal["role_mask"])
+        self.assertEqual(decoded_token, principal["claims"])
+        self.jwt_mock.decode.assert_called_once()
+        self.user_service_mock.get_user_with_roles_by_user_name.assert_called_once_with("test_user")
+        self.user_service_mock.get_user_by_user_name.assert_not_called()
+
+
+class AuthenticateWithRoleClaimsTest(TestCase):
 
     def setUp(self):
+        assertModelInitialized()
         self.jwt_mock = create_autospec(jwt)
+        self.properties_mock = create_autospec(properties)
+        self.blacklisted_token_repository_mock = create_autospec(blacklisted_token_repository)
         self.user_service_mock = create_autospec(user_service)
         auth_service.jwt = self.jwt_mock
+        auth_service.properties = self.properties_mock
+        auth_service.blacklisted_token_repository = self.blacklisted_token_repository_mock
         auth_service.user_service = self.user_service_mock
 
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = None
+        self.jwt_mock.decode.return_value = {
+            "sub": "test_user",
+            "uid": 100,
+            "roles": [ROLE_SHOW_USERS],
+            "role_epoch": 3
+        }
+
     def tearDown(self):
         auth_service.jwt = jwt
+        auth_service.properties = properties
+        auth_service.blacklisted_token_repository = blacklisted_token_repository
         auth_service.user_service = user_service
+        auth_service.auth_state_cache = None
 
-    def test_should_get_user_id(self):
+    def test_should_trust_roles_in_token_when_role_epoch_matches(self):
         # given
-        token = "Bearer test"
-        self.jwt_mock.decode.return_value = {"sub": "test_user"}
-        self.user_service_mock.get_user_by_user_name.return_value = {
+        self.user_service_mock.get_user_auth_state.return_value = {
             "id": 100,
-            "user_name": "test_user"
+            "role_epoch": 3,
+            "tokens_valid_after": None
         }
 
         # when
-        result = auth_service.get_user_id(token)
+        principal = auth_service.authenticate("Bearer test")
 
         # then
-        self.assertIsNotNone(result)
-        self.assertEqual(100, result)
-        self.user_service_mock.get_user_by_user_name.assert_called_once_with("test_user")
+        self.assertEqual(100, principal["user_id"])
+        self.assertEqual([ROLE_SHOW_USERS], principal["roles"])
+        self.user_service_mock.get_user_with_roles_by_user_name.assert_not_called()
 
-    def test_should_get_none_when_token_is_none(self):
+    def test_should_read_roles_when_role_epoch_has_changed(self):
         # given
-        token = None
+        self.user_service_mock.get_user_auth_state.return_value = {
+            "id": 100,
+            "role_epoch": 4,
+            "tokens_valid_after": None
+        }
+        self.user_service_mock.get_user_with_roles_by_user_name.return_value = {
+            "id": 100,
+            "user_name": "test_user",
+            "roles": [ROLE_SHOW_USERS, ROLE_CREATE_USER]
+        }
 
         # when
-        result = auth_service.get_user_id(token)
+        principal = auth_service.authenticate("Bearer test")
 
         # then
-        self.assertIsNone(result)
+        self.assertEqual([ROLE_SHOW_USERS, ROLE_CREATE_USER], principal["roles"])
 
-    def test_should_get_superuser_id_when_token_is_test_bearer_token(self):
+    def test_should_get_none_when_user_does_not_exist(self):
         # given
-        token = f"Bearer {auth_service.TEST_BEARER_TOKEN}"
-        self.user_service_mock.get_user_by_user_name.return_value = {
-            "id": 1,
-            "user_name": "superuser"
-        }
+        self.user_service_mock.get_user_auth_state.return_value = None
 
         # when
-        result = auth_service.get_user_id(token)
+        principal = auth_service.authenticate("Bearer test")
 
         # then
-        self.assertIsNotNone(result)
-        self.assertEqual(1, result)
-        self.jwt_mock.decode.assert_not_called()
-        self.user_service_mock.get_user_by_user_name.assert_called_once_with("superuser")
+        self.assertIsNone(principal)
 
-    def test_should_get_none_when_token_is_invalid(self):
+    def test_should_cache_role_epoch(self):
         # given
-        token = "Bearer test"
-        self.jwt_mock.decode.side_effect = InvalidTokenError()
+        self.properties_mock.get_auth_state_cache_ttl.return_value = "5"
+        auth_service.init_auth_state_cache()
+        self.user_service_mock.get_user_auth_state.return_value = {
+            "id": 100,
+            "role_epoch": 3,
+            "tokens_valid_after": None
+        }
 
         # when
-        result = auth_service.get_user_id(token)
+        auth_service.authenticate("Bearer test")
+        auth_service.authenticate("Bearer test")
 
         # then
-        self.assertIsNone(result)
+        self.user_service_mock.get_user_auth_state.assert_called_once_with("test_user")
 
-    def test_should_get_none_when_user_does_not_exist(self):
+    def test_should_evict_role_epoch_on_user_change(self):
         # given
-        token = "Bearer test"
-        self.jwt_mock.decode.return_value = {
-            "sub": "test_user"
+        self.properties_mock.get_auth_state_cache_ttl.return_value = "5"
+        auth_service.init_auth_state_cache()
+        self.user_service_mock.get_user_auth_state.return_value = {
+            "id": 100,
+            "role_epoch": 3,
+            "tokens_valid_after": None
         }
-        self.user_service_mock.get_user_by_user_name.return_value = None
+        auth_service.authenticate("Bearer test")
 
         # when
-        result = auth_service.get_user_id(token)
+        user_events.publish_user_changed("test_user")
+        auth_service.authenticate("Bearer test")
 
         # then
-        self.assertIsNone(result)
+        self.assertEqual(2, self.user_service_mock.get_user_auth_state.call_count)
 
 
-class AreRolesSufficientTest(TestCase):
+class AuthenticateRevokedTokenTest(TestCase):
 
     def setUp(self):
+        assertModelInitialized()
         self.jwt_mock = create_autospec(jwt)
         self.properties_mock = create_autospec(properties)
         self.blacklisted_token_repository_mock = create_autospec(blacklisted_token_repository)
         self.user_service_mock = create_autospec(user_service)
-        self.user_roles_service_mock = create_autospec(user_roles_service)
         auth_service.jwt = self.jwt_mock
         auth_service.properties = self.properties_mock
         auth_service.blacklisted_token_repository = self.blacklisted_token_repository_mock
         auth_service.user_service = self.user_service_mock
-        auth_service.user_roles_service = self.user_roles_service_mock
+
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = None
+        self.jwt_mock.decode.return_value = {
+            "sub": "test_user",
+            "iat": datetime(2020, 1, 1, 12, 0, 0, tzinfo=timezone.utc).timestamp(),
+            "uid": 100,
+            "roles": [ROLE_SHOW_USERS],
+            "role_epoch": 0
+        }
 
     def tearDown(self):
         auth_service.jwt = jwt
         auth_service.properties = properties
         auth_service.blacklisted_token_repository = blacklisted_token_repository
         auth_service.user_service = user_service
-        auth_service.user_roles_service = user_roles_service
 
-    def test_should_return_true_when_no_roles_are_required(self):
+    def test_should_get_none_when_token_was_issued_before_revocation(self):
         # given
-        token = "Bearer test"
-        required_roles = []
+        self.user_service_mock.get_user_auth_state.return_value = {
+            "id": 100,
+            "role_epoch": 0,
+            "tokens_valid_after": datetime(2020, 1, 1, 12, 0, 1)
+        }
 
         # when
-        response = auth_service.are_roles_sufficient(token, required_roles)
+        principal = auth_service.authenticate("Bearer test")
 
         # then
-        self.assertTrue(response)
+        self.assertIsNone(principal)
 
-    def test_should_return_false_when_token_is_none(self):
+    def test_should_get_none_when_token_was_issued_within_second_of_revocation(self):
         # given
-        token = None
-        required_roles = ["role_test"]
+        self.user_service_mock.get_user_auth_state.return_value = {
+            "id": 100,
+            "role_epoch": 0,
+            "tokens_valid_after": datetime(2020, 1, 1, 12, 0, 0)
+        }
 
         # when
-        response = auth_service.are_roles_sufficient(token, required_roles)
+        principal = auth_service.authenticate("Bearer test")
 
         # then
-        self.assertFalse(response)
+        self.assertIsNone(principal)
 
-    def test_should_return_false_when_no_roles_are_required_and_token_is_none(self):
+    def test_should_get_principal_when_token_was_issued_after_revocation(self):
         # given
-        token = None
-        required_roles = []
+        self.user_service_mock.get_user_auth_state.return_value = {
+            "id": 100,
+            "role_epoch": 0,
+            "tokens_valid_after": datetime(2020, 1, 1, 11, 59, 59)
+        }
 
         # when
-        response = auth_service.are_roles_sufficient(token, required_roles)
+        principal = auth_service.authenticate("Bearer test")
 
         # then
-        self.assertFalse(response)
+        self.assertIsNotNone(principal)
 
-    def test_should_authenticate_test_bearer(self):
-        # given
-        token = "Bearer " + auth_service.TEST_BEARER_TOKEN
-        required_roles = ["role_test"]
 
-        self.properties_mock.get_test_bearer_enabled.return_value = True
+class AuthenticateWithTokenCacheTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        self.jwt_mock = create_autospec(jwt)
+        self.properties_mock = create_autospec(properties)
+        self.blacklisted_token_repository_mock = create_autospec(blacklisted_token_repository)
+        self.user_service_mock = create_autospec(user_service)
+        auth_service.jwt = self.jwt_mock
+        auth_service.properties = self.properties_mock
+        auth_service.blacklisted_token_repository = self.blacklisted_token_repository_mock
+        auth_service.user_service = self.user_service_mock
+
+        self.properties_mock.get_token_cache_size.return_value = "10"
+        self.properties_mock.get_token_cache_ttl.return_value = "60"
+        auth_service.init_token_cache()
+
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = None
+        self.jwt_mock.decode.return_value = {
+            "sub": "test_user",
+            "exp": time.time() + 600
+        }
+        self.user_service_mock.get_user_auth_state.return_value = {
+            "id": 100,
+            "role_epoch": 0,
+            "tokens_valid_after": None
+        }
+        self.user_service_mock.get_user_with_roles_by_user_name.return_value = {
+            "id": 100,
+            "user_name": "test_user",
+            "roles": ["role_test"]
+        }
+
+    def tearDown(self):
+        auth_service.jwt = jwt
+        auth_service.properties = properties
+        auth_service.blacklisted_token_repository = blacklisted_token_repository
+        auth_service.user_service = user_service
+        auth_service.token_cache = None
 
+    def test_should_verify_token_only_once(self):
         # when
-        response = auth_service.are_roles_sufficient(token, required_roles)
+        first_principal = auth_service.authenticate("Bearer test")
+        second_principal = auth_service.authenticate("Bearer test")
 
         # then
-        self.assertTrue(response)
+        self.assertEqual(first_principal, second_principal)
+        self.jwt_mock.decode.assert_called_once()
+        self.blacklisted_token_repository_mock.read_by_token_hash.assert_called_once()
+        self.user_service_mock.get_user_with_roles_by_user_name.assert_called_once()
+        self.assertEqual(1, auth_service.get_token_cache_stats()["hits"])
+        self.assertEqual(1, auth_service.get_token_cache_stats()["misses"])
+
+    def test_should_verify_token_again_after_blacklisting(self):
+        # given
+        auth_service.authenticate("Bearer test")
 
-    def test_should_not_authenticate_test_bearer(self):
+        # when
+        auth_service.blacklist_token("Bearer test")
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = BlacklistedTokenEntity()
+        principal = auth_service.authenticate("Bearer test")
+
+        # then
+        self.assertIsNone(principal)
+
+    def test_should_verify_token_again_after_user_change(self):
         # given
-        token = "Bearer " + auth_service.TEST_BEARER_TOKEN
-        required_roles = ["role_test"]
+        auth_service.authenticate("Bearer test")
 
-        self.properties_mock.get_test_bearer_enabled.return_value = False
+        # when
+        user_events.publish_user_changed("test_user")
+        auth_service.authenticate("Bearer test")
+
+        # then
+        self.assertEqual(2, self.user_service_mock.get_user_with_roles_by_user_name.call_count)
+
+
+class BlacklistFilterTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        self.jwt_mock = create_autospec(jwt)
+        self.properties_mock = create_autospec(properties)
+        self.blacklisted_token_repository_mock = create_autospec(blacklisted_token_repository)
+        self.user_service_mock = create_autospec(user_service)
+        auth_service.jwt = self.jwt_mock
+        auth_service.properties = self.properties_mock
+        auth_service.blacklisted_token_repository = self.blacklisted_token_repository_mock
+        auth_service.user_service = self.user_service_mock
+        self.db_access_mock = create_autospec(db_access)
+        self.after_commit_callbacks = list()
+        self.db_access_mock.run_after_commit.side_effect = self.after_commit_callbacks.append
+        auth_service.db_access = self.db_access_mock
+
+        self.properties_mock.get_blacklist_filter_rebuild_interval.return_value = "600"
+        self.blacklisted_token_repository_mock.read_all_token_hashes.return_value = [hash_token("blacklisted")]
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = None
+        auth_service.init_blacklist_filter()
+
+    def tearDown(self):
+        auth_service.jwt = jwt
+        auth_service.properties = properties
+        auth_service.blacklisted_token_repository = blacklisted_token_repository
+        auth_service.user_service = user_service
+        auth_service.db_access = db_access
+        auth_service.blacklist_filter = None
+        auth_service.blacklist_filter_rebuild_interval = auth_service.DEFAULT_BLACKLIST_FILTER_REBUILD_INTERVAL
+        auth_service._recently_blacklisted_token_hashes = list()
+
+    def test_should_not_query_database_when_token_is_not_in_filter(self):
+        # given
+        self.jwt_mock.decode.side_effect = InvalidTokenError
 
         # when
-        response = auth_service.are_roles_sufficient(token, required_roles)
+        auth_service.authenticate("Bearer test")
 
         # then
-        self.assertFalse(response)
+        self.blacklisted_token_repository_mock.read_by_token_hash.assert_not_called()
 
-    def test_should_not_authenticate_blacklisted_token(self):
+    def test_should_query_database_when_token_is_in_filter(self):
         # given
-        token = "Bearer test"
-        required_roles = ["role_test"]
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = BlacklistedTokenEntity()
 
-        blacklisted_token = BlacklistedTokenEntity()
-        blacklisted_token.token = "test"
+        # when
+        principal = auth_service.authenticate("Bearer blacklisted")
 
-        self.blacklisted_token_repository_mock.read_by_token.return_value = blacklisted_token
+        # then
+        self.assertIsNone(principal)
+        self.blacklisted_token_repository_mock.read_by_token_hash.assert_called_once_with(hash_token("blacklisted"))
 
+    def test_should_add_blacklisted_token_to_filter_after_commit(self):
         # when
-        response = auth_service.are_roles_sufficient(token, required_roles)
+        auth_service.blacklist_token("Bearer test")
 
         # then
-        self.assertFalse(response)
+        self.assertFalse(auth_service.blacklist_filter.might_contain(hash_token("test")))
 
-    def test_should_not_authenticate_expired_token(self):
+        # when
+        for callback in self.after_commit_callbacks:
+            callback()
+
+        # then
+        self.assertTrue(auth_service.blacklist_filter.might_contain(hash_token("test")))
+
+    def test_should_keep_tokens_blacklisted_during_rebuild(self):
         # given
-        token = "Bearer test"
-        required_roles = ["role_test"]
+        def read_all_token_hashes():
+            # Another request blacklists a token while the rebuild reads the database.
+            auth_service.blacklist_token("Bearer test")
+            for callback in self.after_commit_callbacks:
+                callback()
 
-        self.blacklisted_token_repository_mock.read_by_token.return_value = None
-        self.jwt_mock.decode.side_effect = ExpiredSignatureError
+            return [hash_token("blacklisted")]
+
+        self.blacklisted_token_repository_mock.read_all_token_hashes.side_effect = read_all_token_hashes
 
         # when
-        response = auth_service.are_roles_sufficient(token, required_roles)
+        auth_service._build_blacklist_filter()
 
         # then
-        self.assertFalse(response)
+        self.assertTrue(auth_service.blacklist_filter.might_contain(hash_token("test")))
 
-    def test_should_not_authenticate_invalid_sub(self):
+    def test_should_rebuild_filter_when_it_is_outdated(self):
         # given
-        token = "Bearer test"
-        required_roles = ["role_test"]
+        auth_service.blacklist_filter_rebuild_interval = 0
+        self.blacklisted_token_repository_mock.read_all_token_hashes.return_value = [
+            hash_token("blacklisted"), hash_token("test")
+        ]
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = BlacklistedTokenEntity()
 
-        self.blacklisted_token_repository_mock.read_by_token.return_value = None
-        self.jwt_mock.decode.return_value = {
-            "iat": datetime.utcnow() - timedelta(minutes=10),
-            "exp": datetime.utcnow() + timedelta(minutes=10),
-            "sub": "test_user"
-        }
+        # when
+        principal = auth_service.authenticate("Bearer test")
 
-        self.user_service_mock.get_user_by_user_name.return_value = None
+        # then
+        self.assertIsNone(principal)
+        self.assertEqual(2, self.blacklisted_token_repository_mock.read_all_token_hashes.call_count)
+
+    def test_should_read_rebuild_interval_only_on_init(self):
+        # given
+        self.jwt_mock.decode.side_effect = InvalidTokenError
+
+        # when
+        auth_service.authenticate("Bearer test")
+        auth_service.authenticate("Bearer test")
+
+        # then
+        self.properties_mock.get_blacklist_filter_rebuild_interval.assert_called_once()
+        self.assertEqual(600, auth_service.blacklist_filter_rebuild_interval)
+
+
+class HasSufficientRolesTest(TestCase):
 
+    def test_should_return_false_when_principal_is_none(self):
         # when
-        response = auth_service.are_roles_sufficient(token, required_roles)
+        response = auth_service.has_sufficient_roles(None, 0)
 
         # then
         self.assertFalse(response)
 
-    def test_should_return_false_when_roles_are_not_sufficient(self):
+    def test_should_return_true_when_no_roles_are_required(self):
         # given
-        token = "Bearer test"
-        required_roles = ["role_test"]
+        principal = {"user_id": 1, "user_name": "test_user", "roles": [], "role_mask": 0, "claims": {}}
 
-        self.blacklisted_token_repository_mock.read_by_token.return_value = None
-        self.jwt_mock.decode.return_value = {
-            "iat": datetime.utcnow() - timedelta(minutes=10),
-            "exp": datetime.utcnow() + timedelta(minutes=10),
-            "sub": "test_user"
-        }
-        self.user_service_mock.get_user_by_user_name.return_value = {
-            "id": 1,
-            "user_name": "test_user"
+        # when
+        response = auth_service.has_sufficient_roles(principal, get_required_role_mask([]))
+
+        # then
+        self.assertTrue(response)
+
+    def test_should_return_false_when_roles_are_not_sufficient(self):
+        # given
+        principal = {
+            "user_id": 1,
+            "user_name": "test_user",
+            "roles": [ROLE_SHOW_USERS],
+            "role_mask": get_role_mask([ROLE_SHOW_USERS]),
+            "claims": {}
         }
-        self.user_roles_service_mock.get_user_roles.return_value = [
-            "role_test_2",
-            "tole_test_3"
-        ]
 
         # when
-        response = auth_service.are_roles_sufficient(token, required_roles)
+        response = auth_service.has_sufficient_roles(principal, get_required_role_mask([ROLE_CREATE_USER]))
 
         # then
         self.assertFalse(response)
 
-    def test_should_authenticate_user_with_sufficient_roles(self):
+    def test_should_return_true_when_roles_are_sufficient(self):
         # given
-        token = "Bearer test"
-        required_roles = ["role_test"]
-
-        self.blacklisted_token_repository_mock.read_by_token.return_value = None
-        self.jwt_mock.decode.return_value = {
-            "iat": datetime.utcnow() - timedelta(minutes=10),
-            "exp": datetime.utcnow() + timedelta(minutes=10),
-            "sub": "test_user"
+        principal = {
+            "user_id": 1,
+            "user_name": "test_user",
+            "roles": [ROLE_SHOW_USERS, ROLE_CREATE_USER],
+            "role_mask": get_role_mask([ROLE_SHOW_USERS, ROLE_CREATE_USER]),
+            "claims": {}
         }
-        self.user_service_mock.get_user_by_user_name.return_value = {
-            "id": 1,
-            "user_name": "test_user"
-        }
-        self.user_roles_service_mock.get_user_roles.return_value = [
-            "role_test",
-            "role_test_2",
-            "tole_test_3"
-        ]
 
         # when
-        response = auth_service.are_roles_sufficient(token, required_roles)
+        response = auth_service.has_sufficient_roles(
+            principal,
+            get_required_role_mask([ROLE_CREATE_USER, ROLE_START_CAMPAIGN])
+        )
 
         # then
         self.assertTrue(response)
@@ -534,14 +823,28 @@ class BlacklistTokenTest(TestCase):
     def setUp(self):
         assertModelInitialized()
         self.blacklisted_token_repository_mock = create_autospec(blacklisted_token_repository)
+        self.properties_mock = create_autospec(properties)
+        self.jwt_mock = create_autospec(jwt)
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = None
+        self.db_access_mock = create_autospec(db_access)
         auth_service.blacklisted_token_repository = self.blacklisted_token_repository_mock
+        auth_service.properties = self.properties_mock
+        auth_service.jwt = self.jwt_mock
+        auth_service.db_access = self.db_access_mock
 
     def tearDown(self):
         auth_service.blacklisted_token_repository = blacklisted_token_repository
+        auth_service.properties = properties
+        auth_service.jwt = jwt
+        auth_service.db_access = db_access
 
     def test_should_blacklist_token(self):
         # given
         token = "Bearer test-token"
+        self.jwt_mock.decode.return_value = {
+            "sub": "test_user",
+            "exp": datetime(2030, 1, 1, 12, 0, 0).replace(tzinfo=timezone.utc).timestamp()
+        }
 
         # when
         auth_service.blacklist_token(token)
@@ -551,4 +854,56 @@ class BlacklistTokenTest(TestCase):
 
         blacklisted_token = self.blacklisted_token_repository_mock.persist.call_args[0][0]
         self.assertIsInstance(blacklisted_token, BlacklistedTokenEntity)
-        self.assertEqual("test-token", blacklisted_token.token)
+        self.assertEqual(hash_token("test-token"), blacklisted_token.token_hash)
+        self.assertEqual(datetime(2030, 1, 1, 12, 0, 0), blacklisted_token.expires_on)
+
+    def test_should_skip_token_already_blacklisted(self):
+        # given
+        self.blacklisted_token_repository_mock.read_by_token_hash.return_value = BlacklistedTokenEntity()
+
+        # when
+        auth_service.blacklist_token("Bearer " + auth_service.TEST_BEARER_TOKEN)
+
+        # then
+        self.blacklisted_token_repository_mock.read_by_token_hash.assert_called_once_with(
+            hash_token(auth_service.TEST_BEARER_TOKEN)
+        )
+        self.blacklisted_token_repository_mock.persist.assert_not_called()
+
+    def test_should_blacklist_token_without_expiration_time(self):
+        # given
+        token = "Bearer " + auth_service.TEST_BEARER_TOKEN
+        self.jwt_mock.decode.side_effect = InvalidTokenError
+        self.properties_mock.get_token_expiration_time.return_value = "60"
+
+        # when
+        auth_service.blacklist_token(token)
+
+        # then
+        blacklisted_token = self.blacklisted_token_repository_mock.persist.call_args[0][0]
+        self.assertGreater(blacklisted_token.expires_on, datetime.utcnow() + timedelta(minutes=59))
+
+
+class PurgeExpiredBlacklistedTokensTest(TestCase):
+
+    def setUp(self):
+        self.blacklisted_token_repository_mock = create_autospec(blacklisted_token_repository)
+        self.properties_mock = create_autospec(properties)
+        auth_service.blacklisted_token_repository = self.blacklisted_token_repository_mock
+        auth_service.properties = self.properties_mock
+
+    def tearDown(self):
+        auth_service.blacklisted_token_repository = blacklisted_token_repository
+        auth_service.properties = properties
+
+    def test_should_delete_one_batch_of_expired_tokens(self):
+        # given
+        self.properties_mock.get_blacklist_purge_batch_size.return_value = "50"
+        self.blacklisted_token_repository_mock.delete_expired.return_value = 50
+
+        # when
+        deleted = auth_service.purge_expired_blacklisted_tokens()
+
+        # then
+        self.assertEqual(50, deleted)
+        self.assertEqual(50, self.blacklisted_token_repository_mock.delete_expired.call_args[0][1])
@@ -0,0 +1,64 @@
+"""
+The testing module for the login throttle.
+"""
+
+from unittest import TestCase
+from unittest.mock import create_autospec
+
+from artushima.auth import login_throttle
+from artushima.core import properties
+
+
+class IsAttemptAllowedTest(TestCase):
+
+    def setUp(self):
+        self.properties_mock = create_autospec(properties)
+        self.properties_mock.get_login_address_rate.return_value = "0"
+        self.properties_mock.get_login_address_burst.return_value = "3"
+        self.properties_mock.get_login_user_rate.return_value = "0"
+        self.properties_mock.get_login_user_burst.return_value = "2"
+        login_throttle.properties = self.properties_mock
+
+    def tearDown(self):
+        login_throttle.properties = properties
+        login_throttle.address_limiter = None
+        login_throttle.user_limiter = None
+
+    def test_should_allow_all_attempts_when_not_initialized(self):
+        # when
+        results = [login_throttle.is_attempt_allowed("127.0.0.1", "test_user") for _ in range(10)]
+
+        # then
+        self.assertTrue(all(results))
+
+    def test_should_throttle_attempts_for_user_name(self):
+        # given
+        login_throttle.init()
+
+        # when
+        results = [login_throttle.is_attempt_allowed("127.0.0.1", "test_user") for _ in range(3)]
+
+        # then
+        self.assertEqual([True, True, False], results)
+
+    def test_should_throttle_attempts_from_address(self):
+        # given
+        login_throttle.init()
+
+        # when
+        results = [login_throttle.is_attempt_allowed("127.0.0.1", f"test_user_{i}") for i in range(4)]
+
+        # then
+        self.assertEqual([True, True, True, False], results)
+
+    def test_should_not_use_up_address_limit_on_attempts_rejected_for_user_name(self):
+        # given
+        login_throttle.init()
+
+        # when
+        user_results = [login_throttle.is_attempt_allowed("127.0.0.1", "test_user") for _ in range(4)]
+        other_user_result = login_throttle.is_attempt_allowed("127.0.0.1", "other_user")
+
+        # then
+        self.assertEqual([True, True, False, False], user_results)
+        self.assertTrue(other_user_result)
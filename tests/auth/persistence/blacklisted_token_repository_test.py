@@ -2,10 +2,11 @@
 The testing module for the blacklisted token repository.
 """
 
+from datetime import datetime, timedelta
 from unittest import TestCase
 
 from artushima.auth.persistence import blacklisted_token_repository
-from artushima.auth.persistence.model import BlacklistedTokenEntity
+from artushima.auth.persistence.model import BlacklistedTokenEntity, hash_token
 from artushima.core import db_access, properties
 from artushima.core.exceptions import PersistenceError
 
@@ -24,7 +25,8 @@ class PersistTest(TestCase):
     def test_should_persist_new_blacklisted_token(self):
         # given
         blacklisted_token = BlacklistedTokenEntity()
-        blacklisted_token.token = "test-token"
+        blacklisted_token.token_hash = hash_token("test-token")
+        blacklisted_token.expires_on = datetime.utcnow() + timedelta(minutes=60)
 
         # when
         blacklisted_token_repository.persist(blacklisted_token)
@@ -49,7 +51,7 @@ class PersistTest(TestCase):
             blacklisted_token_repository.persist(blacklisted_token)
 
 
-class ReadByTokenTest(TestCase):
+class ReadByTokenHashTest(TestCase):
 
     def setUp(self):
         properties.init()
@@ -60,23 +62,105 @@ class ReadByTokenTest(TestCase):
         self.session.rollback()
         self.session.close()
 
-    def test_should_get_token_by_token_value(self):
+    def test_should_get_token_by_token_hash(self):
         # given
         blacklisted_token = BlacklistedTokenEntity()
-        blacklisted_token.token = "test-token"
+        blacklisted_token.token_hash = hash_token("test-token")
+        blacklisted_token.expires_on = datetime.utcnow() + timedelta(minutes=60)
 
         self.session.add(blacklisted_token)
         self.session.flush()
 
         # when
-        found_token = blacklisted_token_repository.read_by_token("test-token")
+        found_token = blacklisted_token_repository.read_by_token_hash(hash_token("test-token"))
 
         # then
         self.assertIsNotNone(found_token)
 
     def test_should_get_none_when_token_does_not_exist(self):
         # when
-        found_token = blacklisted_token_repository.read_by_token("test-token")
+        found_token = blacklisted_token_repository.read_by_token_hash(hash_token("test-token"))
 
         # then
         self.assertIsNone(found_token)
+
+
+class ReadAllTokenHashesTest(TestCase):
+
+    def setUp(self):
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def test_should_read_all_token_hashes(self):
+        # given
+        blacklisted_token_1 = BlacklistedTokenEntity()
+        blacklisted_token_1.token_hash = hash_token("test-token-1")
+        blacklisted_token_1.expires_on = datetime.utcnow() + timedelta(minutes=60)
+
+        blacklisted_token_2 = BlacklistedTokenEntity()
+        blacklisted_token_2.token_hash = hash_token("test-token-2")
+        blacklisted_token_2.expires_on = datetime.utcnow() + timedelta(minutes=60)
+
+        self.session.add(blacklisted_token_1)
+        self.session.add(blacklisted_token_2)
+        self.session.flush()
+
+        # when
+        token_hashes = blacklisted_token_repository.read_all_token_hashes()
+
+        # then
+        self.assertIn(hash_token("test-token-1"), token_hashes)
+        self.assertIn(hash_token("test-token-2"), token_hashes)
+
+
+class DeleteExpiredTest(TestCase):
+
+    def setUp(self):
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def _create_blacklisted_token(self, token, expires_on):
+        blacklisted_token = BlacklistedTokenEntity()
+        blacklisted_token.token_hash = hash_token(token)
+        blacklisted_token.expires_on = expires_on
+        self.session.add(blacklisted_token)
+        return blacklisted_token
+
+    def test_should_delete_only_expired_tokens(self):
+        # given
+        now = datetime.utcnow()
+        self._create_blacklisted_token("expired-token", now - timedelta(minutes=1))
+        self._create_blacklisted_token("valid-token", now + timedelta(minutes=60))
+        self.session.flush()
+
+        # when
+        deleted = blacklisted_token_repository.delete_expired(now, 100)
+
+        # then
+        self.assertEqual(1, deleted)
+        self.assertIsNone(blacklisted_token_repository.read_by_token_hash(hash_token("expired-token")))
+        self.assertIsNotNone(blacklisted_token_repository.read_by_token_hash(hash_token("valid-token")))
+
+    def test_should_delete_at_most_batch_size_tokens(self):
+        # given
+        now = datetime.utcnow()
+        for i in range(3):
+            self._create_blacklisted_token(f"expired-token-{i}", now - timedelta(minutes=1))
+        self.session.flush()
+
+        # when
+        deleted = blacklisted_token_repository.delete_expired(now, 2)
+
+        # then
+        self.assertEqual(2, deleted)
+        self.assertEqual(1, blacklisted_token_repository.delete_expired(now, 2))
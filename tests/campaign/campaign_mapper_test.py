@@ -197,6 +197,67 @@ class MapCreateTimelineEntryRequest(TestCase):
             campaign_mapper.map_create_timeline_entry_request(data_json, list())
 
 
+class MapCreateTimelineEntriesRequest(TestCase):
+
+    def test_should_map_all_entries(self):
+        # given
+        data_json = [
+            {"title": "Test 1", "sessionDate": "2050-01-01"},
+            {"title": "Test 2", "sessionDate": "2050-01-02", "summaryText": "Test test."}
+        ]
+
+        # when
+        result = campaign_mapper.map_create_timeline_entries_request(data_json, 1)
+
+        # then
+        self.assertEqual(["Test 1", "Test 2"], [entry["title"] for entry in result])
+        self.assertEqual([1, 1], [entry["campaignId"] for entry in result])
+
+    def test_should_get_domain_error_when_data_is_not_a_list(self):
+        # when
+        with self.assertRaises(DomainError) as context:
+            campaign_mapper.map_create_timeline_entries_request({"title": "Test"}, 1)
+
+        # then
+        self.assertEqual("DC005", context.exception.error_code)
+
+    def test_should_get_domain_error_when_list_is_empty(self):
+        # when
+        with self.assertRaises(DomainError) as context:
+            campaign_mapper.map_create_timeline_entries_request([], 1)
+
+        # then
+        self.assertEqual("DC005", context.exception.error_code)
+
+    def test_should_get_domain_error_when_any_entry_is_not_an_object(self):
+        # given
+        data_json = [
+            {"title": "Test 1", "sessionDate": "2050-01-01"},
+            "Test 2"
+        ]
+
+        # when
+        with self.assertRaises(DomainError) as context:
+            campaign_mapper.map_create_timeline_entries_request(data_json, 1)
+
+        # then
+        self.assertEqual("DC005", context.exception.error_code)
+
+    def test_should_get_domain_error_when_any_entry_is_invalid(self):
+        # given
+        data_json = [
+            {"title": "Test 1", "sessionDate": "2050-01-01"},
+            {"title": "Test 2"}
+        ]
+
+        # when
+        with self.assertRaises(DomainError) as context:
+            campaign_mapper.map_create_timeline_entries_request(data_json, 1)
+
+        # then
+        self.assertEqual("DC004", context.exception.error_code)
+
+
 class MapTimelineEntryDataToTimelineEntity(TestCase):
 
     def test_should_map_data_to_entity(self):
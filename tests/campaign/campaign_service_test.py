@@ -3,14 +3,15 @@ The test module for the campaign service module.
 """
 
 from datetime import date, datetime
+from types import SimpleNamespace
 from unittest import TestCase
 from unittest.mock import create_autospec
 
-from artushima.campaign import campaign_service
+from artushima.campaign import campaign_service, timeline_search_index
 from artushima.campaign.persistence import campaign_repository
 from artushima.campaign.persistence.model import CampaignEntity
+from artushima.core import db_access
 from artushima.core.exceptions import BusinessError, DomainError
-from artushima.user import user_service
 from artushima.user.persistence.model import UserEntity
 
 
@@ -42,118 +43,96 @@ class CreateCampaignTest(TestCase):
         self.assertEqual(begin_date, campaign_entity.begin_date)
         self.assertEqual(passed_days, campaign_entity.passed_days)
         self.assertEqual(gm_id, campaign_entity.game_master_id)
-        self.assertEqual(2, len(campaign_entity.campaign_history_entries))
-        self.assertEqual(editor_name, campaign_entity.campaign_history_entries[0].editor_name)
-        self.assertEqual(editor_name, campaign_entity.campaign_history_entries[1].editor_name)
+        history_entries = list(campaign_entity.campaign_history_entries)
+        self.assertEqual(2, len(history_entries))
+        self.assertEqual(editor_name, history_entries[0].editor_name)
+        self.assertEqual(editor_name, history_entries[1].editor_name)
 
 
-class GetCampaignsByGmIdTest(TestCase):
+class GetCampaignNamesByGmIdTest(TestCase):
 
     def setUp(self):
-        self.user_service_mock = create_autospec(user_service)
         self.campaign_repository_mock = create_autospec(campaign_repository)
-        campaign_service.user_service = self.user_service_mock
         campaign_service.campaign_repository = self.campaign_repository_mock
 
     def tearDown(self):
-        campaign_service.user_service = user_service
         campaign_service.campaign_repository = campaign_repository
 
-    def test_should_get_campaigns(self):
+    def test_should_get_campaign_names(self):
         # given
-        campaign = CampaignEntity()
-        campaign.campaign_name = "campaign 1"
-        campaign.begin_date = date(2055, 1, 1)
-        campaign.passed_days = 10
-
-        self.campaign_repository_mock.read_by_gm_id.return_value = [campaign]
-        self.user_service_mock.get_user_by_user_name.return_value = {
-            "id": 1,
-            "user_name": "test_user"
-        }
+        self.campaign_repository_mock.read_names_by_gm_id.return_value = [
+            SimpleNamespace(gm_id=1, id=10, campaign_name="campaign 1"),
+            SimpleNamespace(gm_id=1, id=11, campaign_name="campaign 2")
+        ]
 
         # when
-        campaigns = campaign_service.get_campaigns_by_gm_id(1)
+        campaigns = campaign_service.get_campaign_names_by_gm_id(1)
 
         # then
-        self.assertIsNotNone(campaigns)
-        self.assertEqual(1, len(campaigns))
-        self.assertEqual("campaign 1", campaigns[0]["campaign_name"])
-        self.assertEqual(date(2055, 1, 1), campaigns[0]["begin_date"])
-        self.assertEqual(10, campaigns[0]["passed_days"])
+        self.assertEqual([{"id": 10, "campaign_name": "campaign 1"}, {"id": 11, "campaign_name": "campaign 2"}],
+                         campaigns)
 
-    def test_should_get_business_error_when_gm_id_is_none(self):
-        # when then
-        with self.assertRaises(BusinessError):
-            campaign_service.get_campaigns_by_gm_id(None)
+    def test_should_get_empty_list_when_gm_has_no_campaigns(self):
+        # given
+        self.campaign_repository_mock.read_names_by_gm_id.return_value = [
+            SimpleNamespace(gm_id=1, id=None, campaign_name=None)
+        ]
 
-    def test_should_get_value_error_when_gm_id_is_not_int(self):
-        # when then
-        with self.assertRaises(ValueError):
-            campaign_service.get_campaigns_by_gm_id("1")
+        # when
+        campaigns = campaign_service.get_campaign_names_by_gm_id(1)
+
+        # then
+        self.assertEqual([], campaigns)
 
     def test_should_get_business_error_when_gm_of_given_id_does_not_exist(self):
         # given
-        self.user_service_mock.get_user_by_id.return_value = None
+        self.campaign_repository_mock.read_names_by_gm_id.return_value = []
 
         # when then
         with self.assertRaises(BusinessError):
-            campaign_service.get_campaigns_by_gm_id(1)
+            campaign_service.get_campaign_names_by_gm_id(1)
 
 
-class GetCampaignDetailsTest(TestCase):
+class GetCampaignDetailsForUserTest(TestCase):
 
     def setUp(self):
         self.campaign_repository_mock = create_autospec(campaign_repository)
         campaign_service.campaign_repository = self.campaign_repository_mock
 
-    def tearDown(self):
-        campaign_service.campaign_repository = campaign_repository
+        gm = UserEntity()
+        gm.id = 88
+        gm.user_name = "Test User"
 
-    def test_should_get_campaign_details(self):
-        # given
         campaign = CampaignEntity()
         campaign.id = 99
         campaign.created_on = datetime(2020, 1, 1, 12, 12, 12)
-        campaign.modified_on = datetime(2020, 1, 1, 13, 13, 13)
-        campaign.opt_lock = 0
         campaign.campaign_name = "Test Campaign"
         campaign.begin_date = date(2055, 1, 1)
         campaign.passed_days = 10
-
-        gm = UserEntity()
-        gm.id = 88
-        gm.created_on = date(2019, 1, 1)
-        gm.modified_on = date(2019, 1, 1)
-        gm.opt_lock = 0
-        gm.user_name = "Test User"
-
         campaign.game_master = gm
 
         self.campaign_repository_mock.read_by_id.return_value = campaign
 
+    def tearDown(self):
+        campaign_service.campaign_repository = campaign_repository
+
+    def test_should_get_campaign_details_when_user_is_game_master(self):
         # when
-        campaign_details = campaign_service.get_campaign_details(99)
+        campaign_details = campaign_service.get_campaign_details_for_user(88, 99)
 
         # then
         self.assertEqual(99, campaign_details["id"])
-        self.assertEqual("Test Campaign", campaign_details["title"])
-        self.assertEqual("2020-01-01T12:12:12", campaign_details["creationDate"])
-        self.assertEqual("2055-01-01", campaign_details["startDate"])
-        self.assertEqual(10, campaign_details["passedDays"])
-        self.assertEqual("2055-01-11", campaign_details["currentDate"])
-        self.assertEqual(88, campaign_details["gameMasterId"])
         self.assertEqual("Test User", campaign_details["gameMasterName"])
+        self.campaign_repository_mock.read_by_id.assert_called_once_with(
+            99, campaign_repository.PROFILE_WITH_GAME_MASTER
+        )
 
-    def test_should_get_business_error_when_campaign_id_is_none(self):
-        # when then
-        with self.assertRaises(BusinessError):
-            campaign_service.get_campaign_details(None)
+    def test_should_get_none_when_user_is_not_related_to_campaign(self):
+        # when
+        campaign_details = campaign_service.get_campaign_details_for_user(77, 99)
 
-    def test_should_get_value_error_when_campaign_id_is_not_int(self):
-        # when then
-        with self.assertRaises(ValueError):
-            campaign_service.get_campaign_details("1")
+        # then
+        self.assertIsNone(campaign_details)
 
     def test_should_get_business_error_when_campaign_of_given_id_does_not_exist(self):
         # given
@@ -161,17 +140,104 @@ class GetCampaignDetailsTest(TestCase):
 
         # when then
         with self.assertRaises(BusinessError):
-            campaign_service.get_campaign_details(1)
+            campaign_service.get_campaign_details_for_user(88, 99)
+
+
+class GetTimelinePageTest(TestCase):
+
+    def setUp(self):
+        self.campaign_repository_mock = create_autospec(campaign_repository)
+        campaign_service.campaign_repository = self.campaign_repository_mock
+
+    def tearDown(self):
+        campaign_service.campaign_repository = campaign_repository
+
+    def test_should_get_page_with_last_position_when_there_are_more_entries(self):
+        # given
+        self.campaign_repository_mock.read_timeline_page.return_value = [
+            SimpleNamespace(id=3, title="entry_1", session_date=date(2020, 1, 1)),
+            SimpleNamespace(id=4, title="entry_2", session_date=date(2020, 2, 1))
+        ]
+
+        # when
+        page = campaign_service.get_timeline_page(1, {"sessionDate": date(2019, 12, 1), "id": 2}, 1)
+
+        # then
+        self.assertEqual([{"id": 3, "title": "entry_1", "sessionDate": date(2020, 1, 1)}], page["entries"])
+        self.assertEqual({"sessionDate": date(2020, 1, 1), "id": 3}, page["last"])
+        self.campaign_repository_mock.read_timeline_page.assert_called_once_with(1, date(2019, 12, 1), 2, 2)
+
+    def test_should_get_last_page_without_last_position(self):
+        # given
+        self.campaign_repository_mock.read_timeline_page.return_value = [
+            SimpleNamespace(id=3, title="entry_1", session_date=date(2020, 1, 1))
+        ]
+
+        # when
+        page = campaign_service.get_timeline_page(1, None, 10)
+
+        # then
+        self.assertEqual(1, len(page["entries"]))
+        self.assertIsNone(page["last"])
+        self.campaign_repository_mock.read_timeline_page.assert_called_once_with(1, None, None, 11)
+
+
+class SearchTimelineTest(TestCase):
+
+    def setUp(self):
+        self.campaign_repository_mock = create_autospec(campaign_repository)
+        self.timeline_search_index_mock = create_autospec(timeline_search_index)
+        self.timeline_search_index_mock.is_initialized.return_value = True
+        campaign_service.campaign_repository = self.campaign_repository_mock
+        campaign_service.timeline_search_index = self.timeline_search_index_mock
+
+    def tearDown(self):
+        campaign_service.campaign_repository = campaign_repository
+        campaign_service.timeline_search_index = timeline_search_index
+
+    def test_should_get_found_entries_in_rank_order(self):
+        # given
+        self.timeline_search_index_mock.search.return_value = [5, 3, 4]
+        self.campaign_repository_mock.read_timeline_entries_by_ids.return_value = [
+            SimpleNamespace(id=3, title="entry_3", session_date=date(2020, 1, 3)),
+            SimpleNamespace(id=5, title="entry_5", session_date=date(2020, 1, 5))
+        ]
+
+        # when
+        page = campaign_service.search_timeline(1, "moloch", 0, 2)
+
+        # then
+        self.assertEqual([5, 3], [entry["id"] for entry in page["entries"]])
+        self.assertEqual(2, page["next_offset"])
+        self.timeline_search_index_mock.search.assert_called_once_with(1, "moloch", 0, 3)
+
+    def test_should_raise_domain_error_when_index_is_not_initialized(self):
+        # given
+        self.timeline_search_index_mock.is_initialized.return_value = False
+
+        # when then
+        with self.assertRaises(DomainError) as context:
+            campaign_service.search_timeline(1, "moloch", 0, 2)
+
+        self.assertEqual(503, context.exception.http_status)
 
 
 class CreateTimelineEntryTest(TestCase):
 
     def setUp(self):
         self.campaign_repository_mock = create_autospec(campaign_repository)
+        self.timeline_search_index_mock = create_autospec(timeline_search_index)
+        self.db_access_mock = create_autospec(db_access)
+        self.after_commit_callbacks = list()
+        self.db_access_mock.run_after_commit.side_effect = self.after_commit_callbacks.append
         campaign_service.campaign_repository = self.campaign_repository_mock
+        campaign_service.timeline_search_index = self.timeline_search_index_mock
+        campaign_service.db_access = self.db_access_mock
 
     def tearDown(self):
         campaign_service.campaign_repository = campaign_repository
+        campaign_service.timeline_search_index = timeline_search_index
+        campaign_service.db_access = db_access
 
     def test_should_create_timeline_entry(self):
         # given
@@ -198,10 +264,37 @@ class CreateTimelineEntryTest(TestCase):
         campaign_service.create_timeline_entry(entry_data, editor_name)
 
         # then
-        self.assertEqual(len(campaign.campaign_timeline_entries), 1)
-        self.assertEqual(len(campaign.campaign_history_entries), 1)
+        self.assertEqual(len(list(campaign.campaign_timeline_entries)), 1)
+        self.assertEqual(len(list(campaign.campaign_history_entries)), 1)
         self.campaign_repository_mock.persist.assert_called_once_with(campaign)
 
+    def test_should_index_timeline_entry_after_commit(self):
+        # given
+        campaign = CampaignEntity()
+        campaign.id = 99
+
+        self.campaign_repository_mock.read_by_id.return_value = campaign
+
+        entry_data = {
+            "title": "Test entry",
+            "sessionDate": date.fromisoformat("2020-01-01"),
+            "summaryText": "Test text",
+            "campaignId": campaign.id
+        }
+
+        # when
+        campaign_service.create_timeline_entry(entry_data, "Test user")
+
+        # then
+        self.timeline_search_index_mock.add_entry.assert_not_called()
+
+        # when
+        for callback in self.after_commit_callbacks:
+            callback()
+
+        # then
+        self.timeline_search_index_mock.add_entry.assert_called_once_with(99, None, "Test entry", "Test text")
+
     def test_should_get_domain_error_when_campaign_does_not_exist(self):
         # given
         self.campaign_repository_mock.read_by_id.return_value = None
@@ -219,6 +312,73 @@ class CreateTimelineEntryTest(TestCase):
             campaign_service.create_timeline_entry(entry_data, editor_name)
 
 
+class CreateTimelineEntriesTest(TestCase):
+
+    def setUp(self):
+        self.campaign_repository_mock = create_autospec(campaign_repository)
+        self.timeline_search_index_mock = create_autospec(timeline_search_index)
+        self.db_access_mock = create_autospec(db_access)
+        self.after_commit_callbacks = list()
+        self.db_access_mock.run_after_commit.side_effect = self.after_commit_callbacks.append
+        campaign_service.campaign_repository = self.campaign_repository_mock
+        campaign_service.timeline_search_index = self.timeline_search_index_mock
+        campaign_service.db_access = self.db_access_mock
+
+    def tearDown(self):
+        campaign_service.campaign_repository = campaign_repository
+        campaign_service.timeline_search_index = timeline_search_index
+        campaign_service.db_access = db_access
+
+    def test_should_insert_all_entries_at_once(self):
+        # given
+        self.campaign_repository_mock.lock_by_id.return_value = True
+        self.campaign_repository_mock.insert_timeline_entries.return_value = [7, 8]
+
+        entries_data = [
+            {"title": f"Entry {i}", "sessionDate": date(2020, 1, i), "summaryText": None, "campaignId": 99}
+            for i in (1, 2)
+        ]
+
+        # when
+        entry_ids = campaign_service.create_timeline_entries(99, entries_data, "Test user")
+
+        # then
+        self.assertEqual([7, 8], entry_ids)
+
+        timeline_rows = self.campaign_repository_mock.insert_timeline_entries.call_args[0][0]
+        self.assertEqual(["Entry 1", "Entry 2"], [row["title"] for row in timeline_rows])
+
+        history_rows = self.campaign_repository_mock.insert_history_entries.call_args[0][0]
+        self.assertEqual(2, len(history_rows))
+        self.assertEqual({99}, {row["campaign_id"] for row in history_rows})
+        self.assertEqual({"Test user"}, {row["editor_name"] for row in history_rows})
+
+        self.timeline_search_index_mock.add_entries.assert_not_called()
+
+        # when
+        for callback in self.after_commit_callbacks:
+            callback()
+
+        # then
+        self.timeline_search_index_mock.add_entries.assert_called_once_with([
+            (99, 7, "Entry 1", None),
+            (99, 8, "Entry 2", None)
+        ])
+
+    def test_should_get_domain_error_when_campaign_does_not_exist(self):
+        # given
+        self.campaign_repository_mock.lock_by_id.return_value = False
+
+        entries_data = [{"title": "Entry", "sessionDate": date(2020, 1, 1), "summaryText": None, "campaignId": 99}]
+
+        # when
+        with self.assertRaises(DomainError):
+            campaign_service.create_timeline_entries(99, entries_data, "Test user")
+
+        # then
+        self.campaign_repository_mock.insert_timeline_entries.assert_not_called()
+
+
 class CheckIfCampaignGMTest(TestCase):
 
     def setUp(self):
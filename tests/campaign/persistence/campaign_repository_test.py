@@ -5,6 +5,8 @@ The test module for the campaign repository module.
 from datetime import date, datetime
 from unittest import TestCase
 
+from sqlalchemy import inspect
+
 from artushima.campaign.persistence import campaign_repository
 from artushima.campaign.persistence.model import (CampaignEntity,
                                                   CampaignHistoryEntity,
@@ -176,6 +178,34 @@ class ReadByIdTest(TestCase):
         # then
         self.assertEqual(campaign, found_campaign)
 
+    def test_should_load_game_master_eagerly_with_profile(self):
+        # given
+        user = UserEntity()
+        user.user_name = "Test User"
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
+
+        campaign = CampaignEntity()
+        campaign.campaign_name = "Test Campaign"
+        campaign.created_on = datetime.utcnow()
+        campaign.modified_on = datetime.utcnow()
+        campaign.opt_lock = 0
+        campaign.begin_date = date(2055, 1, 1)
+        campaign.passed_days = 0
+        campaign.game_master = user
+
+        self.session.add(campaign)
+        self.session.flush()
+        self.session.expunge_all()
+
+        # when
+        found_campaign = campaign_repository.read_by_id(campaign.id, campaign_repository.PROFILE_WITH_GAME_MASTER)
+
+        # then
+        self.assertNotIn("game_master", inspect(found_campaign).unloaded)
+        self.assertEqual("Test User", found_campaign.game_master.user_name)
+
     def test_should_get_none_when_campaign_does_not_exist(self):
         # when
         found_campaign = campaign_repository.read_by_id(999999)
@@ -184,7 +214,82 @@ class ReadByIdTest(TestCase):
         self.assertIsNone(found_campaign)
 
 
-class ReadByGMNameTest(TestCase):
+class ReadNamesByGMIdTest(TestCase):
+
+    def setUp(self):
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def _create_user(self, user_name):
+        user = UserEntity()
+        user.user_name = user_name
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
+
+        self.session.add(user)
+
+        return user
+
+    def _create_campaign(self, campaign_name, game_master):
+        campaign = CampaignEntity()
+        campaign.campaign_name = campaign_name
+        campaign.created_on = datetime.utcnow()
+        campaign.modified_on = datetime.utcnow()
+        campaign.opt_lock = 0
+        campaign.begin_date = date(2055, 1, 1)
+        campaign.passed_days = 0
+        campaign.game_master = game_master
+
+        self.session.add(campaign)
+
+        return campaign
+
+    def test_should_get_ids_and_names_of_campaigns_of_given_gm(self):
+        # given
+        user = self._create_user("test_user")
+        other_user = self._create_user("other_user")
+        campaign_1 = self._create_campaign("campaign_1", user)
+        campaign_2 = self._create_campaign("campaign_2", user)
+        self._create_campaign("campaign_3", other_user)
+        self.session.flush()
+
+        # when
+        rows = campaign_repository.read_names_by_gm_id(user.id)
+
+        # then
+        self.assertEqual(
+            [(campaign_1.id, "campaign_1"), (campaign_2.id, "campaign_2")],
+            [(row.id, row.campaign_name) for row in rows]
+        )
+
+    def test_should_get_single_row_without_campaign_when_gm_has_no_campaigns(self):
+        # given
+        user = self._create_user("test_user")
+        self.session.flush()
+
+        # when
+        rows = campaign_repository.read_names_by_gm_id(user.id)
+
+        # then
+        self.assertEqual(1, len(rows))
+        self.assertEqual(user.id, rows[0].gm_id)
+        self.assertIsNone(rows[0].id)
+
+    def test_should_get_nothing_when_gm_does_not_exist(self):
+        # when
+        rows = campaign_repository.read_names_by_gm_id(9999)
+
+        # then
+        self.assertEqual([], rows)
+
+
+class ReadTimelinePageTest(TestCase):
 
     def setUp(self):
         properties.init()
@@ -195,7 +300,7 @@ class ReadByGMNameTest(TestCase):
         self.session.rollback()
         self.session.close()
 
-    def test_should_get_all_campaigns_of_given_gm(self):
+    def test_should_read_timeline_pages_ordered_by_session_date_and_id(self):
         # given
         user = UserEntity()
         user.user_name = "test_user"
@@ -203,54 +308,52 @@ class ReadByGMNameTest(TestCase):
         user.modified_on = datetime.utcnow()
         user.opt_lock = 0
 
-        campaign_1 = CampaignEntity()
-        campaign_1.campaign_name = "campaign_1"
-        campaign_1.created_on = datetime.utcnow()
-        campaign_1.modified_on = datetime.utcnow()
-        campaign_1.opt_lock = 0
-        campaign_1.begin_date = date(2055, 1, 1)
-        campaign_1.passed_days = 0
-        campaign_1.game_master = user
-
-        campaign_2 = CampaignEntity()
-        campaign_2.campaign_name = "campaign_2"
-        campaign_2.created_on = datetime.utcnow()
-        campaign_2.modified_on = datetime.utcnow()
-        campaign_2.opt_lock = 0
-        campaign_2.begin_date = date(2055, 1, 1)
-        campaign_2.passed_days = 0
-        campaign_2.game_master = user
-
-        other_user = UserEntity()
-        other_user.user_name = "other_user"
-        other_user.created_on = datetime.utcnow()
-        other_user.modified_on = datetime.utcnow()
-        other_user.opt_lock = 0
-
-        campaign_3 = CampaignEntity()
-        campaign_3.campaign_name = "campaign_3"
-        campaign_3.created_on = datetime.utcnow()
-        campaign_3.modified_on = datetime.utcnow()
-        campaign_3.opt_lock = 0
-        campaign_3.begin_date = date(2055, 1, 1)
-        campaign_3.passed_days = 0
-        campaign_3.game_master = other_user
-
-        self.session.add(campaign_1)
-        self.session.add(campaign_2)
-        self.session.add(campaign_3)
+        campaign = CampaignEntity()
+        campaign.campaign_name = "Test Campaign"
+        campaign.created_on = datetime.utcnow()
+        campaign.modified_on = datetime.utcnow()
+        campaign.opt_lock = 0
+        campaign.begin_date = date(2055, 1, 1)
+        campaign.passed_days = 0
+        campaign.game_master = user
+
+        for title, session_date in [("entry_3", date(2020, 3, 1)), ("entry_1", date(2020, 1, 1)),
+                                    ("entry_2a", date(2020, 2, 1)), ("entry_2b", date(2020, 2, 1))]:
+            timeline_entry = CampaignTimelineEntity()
+            timeline_entry.created_on = datetime.utcnow()
+            timeline_entry.modified_on = datetime.utcnow()
+            timeline_entry.opt_lock = 0
+            timeline_entry.title = title
+            timeline_entry.session_date = session_date
+            timeline_entry.summary_text = "summary"
+            campaign.campaign_timeline_entries.append(timeline_entry)
+
+        self.session.add(campaign)
         self.session.flush()
 
         # when
-        found_campaigns = campaign_repository.read_by_gm_id(user.id)
+        first_page = campaign_repository.read_timeline_page(campaign.id, None, None, 2)
+        last = first_page[-1]
+        second_page = campaign_repository.read_timeline_page(campaign.id, last.session_date, last.id, 2)
 
         # then
-        self.assertIsNotNone(found_campaigns)
-        self.assertIn(campaign_1, found_campaigns)
-        self.assertIn(campaign_2, found_campaigns)
-        self.assertNotIn(campaign_3, found_campaigns)
+        self.assertEqual(["entry_1", "entry_2a"], [entry.title for entry in first_page])
+        self.assertEqual(["entry_2b", "entry_3"], [entry.title for entry in second_page])
+        self.assertNotIn("summary_text", first_page[0].keys())
+
 
-    def test_should_get_nothing_when_gm_has_no_campaigns(self):
+class StreamTimelineTest(TestCase):
+
+    def setUp(self):
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def test_should_stream_whole_timeline_in_chunks(self):
         # given
         user = UserEntity()
         user.user_name = "test_user"
@@ -258,20 +361,235 @@ class ReadByGMNameTest(TestCase):
         user.modified_on = datetime.utcnow()
         user.opt_lock = 0
 
-        self.session.add(user)
+        campaign = CampaignEntity()
+        campaign.campaign_name = "Test Campaign"
+        campaign.created_on = datetime.utcnow()
+        campaign.modified_on = datetime.utcnow()
+        campaign.opt_lock = 0
+        campaign.begin_date = date(2055, 1, 1)
+        campaign.passed_days = 0
+        campaign.game_master = user
+
+        for day in [5, 3, 1, 4, 2]:
+            timeline_entry = CampaignTimelineEntity()
+            timeline_entry.created_on = datetime.utcnow()
+            timeline_entry.modified_on = datetime.utcnow()
+            timeline_entry.opt_lock = 0
+            timeline_entry.title = f"entry_{day}"
+            timeline_entry.session_date = date(2020, 1, day)
+            timeline_entry.summary_text = f"summary_{day}"
+            campaign.campaign_timeline_entries.append(timeline_entry)
+
+        self.session.add(campaign)
         self.session.flush()
 
         # when
-        found_campaigns = campaign_repository.read_by_gm_id(user.id)
+        entries = list(campaign_repository.stream_timeline(campaign.id, 2))
 
         # then
-        self.assertIsNotNone(found_campaigns)
-        self.assertEqual(0, len(found_campaigns))
+        self.assertEqual([f"entry_{day}" for day in range(1, 6)], [entry.title for entry in entries])
+        self.assertEqual("summary_1", entries[0].summary_text)
+
+    def test_should_stream_entries_of_same_session_date_and_all_timelines_in_chunks(self):
+        # given
+        user = UserEntity()
+        user.user_name = "test_user"
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
+
+        campaign = CampaignEntity()
+        campaign.campaign_name = "Test Campaign"
+        campaign.created_on = datetime.utcnow()
+        campaign.modified_on = datetime.utcnow()
+        campaign.opt_lock = 0
+        campaign.begin_date = date(2055, 1, 1)
+        campaign.passed_days = 0
+        campaign.game_master = user
+
+        for i in range(5):
+            timeline_entry = CampaignTimelineEntity()
+            timeline_entry.created_on = datetime.utcnow()
+            timeline_entry.modified_on = datetime.utcnow()
+            timeline_entry.opt_lock = 0
+            timeline_entry.title = f"entry_{i}"
+            timeline_entry.session_date = date(2020, 1, 1)
+            campaign.campaign_timeline_entries.append(timeline_entry)
+
+        self.session.add(campaign)
+        self.session.flush()
+
+        # when
+        entries = list(campaign_repository.stream_timeline(campaign.id, 2))
+        all_entries = [
+            entry for entry in campaign_repository.stream_all_timelines(2) if entry.campaign_id == campaign.id
+        ]
+
+        # then
+        self.assertEqual([f"entry_{i}" for i in range(5)], [entry.title for entry in entries])
+        self.assertEqual([entry.id for entry in entries], [entry.id for entry in all_entries])
+
+
+class InsertTimelineEntriesTest(TestCase):
+
+    def setUp(self):
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def test_should_insert_entries_and_get_their_ids_in_order(self):
+        # given
+        user = UserEntity()
+        user.user_name = "test_user"
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
+
+        campaign = CampaignEntity()
+        campaign.campaign_name = "Test Campaign"
+        campaign.created_on = datetime.utcnow()
+        campaign.modified_on = datetime.utcnow()
+        campaign.opt_lock = 0
+        campaign.begin_date = date(2055, 1, 1)
+        campaign.passed_days = 0
+        campaign.game_master = user
+
+        self.session.add(campaign)
+        self.session.flush()
+
+        timestamp = datetime.utcnow()
+        rows = [
+            {"created_on": timestamp, "modified_on": timestamp, "opt_lock": 0, "title": f"entry_{day}",
+             "session_date": date(2020, 1, day), "summary_text": None, "campaign_id": campaign.id}
+            for day in [3, 1, 2]
+        ]
+
+        # when
+        locked = campaign_repository.lock_by_id(campaign.id)
+        entry_ids = campaign_repository.insert_timeline_entries(rows)
+
+        # then
+        self.assertTrue(locked)
+        titles = [self.session.query(CampaignTimelineEntity).get(entry_id).title for entry_id in entry_ids]
+        self.assertEqual(["entry_3", "entry_1", "entry_2"], titles)
+
+    def test_should_not_lock_campaign_that_does_not_exist(self):
+        # when then
+        self.assertFalse(campaign_repository.lock_by_id(99999))
+
+
+class AppendTimelineEntryTest(TestCase):
+
+    def setUp(self):
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def _create_timeline_entry(self, title):
+        timeline_entry = CampaignTimelineEntity()
+        timeline_entry.created_on = datetime.utcnow()
+        timeline_entry.modified_on = datetime.utcnow()
+        timeline_entry.opt_lock = 0
+        timeline_entry.title = title
+        timeline_entry.session_date = date(2020, 1, 1)
+        timeline_entry.summary_text = None
+        return timeline_entry
+
+    def test_should_append_entry_without_loading_existing_ones(self):
+        # given
+        user = UserEntity()
+        user.user_name = "test_user"
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
+
+        campaign = CampaignEntity()
+        campaign.campaign_name = "Test Campaign"
+        campaign.created_on = datetime.utcnow()
+        campaign.modified_on = datetime.utcnow()
+        campaign.opt_lock = 0
+        campaign.begin_date = date(2055, 1, 1)
+        campaign.passed_days = 0
+        campaign.game_master = user
+
+        for i in range(3):
+            campaign.campaign_timeline_entries.append(self._create_timeline_entry(f"entry_{i}"))
+
+        self.session.add(campaign)
+        self.session.flush()
+        self.session.expunge_all()
+
+        campaign = campaign_repository.read_by_id(campaign.id)
+        new_entry = self._create_timeline_entry("new_entry")
+
+        # when
+        campaign.campaign_timeline_entries.append(new_entry)
+        campaign_repository.persist(campaign)
+
+        # then
+        loaded_entries = [obj for obj in self.session.identity_map.values() if isinstance(obj, CampaignTimelineEntity)]
+        self.assertEqual([new_entry], loaded_entries)
+        self.assertEqual(4, campaign.campaign_timeline_entries.count())
+
+
+class ReadTimelineEntriesWithSummariesByIdsTest(TestCase):
+
+    def setUp(self):
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        campaign_repository.IN_CLAUSE_CHUNK_SIZE = 500
+        self.session.rollback()
+        self.session.close()
+
+    def test_should_read_all_ids_and_entries_in_chunks(self):
+        # given
+        campaign_repository.IN_CLAUSE_CHUNK_SIZE = 2
+
+        user = UserEntity()
+        user.user_name = "test_user"
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
+
+        campaign = CampaignEntity()
+        campaign.campaign_name = "Test Campaign"
+        campaign.created_on = datetime.utcnow()
+        campaign.modified_on = datetime.utcnow()
+        campaign.opt_lock = 0
+        campaign.begin_date = date(2055, 1, 1)
+        campaign.passed_days = 0
+        campaign.game_master = user
+
+        for day in range(1, 4):
+            timeline_entry = CampaignTimelineEntity()
+            timeline_entry.created_on = datetime.utcnow()
+            timeline_entry.modified_on = datetime.utcnow()
+            timeline_entry.opt_lock = 0
+            timeline_entry.title = f"entry_{day}"
+            timeline_entry.session_date = date(2020, 1, day)
+            timeline_entry.summary_text = f"summary_{day}"
+            campaign.campaign_timeline_entries.append(timeline_entry)
+
+        self.session.add(campaign)
+        self.session.flush()
 
-    def test_should_get_nothing_when_gm_does_not_exist(self):
         # when
-        found_campaigns = campaign_repository.read_by_gm_id(9999)
+        entry_ids = campaign_repository.read_all_timeline_entry_ids()
+        entries = campaign_repository.read_timeline_entries_with_summaries_by_ids(entry_ids)
 
         # then
-        self.assertIsNotNone(found_campaigns)
-        self.assertEqual(0, len(found_campaigns))
+        self.assertEqual(3, len(entry_ids))
+        self.assertEqual(entry_ids, {entry.id for entry in entries})
+        self.assertEqual({"summary_1", "summary_2", "summary_3"}, {entry.summary_text for entry in entries})
+        self.assertEqual({campaign.id}, {entry.campaign_id for entry in entries})
@@ -0,0 +1,56 @@
+"""
+The test module for the timeline export module.
+"""
+
+from datetime import date
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import create_autospec
+
+from artushima.campaign import timeline_export
+from artushima.campaign.persistence import campaign_repository
+from artushima.core.exceptions import DomainError
+
+
+class ExportTimelineTest(TestCase):
+
+    def setUp(self):
+        self.campaign_repository_mock = create_autospec(campaign_repository)
+        self.campaign_repository_mock.stream_timeline.return_value = iter([
+            SimpleNamespace(id=1, title="Sesja, pierwsza", session_date=date(2020, 1, 1), summary_text="Zażółć"),
+            SimpleNamespace(id=2, title="Sesja druga", session_date=date(2020, 2, 1), summary_text=None)
+        ])
+        timeline_export.campaign_repository = self.campaign_repository_mock
+
+    def tearDown(self):
+        timeline_export.campaign_repository = campaign_repository
+
+    def test_should_export_timeline_as_ndjson(self):
+        # when
+        lines = list(timeline_export.export_timeline(1, timeline_export.FORMAT_NDJSON))
+
+        # then
+        self.assertEqual([
+            '{"id": 1, "title": "Sesja, pierwsza", "sessionDate": "2020-01-01", "summaryText": "Zażółć"}\n',
+            '{"id": 2, "title": "Sesja druga", "sessionDate": "2020-02-01", "summaryText": null}\n'
+        ], lines)
+        self.campaign_repository_mock.stream_timeline.assert_called_once_with(1, timeline_export.CHUNK_SIZE)
+
+    def test_should_export_timeline_as_csv(self):
+        # when
+        lines = list(timeline_export.export_timeline(1, timeline_export.FORMAT_CSV))
+
+        # then
+        self.assertEqual([
+            "id,title,sessionDate,summaryText\r\n",
+            '1,"Sesja, pierwsza",2020-01-01,Zażółć\r\n',
+            "2,Sesja druga,2020-02-01,\r\n"
+        ], lines)
+
+    def test_should_raise_domain_error_on_unknown_format(self):
+        # when then
+        with self.assertRaises(DomainError) as context:
+            timeline_export.export_timeline(1, "xml")
+
+        self.assertEqual("D0004", context.exception.error_code)
+        self.campaign_repository_mock.stream_timeline.assert_not_called()
@@ -0,0 +1,145 @@
+"""
+The test module for the timeline search index module.
+"""
+
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import create_autospec
+
+from artushima.campaign import timeline_search_index
+from artushima.campaign.persistence import campaign_repository
+from artushima.core import properties
+
+
+class TokenizeTest(TestCase):
+
+    def test_should_normalize_polish_letters_and_endings(self):
+        # when
+        tokens = timeline_search_index.tokenize("Spotkaliśmy zwiadowcę Molocha w Łodzi")
+
+        # then
+        self.assertEqual(["spotkalism", "zwiadowc", "moloch", "w", "lodz"], tokens)
+
+    def test_should_match_inflected_forms(self):
+        # when then
+        self.assertEqual(timeline_search_index.tokenize("Molochem"), timeline_search_index.tokenize("Moloch"))
+        self.assertEqual(timeline_search_index.tokenize("zwiadowca"), timeline_search_index.tokenize("zwiadowcy"))
+
+    def test_should_get_no_tokens_from_none(self):
+        # when then
+        self.assertEqual([], timeline_search_index.tokenize(None))
+
+
+class TimelineSearchIndexTest(TestCase):
+
+    def setUp(self):
+        self.index_dir = tempfile.TemporaryDirectory()
+
+        self.properties_mock = create_autospec(properties)
+        self.properties_mock.get_timeline_search_index_path.return_value = os.path.join(self.index_dir.name, "index.db")
+        timeline_search_index.properties = self.properties_mock
+
+        self.campaign_repository_mock = create_autospec(campaign_repository)
+        self.campaign_repository_mock.stream_all_timelines.return_value = iter([])
+        timeline_search_index.campaign_repository = self.campaign_repository_mock
+
+        timeline_search_index.init()
+
+    def tearDown(self):
+        timeline_search_index._connection.close()
+        timeline_search_index._connection = None
+        timeline_search_index.properties = properties
+        timeline_search_index.campaign_repository = campaign_repository
+        self.index_dir.cleanup()
+
+    def test_should_find_added_entries_of_given_campaign_only(self):
+        # given
+        timeline_search_index.add_entry(1, 10, "Sesja 1", "Spotkaliśmy zwiadowcę Molocha.")
+        timeline_search_index.add_entry(1, 11, "Sesja 2", "Walka z mutantami.")
+        timeline_search_index.add_entry(2, 20, "Sesja 1", "Rozmowa z Molochem.")
+
+        # when
+        entry_ids = timeline_search_index.search(1, "moloch", 0, 10)
+
+        # then
+        self.assertEqual([10], entry_ids)
+
+    def test_should_not_mix_campaigns_with_similar_ids(self):
+        # given
+        timeline_search_index.add_entry(1, 10, "Sesja 1", "Moloch")
+        timeline_search_index.add_entry(11, 20, "Sesja 1", "Moloch")
+
+        # when
+        entry_ids = timeline_search_index.search(1, "moloch", 0, 10)
+
+        # then
+        self.assertEqual([10], entry_ids)
+
+    def test_should_recreate_index_of_other_version(self):
+        # given
+        timeline_search_index.add_entry(1, 10, "Sesja 1", "Moloch")
+        timeline_search_index._connection.execute("PRAGMA user_version = 1")
+        timeline_search_index._connection.commit()
+
+        # when
+        timeline_search_index.init()
+
+        # then
+        self.assertEqual(2, self.campaign_repository_mock.stream_all_timelines.call_count)
+        self.assertEqual([], timeline_search_index.search(1, "moloch", 0, 10))
+
+    def test_should_find_entries_added_at_once(self):
+        # given
+        timeline_search_index.add_entries([
+            (1, 10, "Sesja 1", "Spotkaliśmy zwiadowcę Molocha."),
+            (1, 11, "Sesja 2", "Rozmowa z Molochem.")
+        ])
+
+        # when
+        entry_ids = timeline_search_index.search(1, "moloch", 0, 10)
+
+        # then
+        self.assertEqual({10, 11}, set(entry_ids))
+
+    def test_should_require_all_words_of_query(self):
+        # given
+        timeline_search_index.add_entry(1, 10, "Sesja 1", "Spotkaliśmy zwiadowcę Molocha.")
+        timeline_search_index.add_entry(1, 11, "Sesja 2", "Rozmowa z Molochem.")
+
+        # when
+        entry_ids = timeline_search_index.search(1, "Moloch zwiadowca", 0, 10)
+
+        # then
+        self.assertEqual([10], entry_ids)
+
+    def test_should_rebuild_index_from_database(self):
+        # given
+        timeline_search_index.add_entry(1, 10, "Sesja 1", "Moloch")
+        self.campaign_repository_mock.stream_all_timelines.return_value = iter([
+            type("Entry", (), {"id": 11, "campaign_id": 1, "title": "Sesja 2", "summary_text": "Moloch"})
+        ])
+
+        # when
+        count = timeline_search_index.rebuild()
+
+        # then
+        self.assertEqual(1, count)
+        self.assertEqual([11], timeline_search_index.search(1, "moloch", 0, 10))
+
+    def test_should_reconcile_index_with_database(self):
+        # given
+        timeline_search_index.add_entry(1, 10, "Sesja 1", "Moloch")
+        timeline_search_index.add_entry(1, 12, "Sesja 3", "Moloch")
+        self.campaign_repository_mock.read_all_timeline_entry_ids.return_value = {10, 11}
+        self.campaign_repository_mock.read_timeline_entries_with_summaries_by_ids.return_value = [
+            type("Entry", (), {"id": 11, "campaign_id": 1, "title": "Sesja 2", "summary_text": "Moloch"})
+        ]
+
+        # when
+        counts = timeline_search_index.reconcile()
+
+        # then
+        self.assertEqual((1, 1), counts)
+        self.campaign_repository_mock.read_timeline_entries_with_summaries_by_ids.assert_called_once_with({11})
+        self.assertEqual({10, 11}, set(timeline_search_index.search(1, "moloch", 0, 10)))
@@ -0,0 +1,45 @@
+"""
+The testing module for the Bloom filter.
+"""
+
+from unittest import TestCase
+
+from artushima.core.bloom_filter import BloomFilter
+
+
+class BloomFilterTest(TestCase):
+
+    def test_should_contain_added_values(self):
+        # given
+        bloom_filter = BloomFilter(100)
+        values = [f"token-{i}" for i in range(100)]
+
+        # when
+        for value in values:
+            bloom_filter.add(value)
+
+        # then
+        for value in values:
+            self.assertTrue(bloom_filter.might_contain(value))
+
+    def test_should_not_contain_value_when_empty(self):
+        # given
+        bloom_filter = BloomFilter(100)
+
+        # when
+        result = bloom_filter.might_contain("token")
+
+        # then
+        self.assertFalse(result)
+
+    def test_should_keep_false_positive_rate_low(self):
+        # given
+        bloom_filter = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom_filter.add(f"token-{i}")
+
+        # when
+        false_positives = sum(1 for i in range(10000) if bloom_filter.might_contain(f"other-token-{i}"))
+
+        # then
+        self.assertLess(false_positives, 300)
@@ -0,0 +1,97 @@
+"""
+The testing module for the cache.
+"""
+
+import time
+from unittest import TestCase
+
+from artushima.core.cache import TTLCache
+
+
+class TTLCacheTest(TestCase):
+
+    def test_should_get_stored_value(self):
+        # given
+        cache = TTLCache(10, 60)
+        cache.put("key", "value")
+
+        # when
+        value = cache.get("key")
+
+        # then
+        self.assertEqual("value", value)
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(0, cache.misses)
+
+    def test_should_get_none_when_key_is_missing(self):
+        # given
+        cache = TTLCache(10, 60)
+
+        # when
+        value = cache.get("key")
+
+        # then
+        self.assertIsNone(value)
+        self.assertEqual(0, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_should_get_none_when_entry_has_expired(self):
+        # given
+        cache = TTLCache(10, 60)
+        cache.put("key", "value", time.time() - 1)
+
+        # when
+        value = cache.get("key")
+
+        # then
+        self.assertIsNone(value)
+        self.assertEqual(0, cache.get_stats()["size"])
+
+    def test_should_drop_least_recently_used_entry_when_full(self):
+        # given
+        cache = TTLCache(2, 60)
+        cache.put("key_1", "value_1")
+        cache.put("key_2", "value_2")
+        cache.get("key_1")
+
+        # when
+        cache.put("key_3", "value_3")
+
+        # then
+        self.assertEqual("value_1", cache.get("key_1"))
+        self.assertIsNone(cache.get("key_2"))
+        self.assertEqual("value_3", cache.get("key_3"))
+
+    def test_should_not_store_anything_when_size_is_zero(self):
+        # given
+        cache = TTLCache(0, 60)
+
+        # when
+        cache.put("key", "value")
+
+        # then
+        self.assertIsNone(cache.get("key"))
+
+    def test_should_evict_entry(self):
+        # given
+        cache = TTLCache(10, 60)
+        cache.put("key", "value")
+
+        # when
+        cache.evict("key")
+
+        # then
+        self.assertIsNone(cache.get("key"))
+
+    def test_should_evict_entries_matching_predicate(self):
+        # given
+        cache = TTLCache(10, 60)
+        cache.put("key_1", {"user_name": "user_1"})
+        cache.put("key_2", {"user_name": "user_2"})
+
+        # when
+        cache.evict_where(lambda key, value: value["user_name"] == "user_1")
+
+        # then
+        self.assertIsNone(cache.get("key_1"))
+        self.assertIsNotNone(cache.get("key_2"))
@@ -0,0 +1,49 @@
+"""
+The testing module for the cursor utils.
+"""
+
+from unittest import TestCase
+
+from artushima.core.exceptions import DomainError
+from artushima.core.utils.cursor import decode_cursor, encode_cursor
+
+
+class CursorTest(TestCase):
+
+    def test_should_decode_encoded_cursor(self):
+        # given
+        cursor = encode_cursor({"id": 42})
+
+        # when
+        position = decode_cursor(cursor, "id")
+
+        # then
+        self.assertEqual({"id": 42}, position)
+        self.assertNotIn("=", cursor)
+
+    def test_should_decode_none_to_none(self):
+        # when
+        position = decode_cursor(None, "id")
+
+        # then
+        self.assertIsNone(position)
+
+    def test_should_raise_domain_error_on_malformed_cursor(self):
+        # when
+        with self.assertRaises(DomainError) as context:
+            decode_cursor("not a cursor!", "id")
+
+        # then
+        self.assertEqual("D0002", context.exception.error_code)
+        self.assertEqual(400, context.exception.http_status)
+
+    def test_should_raise_domain_error_when_key_is_missing(self):
+        # given
+        cursor = encode_cursor({"name": "test"})
+
+        # when
+        with self.assertRaises(DomainError) as context:
+            decode_cursor(cursor, "id")
+
+        # then
+        self.assertEqual("D0002", context.exception.error_code)
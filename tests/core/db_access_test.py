@@ -0,0 +1,95 @@
+"""
+The testing module for the database access module.
+"""
+
+from datetime import datetime
+from unittest import TestCase
+
+from artushima.core import db_access, properties
+from artushima.user.persistence.model import UserEntity
+from tests import assertModelInitialized
+
+
+class RunAfterCommitTest(TestCase):
+
+    def setUp(self):
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+        self.calls = list()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def test_should_run_callback_after_commit(self):
+        # given
+        db_access.run_after_commit(lambda: self.calls.append("callback"))
+
+        # when
+        self.assertEqual([], self.calls)
+        self.session.commit()
+
+        # then
+        self.assertEqual(["callback"], self.calls)
+
+    def test_should_run_callback_only_once(self):
+        # given
+        db_access.run_after_commit(lambda: self.calls.append("callback"))
+        self.session.commit()
+
+        # when
+        self.session.commit()
+
+        # then
+        self.assertEqual(["callback"], self.calls)
+
+    def test_should_discard_callback_on_rollback(self):
+        # given
+        db_access.run_after_commit(lambda: self.calls.append("callback"))
+
+        # when
+        self.session.rollback()
+        self.session.commit()
+
+        # then
+        self.assertEqual([], self.calls)
+
+
+class SavepointTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def test_should_roll_back_only_changes_of_failed_block(self):
+        # given
+        self.session.add(self._create_user("kept_user"))
+        self.session.flush()
+
+        # when
+        with self.assertRaises(RuntimeError):
+            with db_access.savepoint():
+                self.session.add(self._create_user("discarded_user"))
+                self.session.flush()
+                raise RuntimeError("test error")
+
+        # then
+        user_names = {user.user_name for user in self.session.query(UserEntity).all()}
+        self.assertIn("kept_user", user_names)
+        self.assertNotIn("discarded_user", user_names)
+
+    def _create_user(self, user_name):
+        user = UserEntity()
+        user.user_name = user_name
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
+
+        return user
@@ -0,0 +1,127 @@
+"""
+The testing module for the password hashing.
+"""
+
+from unittest import TestCase
+from unittest.mock import create_autospec
+
+from artushima.core import password_hashing, properties
+from artushima.core.exceptions import DomainError
+
+
+class PasswordHashingTest(TestCase):
+
+    def setUp(self):
+        self.properties_mock = create_autospec(properties)
+        self.properties_mock.get_password_hash_method.return_value = None
+        password_hashing.properties = self.properties_mock
+
+    def tearDown(self):
+        password_hashing.shutdown()
+        password_hashing.properties = properties
+
+    def test_should_hash_and_check_password_in_calling_thread(self):
+        # when
+        password_hash = password_hashing.generate_password_hash("password")
+
+        # then
+        self.assertTrue(password_hashing.check_password_hash(password_hash, "password"))
+        self.assertFalse(password_hashing.check_password_hash(password_hash, "wrong_password"))
+
+    def test_should_hash_and_check_password_in_worker_process(self):
+        # given
+        self.properties_mock.get_hashing_workers.return_value = "1"
+        self.properties_mock.get_hashing_queue_limit.return_value = "2"
+        password_hashing.init()
+
+        # when
+        password_hash = password_hashing.generate_password_hash("password")
+
+        # then
+        self.assertTrue(password_hashing.check_password_hash(password_hash, "password"))
+        self.assertFalse(password_hashing.check_password_hash(password_hash, "wrong_password"))
+
+    def test_should_reject_task_when_queue_is_full(self):
+        # given
+        self.properties_mock.get_hashing_workers.return_value = "1"
+        self.properties_mock.get_hashing_queue_limit.return_value = "0"
+        password_hashing.init()
+
+        # when then
+        with self.assertRaises(DomainError) as context:
+            password_hashing.generate_password_hash("password")
+
+        self.assertEqual(503, context.exception.http_status)
+
+    def test_should_hash_password_with_configured_method(self):
+        # given
+        self.properties_mock.get_password_hash_method.return_value = "pbkdf2:sha256:1000"
+        self.properties_mock.get_hashing_workers.return_value = "1"
+        self.properties_mock.get_hashing_queue_limit.return_value = "2"
+        password_hashing.init()
+
+        # when
+        password_hash = password_hashing.generate_password_hash("password")
+
+        # then
+        self.assertTrue(password_hash.startswith("pbkdf2:sha256:1000$"))
+
+    def test_should_hash_many_passwords_in_worker_processes(self):
+        # given
+        self.properties_mock.get_password_hash_method.return_value = "pbkdf2:sha256:1000"
+        self.properties_mock.get_hashing_workers.return_value = "2"
+        self.properties_mock.get_hashing_queue_limit.return_value = "1"
+        password_hashing.init()
+
+        # when
+        password_hashes = password_hashing.generate_password_hashes(["password_1", "password_2", "password_3"])
+
+        # then
+        self.assertEqual(3, len(password_hashes))
+        self.assertTrue(password_hashing.check_password_hash(password_hashes[0], "password_1"))
+        self.assertTrue(password_hashing.check_password_hash(password_hashes[2], "password_3"))
+
+
+class NeedsRehashTest(TestCase):
+
+    def setUp(self):
+        self.properties_mock = create_autospec(properties)
+        self.properties_mock.get_hashing_workers.return_value = "1"
+        self.properties_mock.get_hashing_queue_limit.return_value = "1"
+        password_hashing.properties = self.properties_mock
+
+    def tearDown(self):
+        password_hashing.shutdown()
+        password_hashing.properties = properties
+
+    def test_should_not_need_rehash_when_method_is_current(self):
+        # given
+        self.properties_mock.get_password_hash_method.return_value = "pbkdf2:sha256:1000"
+        password_hashing.init()
+
+        # when then
+        self.assertFalse(password_hashing.needs_rehash("pbkdf2:sha256:1000$salt$hash"))
+
+    def test_should_need_rehash_when_iterations_differ(self):
+        # given
+        self.properties_mock.get_password_hash_method.return_value = "pbkdf2:sha256:2000"
+        password_hashing.init()
+
+        # when then
+        self.assertTrue(password_hashing.needs_rehash("pbkdf2:sha256:1000$salt$hash"))
+
+    def test_should_not_need_rehash_when_iterations_are_not_configured(self):
+        # given
+        self.properties_mock.get_password_hash_method.return_value = "pbkdf2:sha256"
+        password_hashing.init()
+
+        # when then
+        self.assertFalse(password_hashing.needs_rehash("pbkdf2:sha256:1000$salt$hash"))
+
+    def test_should_need_rehash_when_algorithm_differs(self):
+        # given
+        self.properties_mock.get_password_hash_method.return_value = "pbkdf2:sha512:1000"
+        password_hashing.init()
+
+        # when then
+        self.assertTrue(password_hashing.needs_rehash("pbkdf2:sha256:1000$salt$hash"))
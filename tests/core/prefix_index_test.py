@@ -0,0 +1,52 @@
+"""
+The testing module for the prefix index.
+"""
+
+from unittest import TestCase
+
+from artushima.core.prefix_index import PrefixIndex
+
+
+class PrefixIndexTest(TestCase):
+
+    def test_should_find_keys_by_prefix_case_insensitively(self):
+        # given
+        index = PrefixIndex([("Bob", 2), ("alice", 1), ("Alan", 3), ("carol", 4)])
+
+        # when
+        result = index.search("AL", 10)
+
+        # then
+        self.assertEqual([("Alan", 3), ("alice", 1)], result)
+
+    def test_should_limit_number_of_results(self):
+        # given
+        index = PrefixIndex([("user_1", 1), ("user_2", 2), ("user_3", 3)])
+
+        # when
+        result = index.search("user", 2)
+
+        # then
+        self.assertEqual([("user_1", 1), ("user_2", 2)], result)
+
+    def test_should_find_added_keys(self):
+        # given
+        index = PrefixIndex([("alice", 1)])
+
+        # when
+        index.add("Alan", 2)
+        index.add("alice", 3)
+
+        # then
+        self.assertEqual([("Alan", 2), ("alice", 3)], index.search("a", 10))
+        self.assertEqual(2, len(index))
+
+    def test_should_find_nothing_when_no_key_matches(self):
+        # given
+        index = PrefixIndex([("alice", 1)])
+
+        # when
+        result = index.search("bob", 10)
+
+        # then
+        self.assertEqual([], result)
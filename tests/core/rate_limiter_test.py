@@ -0,0 +1,67 @@
+"""
+The testing module for the rate limiter.
+"""
+
+from unittest import TestCase
+
+from artushima.core.rate_limiter import TokenBucketLimiter
+
+
+class TokenBucketLimiterTest(TestCase):
+
+    def test_should_allow_burst_and_reject_further_attempts(self):
+        # given
+        limiter = TokenBucketLimiter(0, 3)
+
+        # when
+        results = [limiter.try_acquire("key") for _ in range(4)]
+
+        # then
+        self.assertEqual([True, True, True, False], results)
+
+    def test_should_check_token_without_taking_it(self):
+        # given
+        limiter = TokenBucketLimiter(0, 1)
+
+        # when
+        results = [limiter.has_token("key") for _ in range(3)]
+
+        # then
+        self.assertEqual([True, True, True], results)
+        self.assertTrue(limiter.try_acquire("key"))
+        self.assertFalse(limiter.has_token("key"))
+
+    def test_should_keep_separate_bucket_for_each_key(self):
+        # given
+        limiter = TokenBucketLimiter(0, 1)
+
+        # when
+        first_result = limiter.try_acquire("key_1")
+        second_result = limiter.try_acquire("key_2")
+
+        # then
+        self.assertTrue(first_result)
+        self.assertTrue(second_result)
+
+    def test_should_refill_bucket(self):
+        # given
+        limiter = TokenBucketLimiter(1000000, 1)
+        limiter.try_acquire("key")
+
+        # when
+        result = limiter.try_acquire("key")
+
+        # then
+        self.assertTrue(result)
+
+    def test_should_drop_least_recently_used_bucket(self):
+        # given
+        limiter = TokenBucketLimiter(0, 1, max_keys=1)
+        limiter.try_acquire("key_1")
+        limiter.try_acquire("key_2")
+
+        # when
+        result = limiter.try_acquire("key_1")
+
+        # then
+        self.assertTrue(result)
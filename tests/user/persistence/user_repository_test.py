@@ -5,9 +5,12 @@ The testing module for the user repository.
 from datetime import datetime
 from unittest import TestCase
 
+from sqlalchemy import inspect
+
 from artushima.core import db_access, properties
-from artushima.core.exceptions import PersistenceError
+from artushima.core.exceptions import DomainError, PersistenceError
 from artushima.user.persistence import user_repository
+from artushima.user.persistence.user_repository import IN_CLAUSE_CHUNK_SIZE
 from artushima.user.persistence.model import (UserEntity, UserHistoryEntity,
                                               UserRoleEntity)
 from tests import assertModelInitialized
@@ -122,6 +125,70 @@ class PersistTest(TestCase):
             user_repository.persist(user)
 
 
+class PersistVersionedTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def _persist_new_user(self):
+        user = UserEntity()
+        user.user_name = "test_user"
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
+
+        return user_repository.persist(user)
+
+    def test_should_increment_version_on_update(self):
+        # given
+        user = self._persist_new_user()
+        version = user.opt_lock
+
+        # when
+        user.password_hash = "new_hash"
+        user_repository.persist(user)
+
+        # then
+        self.assertEqual(version + 1, user.opt_lock)
+
+    def test_should_get_domain_error_when_user_was_changed_concurrently(self):
+        # given
+        user = self._persist_new_user()
+        self.session.execute(
+            UserEntity.__table__.update()
+            .where(UserEntity.__table__.c.id == user.id)
+            .values(opt_lock=user.opt_lock + 1)
+        )
+
+        # when
+        user.password_hash = "new_hash"
+        with self.assertRaises(DomainError) as context:
+            user_repository.persist(user)
+
+        # then
+        self.assertEqual("D0005", context.exception.error_code)
+        self.assertEqual(409, context.exception.http_status)
+
+    def test_should_increment_version_with_role_epoch(self):
+        # given
+        user = self._persist_new_user()
+        version = user.opt_lock
+
+        # when
+        user_repository.increment_role_epochs([user.id], datetime.utcnow())
+
+        # then
+        self.session.refresh(user)
+        self.assertEqual(version + 1, user.opt_lock)
+
+
 class ReadByIdTest(TestCase):
 
     def setUp(self):
@@ -198,7 +265,7 @@ class ReadByUserNameTest(TestCase):
         self.assertIsNone(found_user)
 
 
-class ReadAllTest(TestCase):
+class ReadByUserNameWithRolesTest(TestCase):
 
     def setUp(self):
         assertModelInitialized()
@@ -210,28 +277,345 @@ class ReadAllTest(TestCase):
         self.session.rollback()
         self.session.close()
 
-    def test_should_read_all_users(self):
+    def test_should_get_user_with_roles_by_user_name(self):
         # given
-        user_1 = UserEntity()
-        user_1.user_name = "test_user_1"
-        user_1.created_on = datetime.utcnow()
-        user_1.modified_on = datetime.utcnow()
-        user_1.opt_lock = 0
+        user = UserEntity()
+        user.user_name = "test_user"
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
 
-        user_2 = UserEntity()
-        user_2.user_name = "test_user_2"
-        user_2.created_on = datetime.utcnow()
-        user_2.modified_on = datetime.utcnow()
-        user_2.opt_lock = 0
+        user_role = UserRoleEntity()
+        user_role.created_on = datetime.utcnow()
+        user_role.modified_on = datetime.utcnow()
+        user_role.opt_lock = 0
+        user_role.role_name = "test_role"
+        user_role.user = user
 
-        self.session.add(user_1)
-        self.session.add(user_2)
+        self.session.add(user)
         self.session.flush()
 
         # when
-        found_users = user_repository.read_all()
+        found_user = user_repository.read_by_user_name("test_user", user_repository.PROFILE_WITH_ROLES)
+
+        # then
+        self.assertEqual(user, found_user)
+        self.assertEqual(["test_role"], [role.role_name for role in found_user.user_roles])
+
+    def test_should_load_roles_eagerly_with_profile(self):
+        # given
+        user = UserEntity()
+        user.user_name = "test_user"
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
+
+        self.session.add(user)
+        self.session.flush()
+        self.session.expunge_all()
+
+        # when
+        found_user = user_repository.read_by_user_name("test_user", user_repository.PROFILE_WITH_ROLES)
+        found_user_without_profile = user_repository.read_by_id(found_user.id)
+
+        # then
+        self.assertNotIn("user_roles", inspect(found_user).unloaded)
+        self.assertIn("user_history_entries", inspect(found_user_without_profile).unloaded)
+
+    def test_should_raise_value_error_on_unknown_profile(self):
+        # when then
+        with self.assertRaises(ValueError):
+            user_repository.read_by_user_name("test_user", "unknown_profile")
+
+    def test_should_get_none_when_user_does_not_exist(self):
+        # when
+        found_user = user_repository.read_by_user_name("test_user", user_repository.PROFILE_WITH_ROLES)
+
+        # then
+        self.assertIsNone(found_user)
+
+
+class ReadAuthStateByUserNameTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def test_should_get_id_and_role_epoch(self):
+        # given
+        user = UserEntity()
+        user.user_name = "test_user"
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
+        user.role_epoch = 3
+
+        self.session.add(user)
+        self.session.flush()
+
+        # when
+        found_user = user_repository.read_auth_state_by_user_name("test_user")
+
+        # then
+        self.assertEqual(user.id, found_user.id)
+        self.assertEqual(3, found_user.role_epoch)
+
+    def test_should_get_none_when_user_does_not_exist(self):
+        # when
+        found_user = user_repository.read_auth_state_by_user_name("test_user")
+
+        # then
+        self.assertIsNone(found_user)
+
+
+class ReadPageTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def _create_user(self, user_name):
+        user = UserEntity()
+        user.user_name = user_name
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
+
+        self.session.add(user)
+        self.session.flush()
+
+        return user
+
+    def test_should_read_page_of_users_ordered_by_id(self):
+        # given
+        user_1 = self._create_user("test_user_1")
+        user_2 = self._create_user("test_user_2")
+        user_3 = self._create_user("test_user_3")
+
+        # when
+        page = user_repository.read_page(user_1.id, 2)
+
+        # then
+        self.assertEqual([(user_2.id, "test_user_2"), (user_3.id, "test_user_3")], [tuple(row) for row in page])
+
+    def test_should_read_first_page_when_no_id_given(self):
+        # given
+        user_1 = self._create_user("test_user_1")
+        self._create_user("test_user_2")
+
+        # when
+        page = user_repository.read_page(None, 1)
+
+        # then
+        self.assertEqual(1, len(page))
+        self.assertLessEqual(page[0].id, user_1.id)
+
+
+class PersistAllTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def test_should_persist_all_users(self):
+        # given
+        users = list()
+
+        for user_name in ["test_user_1", "test_user_2"]:
+            user = UserEntity()
+            user.user_name = user_name
+            user.created_on = datetime.utcnow()
+            user.modified_on = datetime.utcnow()
+            user.opt_lock = 0
+            users.append(user)
+
+        # when
+        user_repository.persist_all(users)
+
+        # then
+        self.assertIsNotNone(users[0].id)
+        self.assertIsNotNone(users[1].id)
+
+    def test_should_raise_value_error_when_element_is_of_wrong_type(self):
+        # when then
+        with self.assertRaises(ValueError):
+            user_repository.persist_all([str()])
+
+
+class ReadExistingUserNamesTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def test_should_read_existing_user_names(self):
+        # given
+        user = UserEntity()
+        user.user_name = "test_user"
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
+
+        self.session.add(user)
+        self.session.flush()
+
+        # when
+        existing_user_names = user_repository.read_existing_user_names(["test_user", "other_user"])
+
+        # then
+        self.assertEqual({"test_user"}, existing_user_names)
+
+
+class UserRolesBulkTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+        self.user = UserEntity()
+        self.user.user_name = "test_user"
+        self.user.created_on = datetime.utcnow()
+        self.user.modified_on = datetime.utcnow()
+        self.user.opt_lock = 0
+        self.user.role_epoch = 0
+
+        self.session.add(self.user)
+        self.session.flush()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def _create_row(self, **values):
+        return dict(created_on=datetime.utcnow(), modified_on=datetime.utcnow(), opt_lock=0, **values)
+
+    def test_should_insert_read_and_delete_user_roles(self):
+        # given
+        user_repository.insert_user_roles([
+            self._create_row(user_id=self.user.id, role_name="role_1"),
+            self._create_row(user_id=self.user.id, role_name="role_2")
+        ])
+
+        # when
+        pairs = user_repository.read_user_role_pairs([self.user.id], ["role_1", "role_3"])
+        user_repository.delete_user_roles([self.user.id], ["role_2"])
+        remaining_pairs = user_repository.read_user_role_pairs([self.user.id], ["role_1", "role_2"])
+
+        # then
+        self.assertEqual({(self.user.id, "role_1")}, pairs)
+        self.assertEqual({(self.user.id, "role_1")}, remaining_pairs)
+
+    def test_should_read_ids_and_increment_role_epochs(self):
+        # given
+        user_repository.insert_user_history_entries([
+            self._create_row(user_id=self.user.id, editor_name="test_editor", message="test_message")
+        ])
+
+        # when
+        user_ids = user_repository.read_ids_by_user_names(["test_user", "other_user"])
+        user_repository.increment_role_epochs([self.user.id], datetime.utcnow())
+        self.session.expire_all()
+
+        # then
+        self.assertEqual({"test_user": self.user.id}, user_ids)
+        self.assertEqual(1, self.user.role_epoch)
+        self.assertEqual(1, len(self.user.user_history_entries))
+
+    def test_should_read_in_chunks(self):
+        # given
+        other_user = UserEntity()
+        other_user.user_name = "other_user"
+        other_user.created_on = datetime.utcnow()
+        other_user.modified_on = datetime.utcnow()
+        other_user.opt_lock = 0
+        other_user.role_epoch = 0
+
+        self.session.add(other_user)
+        self.session.flush()
+
+        user_repository.insert_user_roles([
+            self._create_row(user_id=self.user.id, role_name="role_1"),
+            self._create_row(user_id=other_user.id, role_name="role_1")
+        ])
+        user_repository.IN_CLAUSE_CHUNK_SIZE = 1
+
+        try:
+            # when
+            user_ids = user_repository.read_ids_by_user_names(["test_user", "other_user"])
+            pairs = user_repository.read_user_role_pairs(user_ids.values(), ["role_1"])
+        finally:
+            user_repository.IN_CLAUSE_CHUNK_SIZE = IN_CLAUSE_CHUNK_SIZE
+
+        # then
+        self.assertEqual({"test_user": self.user.id, "other_user": other_user.id}, user_ids)
+        self.assertEqual({(self.user.id, "role_1"), (other_user.id, "role_1")}, pairs)
+
+
+class ReadHistoryPageTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        properties.init()
+        db_access.init()
+        self.session = db_access.Session()
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    def test_should_read_page_of_history_newest_first(self):
+        # given
+        user = UserEntity()
+        user.user_name = "test_user"
+        user.created_on = datetime.utcnow()
+        user.modified_on = datetime.utcnow()
+        user.opt_lock = 0
+
+        for i in range(4):
+            history_entry = UserHistoryEntity()
+            history_entry.created_on = datetime.utcnow()
+            history_entry.modified_on = datetime.utcnow()
+            history_entry.opt_lock = 0
+            history_entry.editor_name = "test_editor"
+            history_entry.message = f"message_{i}"
+            history_entry.user = user
+
+        self.session.add(user)
+        self.session.flush()
+
+        newest_id = max(entry.id for entry in user.user_history_entries)
+
+        # when
+        first_page = user_repository.read_history_page(user.id, None, 2)
+        second_page = user_repository.read_history_page(user.id, first_page[-1].id, 2)
 
         # then
-        self.assertIsNotNone(found_users)
-        self.assertIn(user_1, found_users)
-        self.assertIn(user_2, found_users)
+        self.assertEqual(["message_3", "message_2"], [entry.message for entry in first_page])
+        self.assertEqual(newest_id, first_page[0].id)
+        self.assertEqual(["message_1", "message_0"], [entry.message for entry in second_page])
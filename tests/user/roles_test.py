@@ -0,0 +1,48 @@
+"""
+The testing module for the user roles utils.
+"""
+
+from unittest import TestCase
+
+from artushima.user import roles
+
+
+class GetRoleMaskTest(TestCase):
+
+    def test_should_assign_distinct_bit_to_each_role(self):
+        # when
+        masks = [roles.get_role_mask([role]) for role in roles.ALL_ROLES]
+
+        # then
+        self.assertEqual(len(roles.ALL_ROLES), len(set(masks)))
+        for mask in masks:
+            self.assertEqual(1, bin(mask).count("1"))
+
+    def test_should_combine_roles(self):
+        # when
+        mask = roles.get_role_mask([roles.ROLE_SHOW_USERS, roles.ROLE_CREATE_USER])
+
+        # then
+        self.assertTrue(mask & roles.get_role_mask([roles.ROLE_SHOW_USERS]))
+        self.assertTrue(mask & roles.get_role_mask([roles.ROLE_CREATE_USER]))
+        self.assertFalse(mask & roles.get_role_mask([roles.ROLE_START_CAMPAIGN]))
+
+    def test_should_ignore_unknown_role(self):
+        # when
+        mask = roles.get_role_mask(["unknown_role"])
+
+        # then
+        self.assertEqual(0, mask)
+
+
+class GetRequiredRoleMaskTest(TestCase):
+
+    def test_should_get_zero_when_no_roles_are_required(self):
+        # when then
+        self.assertEqual(0, roles.get_required_role_mask(None))
+        self.assertEqual(0, roles.get_required_role_mask([]))
+
+    def test_should_raise_error_on_unknown_role(self):
+        # when then
+        with self.assertRaises(ValueError):
+            roles.get_required_role_mask(["unknown_role"])
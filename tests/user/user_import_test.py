@@ -0,0 +1,105 @@
+"""
+The testing module for the parser of the users to import.
+"""
+
+import csv
+from unittest import TestCase
+
+from artushima.core.exceptions import DomainError
+from artushima.user import user_import
+
+
+class ParseCsvTest(TestCase):
+
+    def test_should_parse_csv_rows(self):
+        # given
+        text = (
+            "userName,password,roles\n"
+            "test_user_1,password_1,role_show_users; role_create_user\n"
+            "test_user_2,password_2,\n"
+        )
+
+        # when
+        rows = user_import.parse(text, user_import.FORMAT_CSV)
+
+        # then
+        self.assertEqual([
+            {"user_name": "test_user_1", "password": "password_1", "roles": ["role_show_users", "role_create_user"]},
+            {"user_name": "test_user_2", "password": "password_2", "roles": None}
+        ], rows)
+
+    def test_should_parse_repeated_roles_once(self):
+        # given
+        text = (
+            "userName,password,roles\n"
+            "test_user,password,role_show_users;role_create_user;role_show_users\n"
+        )
+
+        # when
+        rows = user_import.parse(text, user_import.FORMAT_CSV)
+
+        # then
+        self.assertEqual(["role_show_users", "role_create_user"], rows[0]["roles"])
+
+    def test_should_raise_domain_error_when_csv_is_malformed(self):
+        # given
+        text = "userName,password,roles\n" + "x" * (csv.field_size_limit() + 1) + "\n"
+
+        # when then
+        with self.assertRaises(DomainError) as context:
+            user_import.parse(text, user_import.FORMAT_CSV)
+
+        self.assertEqual("D0006", context.exception.error_code)
+
+
+class ParseJsonLinesTest(TestCase):
+
+    def test_should_parse_json_lines(self):
+        # given
+        text = '{"userName": "test_user", "password": "password", "roles": ["role_show_users"]}\n\n'
+
+        # when
+        rows = user_import.parse(text, user_import.FORMAT_JSON_LINES)
+
+        # then
+        self.assertEqual([
+            {"user_name": "test_user", "password": "password", "roles": ["role_show_users"]},
+            user_import.BLANK_ROW
+        ], rows)
+
+    def test_should_keep_blank_lines_in_the_row_numbering(self):
+        # given
+        text = '\n{"userName": \n  \n{"userName": "test_user", "password": "password"}'
+
+        # when
+        rows = user_import.parse(text, user_import.FORMAT_JSON_LINES)
+
+        # then
+        self.assertEqual(4, len(rows))
+        self.assertEqual(user_import.BLANK_ROW, rows[0])
+        self.assertIsNone(rows[1])
+        self.assertEqual(user_import.BLANK_ROW, rows[2])
+        self.assertEqual("test_user", rows[3]["user_name"])
+
+    def test_should_parse_repeated_roles_once(self):
+        # given
+        text = '{"userName": "test_user", "password": "password", "roles": ["role_show_users", "role_show_users"]}'
+
+        # when
+        rows = user_import.parse(text, user_import.FORMAT_JSON_LINES)
+
+        # then
+        self.assertEqual(["role_show_users"], rows[0]["roles"])
+
+    def test_should_parse_malformed_lines_to_none(self):
+        # given
+        text = '{"userName": \n[1, 2]\n{"userName": "test_user", "password": "password"}'
+
+        # when
+        rows = user_import.parse(text, user_import.FORMAT_JSON_LINES)
+
+        # then
+        self.assertEqual(3, len(rows))
+        self.assertIsNone(rows[0])
+        self.assertIsNone(rows[1])
+        self.assertEqual("test_user", rows[2]["user_name"])
@@ -2,7 +2,6 @@
 The testing module for the user roles service.
 """
 
-from datetime import datetime
 from unittest import TestCase
 from unittest.mock import create_autospec
 
@@ -74,96 +73,107 @@ class GetUserRolesTest(TestCase):
             user_roles_service.get_user_roles(1)
 
 
-class GrantRolesTest(TestCase):
+class GrantRolesToUsersTest(TestCase):
 
     def setUp(self):
-        assertModelInitialized()
         self.user_repository_mock = create_autospec(user_repository)
         user_roles_service.user_repository = self.user_repository_mock
 
     def tearDown(self):
         user_roles_service.user_repository = user_repository
 
-    def test_should_raise_exception_when_editor_name_is_not_str(self):
-        # when then
-        with self.assertRaises(ValueError):
-            user_roles_service.grant_roles(1, "test_user", ["test_role_1"])
+    def test_should_grant_only_missing_roles(self):
+        # given
+        self.user_repository_mock.read_ids_by_user_names.return_value = {"test_user_1": 1, "test_user_2": 2}
+        self.user_repository_mock.read_user_role_pairs.return_value = {
+            (1, "role_show_users"), (2, "role_show_users"), (2, "role_start_campaign")
+        }
 
-    def test_should_raise_exception_when_editor_name_is_none(self):
-        # when then
-        with self.assertRaises(BusinessError):
-            user_roles_service.grant_roles(None, "test_user", ["test_role_1"])
+        # when
+        granted = user_roles_service.grant_roles_to_users(
+            "test_editor", ["test_user_1", "test_user_2"], ["role_show_users", "role_start_campaign"]
+        )
 
-    def test_should_raise_exception_when_editor_name_is_empty(self):
-        # when then
-        with self.assertRaises(BusinessError):
-            user_roles_service.grant_roles("", "test_user", ["test_role_1"])
+        # then
+        self.assertEqual(1, granted)
 
-    def test_should_raise_exception_when_user_name_is_not_str(self):
-        # when then
-        with self.assertRaises(ValueError):
-            user_roles_service.grant_roles("test_editor", 1, ["test_role_1"])
+        user_roles = self.user_repository_mock.insert_user_roles.call_args[0][0]
+        self.assertEqual([(1, "role_start_campaign")], [(role["user_id"], role["role_name"]) for role in user_roles])
 
-    def test_should_raise_exception_when_user_name_is_none(self):
-        # when then
-        with self.assertRaises(BusinessError):
-            user_roles_service.grant_roles("test_editor", None, ["test_role_1"])
+        history_entries = self.user_repository_mock.insert_user_history_entries.call_args[0][0]
+        self.assertEqual(1, len(history_entries))
+        self.assertEqual("Przyznano rolę 'role_start_campaign'.", history_entries[0]["message"])
+        self.assertEqual("test_editor", history_entries[0]["editor_name"])
 
-    def test_should_raise_exception_when_user_name_is_empty(self):
-        # when then
-        with self.assertRaises(BusinessError):
-            user_roles_service.grant_roles("test_editor", "", ["test_role_1"])
+        self.user_repository_mock.increment_role_epochs.assert_called_once()
+        self.assertEqual([1], self.user_repository_mock.increment_role_epochs.call_args[0][0])
 
-    def test_should_raise_exception_when_roles_arg_is_none(self):
-        # when then
-        with self.assertRaises(BusinessError):
-            user_roles_service.grant_roles("test_editor", "test_user", None)
+    def test_should_not_change_epochs_when_all_roles_are_granted(self):
+        # given
+        self.user_repository_mock.read_ids_by_user_names.return_value = {"test_user": 1}
+        self.user_repository_mock.read_user_role_pairs.return_value = {(1, "role_show_users")}
 
-    def test_should_raise_exception_when_roles_arg_is_not_list(self):
-        # when then
-        with self.assertRaises(ValueError):
-            user_roles_service.grant_roles("test_editor", "test_user", 1)
+        # when
+        granted = user_roles_service.grant_roles_to_users("test_editor", ["test_user"], ["role_show_users"])
 
-    def test_should_raise_exception_when_user_does_not_exist(self):
+        # then
+        self.assertEqual(0, granted)
+        self.user_repository_mock.increment_role_epochs.assert_not_called()
+
+    def test_should_raise_error_when_user_does_not_exist(self):
         # given
-        self.user_repository_mock.read_by_user_name.return_value = None
+        self.user_repository_mock.read_ids_by_user_names.return_value = {"test_user_1": 1}
 
         # when then
         with self.assertRaises(BusinessError):
-            user_roles_service.grant_roles("test_editor", "test_user", ["test_role_1"])
+            user_roles_service.grant_roles_to_users("test_editor", ["test_user_1", "test_user_2"], ["role_show_users"])
+
+        self.user_repository_mock.insert_user_roles.assert_not_called()
 
-    def test_should_grant_new_roles_to_user(self):
+    def test_should_raise_error_when_role_does_not_exist(self):
         # given
-        test_user = UserEntity()
-        test_user.user_name = "test_user"
+        self.user_repository_mock.read_ids_by_user_names.return_value = {"test_user": 1}
+
+        # when then
+        with self.assertRaises(BusinessError):
+            user_roles_service.grant_roles_to_users("test_editor", ["test_user"], ["role_show_users", "role_unknown"])
 
-        self.user_repository_mock.read_by_user_name.return_value = test_user
+        self.user_repository_mock.insert_user_roles.assert_not_called()
 
-        # when
-        user_roles_service.grant_roles("test_editor", "test_user", ["test_role_1", "test_role_2"])
 
-        # then
-        self.user_repository_mock.persist.assert_called_once_with(test_user)
-        self.assertEqual(2, len(test_user.user_roles))
-        self.assertEqual("test_role_1", test_user.user_roles[0].role_name)
-        self.assertEqual("test_role_2", test_user.user_roles[1].role_name)
+class RevokeRolesFromUsersTest(TestCase):
 
-    def test_should_not_modify_old_role_when_granting_new_one(self):
-        # given
-        test_user = UserEntity()
-        test_user.user_name = "test_user"
+    def setUp(self):
+        self.user_repository_mock = create_autospec(user_repository)
+        user_roles_service.user_repository = self.user_repository_mock
 
-        old_role = UserRoleEntity()
-        old_role.role_name = "old_role"
-        old_role.created_on = datetime(2010, 1, 1)
-        old_role.user = test_user
+    def tearDown(self):
+        user_roles_service.user_repository = user_repository
 
-        self.user_repository_mock.read_by_user_name.return_value = test_user
+    def test_should_revoke_existing_roles(self):
+        # given
+        self.user_repository_mock.read_ids_by_user_names.return_value = {"test_user_1": 1, "test_user_2": 2}
+        self.user_repository_mock.read_user_role_pairs.return_value = {(2, "role_show_users")}
 
         # when
-        user_roles_service.grant_roles("test_editor", "test_user", ["old_role", "new_role"])
+        revoked = user_roles_service.revoke_roles_from_users("test_editor", ["test_user_1", "test_user_2"],
+                                                             ["role_show_users"])
 
         # then
-        self.assertEqual(2, len(test_user.user_roles))
-        self.assertEqual("old_role", test_user.user_roles[0].role_name)
-        self.assertEqual(datetime(2010, 1, 1), test_user.user_roles[0].created_on)
+        self.assertEqual(1, revoked)
+        self.user_repository_mock.delete_user_roles.assert_called_once()
+
+        history_entries = self.user_repository_mock.insert_user_history_entries.call_args[0][0]
+        self.assertEqual([2], [entry["user_id"] for entry in history_entries])
+        self.assertEqual("Odebrano rolę 'role_show_users'.", history_entries[0]["message"])
+        self.assertEqual([2], self.user_repository_mock.increment_role_epochs.call_args[0][0])
+
+    def test_should_raise_error_when_role_does_not_exist(self):
+        # given
+        self.user_repository_mock.read_ids_by_user_names.return_value = {"test_user": 1}
+
+        # when then
+        with self.assertRaises(BusinessError):
+            user_roles_service.revoke_roles_from_users("test_editor", ["test_user"], ["role_unknown"])
+
+        self.user_repository_mock.delete_user_roles.assert_not_called()
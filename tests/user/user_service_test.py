@@ -3,15 +3,17 @@ The testing module for the user service.
 """
 
 from datetime import datetime
+from types import SimpleNamespace
 from unittest import TestCase
 from unittest.mock import create_autospec
 
+from artushima.core import db_access, password_hashing
+from artushima.core.cache import TTLCache
 from artushima.core.exceptions import BusinessError
-from artushima.user import user_service
+from artushima.user import user_events, user_import, user_service
 from artushima.user.persistence import user_repository
-from artushima.user.persistence.model import UserEntity
+from artushima.user.persistence.model import UserEntity, UserRoleEntity
 from tests import assertModelInitialized
-from werkzeug import security
 
 
 class GetUserByIdTest(TestCase):
@@ -44,10 +46,8 @@ class GetUserByIdTest(TestCase):
         self.assertIsInstance(user_data, dict)
         self.assertEqual(user.id, user_data["id"])
         self.assertEqual(user.user_name, user_data["user_name"])
-        self.assertEqual(user.created_on, user_data["created_on"])
-        self.assertEqual(user.modified_on, user_data["modified_on"])
-        self.assertEqual(user.opt_lock, user_data["opt_lock"])
-        self.assertEqual(user.password_hash, user_data["password_hash"])
+        self.assertNotIn("password_hash", user_data)
+        self.assertNotIn("opt_lock", user_data)
 
         self.user_repository_mock.read_by_id.assert_called_once_with(1)
 
@@ -72,6 +72,48 @@ class GetUserByIdTest(TestCase):
             user_service.get_user_by_id("1")
 
 
+class GetUserCredentialsTest(TestCase):
+
+    def setUp(self):
+        self.user_repository_mock = create_autospec(user_repository)
+        user_service.user_repository = self.user_repository_mock
+
+    def tearDown(self):
+        user_service.user_repository = user_repository
+
+    def test_should_get_credentials_from_database_every_time(self):
+        # given
+        user = UserEntity()
+        user.id = 1
+        user.user_name = "test_user"
+        user.password_hash = "test_hash"
+        user.role_epoch = 0
+
+        self.user_repository_mock.read_by_user_name.return_value = user
+        user_service.user_cache = TTLCache(10, 60)
+
+        # when
+        user_service.get_user_credentials("test_user")
+        user_data = user_service.get_user_credentials("test_user")
+
+        # then
+        self.assertEqual("test_hash", user_data["password_hash"])
+        self.assertEqual(2, self.user_repository_mock.read_by_user_name.call_count)
+        self.assertIsNone(user_service.user_cache.get(("user_name", "test_user")))
+
+        user_service.user_cache = None
+
+    def test_should_get_none_when_user_does_not_exist(self):
+        # given
+        self.user_repository_mock.read_by_user_name.return_value = None
+
+        # when
+        user_data = user_service.get_user_credentials("test_user")
+
+        # then
+        self.assertIsNone(user_data)
+
+
 class GetUserByUserNameTest(TestCase):
 
     def setUp(self):
@@ -101,10 +143,8 @@ class GetUserByUserNameTest(TestCase):
         self.assertIsInstance(user_data, dict)
         self.assertEqual(user.id, user_data["id"])
         self.assertEqual(user.user_name, user_data["user_name"])
-        self.assertEqual(user.created_on, user_data["created_on"])
-        self.assertEqual(user.modified_on, user_data["modified_on"])
-        self.assertEqual(user.opt_lock, user_data["opt_lock"])
-        self.assertEqual(user.password_hash, user_data["password_hash"])
+        self.assertNotIn("password_hash", user_data)
+        self.assertNotIn("opt_lock", user_data)
 
         self.user_repository_mock.read_by_user_name.assert_called_once_with("test_user")
 
@@ -134,7 +174,51 @@ class GetUserByUserNameTest(TestCase):
             user_service.get_user_by_user_name("")
 
 
-class GetAllUsersTest(TestCase):
+class GetUserWithRolesByUserNameTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        self.user_repository_mock = create_autospec(user_repository)
+        user_service.user_repository = self.user_repository_mock
+
+    def tearDown(self):
+        user_service.user_repository = user_repository
+
+    def test_should_get_user_with_roles(self):
+        # given
+        user = UserEntity()
+        user.id = 1
+        user.user_name = "test_user"
+
+        role = UserRoleEntity()
+        role.role_name = "test_role"
+        role.user = user
+
+        self.user_repository_mock.read_by_user_name.return_value = user
+
+        # when
+        user_data = user_service.get_user_with_roles_by_user_name("test_user")
+
+        # then
+        self.assertEqual(1, user_data["id"])
+        self.assertEqual("test_user", user_data["user_name"])
+        self.assertEqual(["test_role"], user_data["roles"])
+        self.user_repository_mock.read_by_user_name.assert_called_once_with(
+            "test_user", user_repository.PROFILE_WITH_ROLES
+        )
+
+    def test_should_get_none_when_user_does_not_exist(self):
+        # given
+        self.user_repository_mock.read_by_user_name.return_value = None
+
+        # when
+        user_data = user_service.get_user_with_roles_by_user_name("test_user")
+
+        # then
+        self.assertIsNone(user_data)
+
+
+class GetUserAuthStateTest(TestCase):
 
     def setUp(self):
         self.user_repository_mock = create_autospec(user_repository)
@@ -143,30 +227,165 @@ class GetAllUsersTest(TestCase):
     def tearDown(self):
         user_service.user_repository = user_repository
 
-    def test_should_get_all_users(self):
+    def test_should_get_user_auth_state(self):
+        # given
+        self.user_repository_mock.read_auth_state_by_user_name.return_value = SimpleNamespace(
+            id=1,
+            role_epoch=3,
+            tokens_valid_after=None
+        )
+
+        # when
+        user_data = user_service.get_user_auth_state("test_user")
+
+        # then
+        self.assertEqual({"id": 1, "role_epoch": 3, "tokens_valid_after": None}, user_data)
+
+    def test_should_get_none_when_user_does_not_exist(self):
+        # given
+        self.user_repository_mock.read_auth_state_by_user_name.return_value = None
+
+        # when
+        user_data = user_service.get_user_auth_state("test_user")
+
+        # then
+        self.assertIsNone(user_data)
+
+
+class GetUsersPageTest(TestCase):
+
+    def setUp(self):
+        self.user_repository_mock = create_autospec(user_repository)
+        user_service.user_repository = self.user_repository_mock
+
+    def tearDown(self):
+        user_service.user_repository = user_repository
+
+    def test_should_get_page_with_last_id_when_there_are_more_users(self):
+        # given
+        self.user_repository_mock.read_page.return_value = [
+            SimpleNamespace(id=2, user_name="test_user_2"),
+            SimpleNamespace(id=3, user_name="test_user_3"),
+            SimpleNamespace(id=4, user_name="test_user_4")
+        ]
+
+        # when
+        page = user_service.get_users_page(1, 2)
+
+        # then
+        self.assertEqual([{"id": 2, "user_name": "test_user_2"}, {"id": 3, "user_name": "test_user_3"}], page["users"])
+        self.assertEqual(3, page["last_id"])
+        self.user_repository_mock.read_page.assert_called_once_with(1, 3)
+
+    def test_should_get_last_page_without_last_id(self):
+        # given
+        self.user_repository_mock.read_page.return_value = [SimpleNamespace(id=2, user_name="test_user_2")]
+
+        # when
+        page = user_service.get_users_page(None, 2)
+
+        # then
+        self.assertEqual([{"id": 2, "user_name": "test_user_2"}], page["users"])
+        self.assertIsNone(page["last_id"])
+        self.user_repository_mock.read_page.assert_called_once_with(None, 3)
+
+
+class GetUserHistoryPageTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        self.user_repository_mock = create_autospec(user_repository)
+        user_service.user_repository = self.user_repository_mock
+
+        user = UserEntity()
+        user.id = 1
+        user.user_name = "test_user"
+        self.user_repository_mock.read_by_id.return_value = user
+
+    def tearDown(self):
+        user_service.user_repository = user_repository
+
+    def test_should_get_page_with_last_id_when_there_are_more_entries(self):
+        # given
+        timestamp = datetime.utcnow()
+        self.user_repository_mock.read_history_page.return_value = [
+            SimpleNamespace(id=5, created_on=timestamp, editor_name="test_editor", message="message_5"),
+            SimpleNamespace(id=3, created_on=timestamp, editor_name="test_editor", message="message_3")
+        ]
+
+        # when
+        page = user_service.get_user_history_page(1, 6, 1)
+
+        # then
+        self.assertEqual([{"id": 5, "created_on": timestamp, "editor_name": "test_editor", "message": "message_5"}],
+                         page["entries"])
+        self.assertEqual(5, page["last_id"])
+        self.user_repository_mock.read_history_page.assert_called_once_with(1, 6, 2)
+
+    def test_should_raise_error_when_user_does_not_exist(self):
+        # given
+        self.user_repository_mock.read_by_id.return_value = None
+
+        # when then
+        with self.assertRaises(BusinessError):
+            user_service.get_user_history_page(1, None, 10)
+
+        self.user_repository_mock.read_history_page.assert_not_called()
+
+
+class SearchUsersTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        self.user_repository_mock = create_autospec(user_repository)
+        self.password_hashing_mock = create_autospec(password_hashing)
+        self.db_access_mock = create_autospec(db_access)
+        self.after_commit_callbacks = list()
+        self.db_access_mock.run_after_commit.side_effect = self.after_commit_callbacks.append
+        user_service.user_repository = self.user_repository_mock
+        user_service.password_hashing = self.password_hashing_mock
+        user_service.db_access = self.db_access_mock
+
+    def tearDown(self):
+        user_service.user_repository = user_repository
+        user_service.password_hashing = password_hashing
+        user_service.db_access = db_access
+        user_service.user_search_index = None
+
+    def test_should_build_index_once_and_search_it(self):
+        # given
+        self.user_repository_mock.read_all_identities.return_value = [
+            SimpleNamespace(id=1, user_name="Alice"),
+            SimpleNamespace(id=2, user_name="bob")
+        ]
+
+        # when
+        user_service.search_users("b", 10)
+        found_users = user_service.search_users("a", 10)
+
+        # then
+        self.assertEqual([{"id": 1, "user_name": "Alice"}], found_users)
+        self.user_repository_mock.read_all_identities.assert_called_once()
+
+    def test_should_find_created_user_after_commit(self):
         # given
-        user_1 = UserEntity()
-        user_1.user_name = "test_user_1"
-        user_1.created_on = datetime.utcnow()
-        user_1.modified_on = datetime.utcnow()
-        user_1.opt_lock = 0
+        self.user_repository_mock.read_all_identities.return_value = []
+        self.user_repository_mock.read_by_user_name.return_value = None
+        self.user_repository_mock.persist.side_effect = lambda user: setattr(user, "id", 7)
+        user_service.init_user_search_index()
 
-        user_2 = UserEntity()
-        user_2.user_name = "test_user_2"
-        user_2.created_on = datetime.utcnow()
-        user_2.modified_on = datetime.utcnow()
-        user_2.opt_lock = 0
+        # when
+        user_service.create_user("test_editor", "test_user", "test_password")
 
-        self.user_repository_mock.read_all.return_value = [user_1, user_2]
+        # then
+        self.assertEqual([], user_service.search_users("TEST", 10))
 
         # when
-        found_users = user_service.get_all_users()
+        for callback in self.after_commit_callbacks:
+            callback()
 
         # then
-        self.assertIsNotNone(found_users)
-        self.assertEqual(2, len(found_users))
-        self.assertEqual("test_user_1", found_users[0]["user_name"])
-        self.assertEqual("test_user_2", found_users[1]["user_name"])
+        self.assertEqual([{"id": 7, "user_name": "test_user"}], user_service.search_users("TEST", 10))
 
 
 class CreateUserTest(TestCase):
@@ -174,18 +393,18 @@ class CreateUserTest(TestCase):
     def setUp(self):
 
         self.user_repository_mock = create_autospec(user_repository)
-        self.security_mock = create_autospec(security)
+        self.password_hashing_mock = create_autospec(password_hashing)
         user_service.user_repository = self.user_repository_mock
-        user_service.security = self.security_mock
+        user_service.password_hashing = self.password_hashing_mock
 
     def tearDown(self):
         user_service.user_repository = user_repository
-        user_service.security = security
+        user_service.password_hashing = password_hashing
 
     def test_should_create_new_user(self):
         # given
         self.user_repository_mock.read_by_user_name.return_value = None
-        self.security_mock.generate_password_hash.return_value = "test_hash"
+        self.password_hashing_mock.generate_password_hash.return_value = "test_hash"
 
         # when
         user_service.create_user("test_editor", "test_user", "test_password")
@@ -206,7 +425,7 @@ class CreateUserTest(TestCase):
     def test_should_create_new_user_with_roles(self):
         # given
         self.user_repository_mock.read_by_user_name.return_value = None
-        self.security_mock.generate_password_hash.return_value = "test_hash"
+        self.password_hashing_mock.generate_password_hash.return_value = "test_hash"
 
         # when
         user_service.create_user("test_editor", "test_user", "test_password", ["role_1", "role_2"])
@@ -288,3 +507,248 @@ class CreateUserTest(TestCase):
 
         with self.assertRaises(BusinessError):
             user_service.create_user("test_editor", "test_user", "test_password")
+
+
+class ImportUsersTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        self.user_repository_mock = create_autospec(user_repository)
+        self.password_hashing_mock = create_autospec(password_hashing)
+        self.password_hashing_mock.generate_password_hashes.side_effect = \
+            lambda passwords: [f"hash_{password}" for password in passwords]
+        self.user_repository_mock.persist_all.side_effect = self._assign_ids
+        user_service.user_repository = self.user_repository_mock
+        user_service.password_hashing = self.password_hashing_mock
+
+    def tearDown(self):
+        user_service.user_repository = user_repository
+        user_service.password_hashing = password_hashing
+
+    def _assign_ids(self, users):
+        for user in users:
+            user.id = int(user.user_name.rsplit("_", 1)[-1])
+
+        return users
+
+    def test_should_import_users(self):
+        # given
+        self.user_repository_mock.read_existing_user_names.return_value = set()
+        rows = [
+            {"user_name": "test_user_1", "password": "password_1", "roles": ["role_show_users"]},
+            {"user_name": "test_user_2", "password": "password_2", "roles": None}
+        ]
+
+        # when
+        result = user_service.import_users("test_editor", rows)
+
+        # then
+        self.assertEqual(2, result["created"])
+        self.assertEqual([], result["errors"])
+
+        self.user_repository_mock.read_existing_user_names.assert_called_once_with({"test_user_1", "test_user_2"})
+        self.password_hashing_mock.generate_password_hashes.assert_called_once_with(["password_1", "password_2"])
+        self.user_repository_mock.persist_all.assert_called_once()
+
+        users = self.user_repository_mock.persist_all.call_args[0][0]
+        self.assertEqual(["test_user_1", "test_user_2"], [user.user_name for user in users])
+        self.assertEqual("hash_password_1", users[0].password_hash)
+
+        self.user_repository_mock.insert_user_roles.assert_called_once()
+        role_rows = self.user_repository_mock.insert_user_roles.call_args[0][0]
+        self.assertEqual([(1, "role_show_users")], [(row["user_id"], row["role_name"]) for row in role_rows])
+
+        self.user_repository_mock.insert_user_history_entries.assert_called_once()
+        history_rows = self.user_repository_mock.insert_user_history_entries.call_args[0][0]
+        self.assertEqual([1, 2], [row["user_id"] for row in history_rows])
+        self.assertEqual("test_editor", history_rows[1]["editor_name"])
+        self.assertEqual("Użytkownik test_user_2 został utworzony.", history_rows[1]["message"])
+
+    def test_should_report_invalid_rows_and_import_the_rest(self):
+        # given
+        self.user_repository_mock.read_existing_user_names.return_value = {"existing_user"}
+        rows = [
+            None,
+            {"user_name": "existing_user", "password": "password"},
+            {"user_name": "", "password": "password"},
+            {"user_name": "test_user", "password": None},
+            {"user_name": "test_user_1", "password": "password", "roles": ["unknown_role"]},
+            {"user_name": "test_user_1", "password": "password"},
+            {"user_name": "test_user_1", "password": "password"}
+        ]
+
+        # when
+        result = user_service.import_users("test_editor", rows)
+
+        # then
+        self.assertEqual(1, result["created"])
+        self.assertEqual([1, 2, 3, 4, 5, 7], [error["row"] for error in result["errors"]])
+        self.assertEqual("Użytkownik existing_user już istnieje!", result["errors"][1]["message"])
+        self.assertEqual("Nieznana rola: unknown_role.", result["errors"][4]["message"])
+
+    def test_should_persist_users_in_batches(self):
+        # given
+        self.user_repository_mock.read_existing_user_names.return_value = set()
+        rows = [
+            {"user_name": f"test_user_{i}", "password": "password"}
+            for i in range(user_service.IMPORT_BATCH_SIZE + 1)
+        ]
+
+        # when
+        result = user_service.import_users("test_editor", rows)
+
+        # then
+        self.assertEqual(user_service.IMPORT_BATCH_SIZE + 1, result["created"])
+        self.assertEqual(2, self.user_repository_mock.persist_all.call_count)
+        self.assertEqual(2, self.user_repository_mock.insert_user_history_entries.call_count)
+
+    def test_should_skip_blank_rows_but_count_them(self):
+        # given
+        self.user_repository_mock.read_existing_user_names.return_value = set()
+        rows = [
+            {"user_name": "test_user_1", "password": "password"},
+            user_import.BLANK_ROW,
+            None
+        ]
+
+        # when
+        result = user_service.import_users("test_editor", rows)
+
+        # then
+        self.assertEqual(1, result["created"])
+        self.assertEqual([3], [error["row"] for error in result["errors"]])
+
+
+class UserCacheTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        self.user_repository_mock = create_autospec(user_repository)
+        user_service.user_repository = self.user_repository_mock
+        user_service.user_cache = TTLCache(10, 60)
+
+        self.user = UserEntity()
+        self.user.id = 1
+        self.user.user_name = "test_user"
+        self.user.role_epoch = 0
+
+    def tearDown(self):
+        user_service.user_repository = user_repository
+        user_service.user_cache = None
+
+    def test_should_read_user_once_by_name_and_id(self):
+        # given
+        self.user_repository_mock.read_by_user_name.return_value = self.user
+
+        # when
+        user_service.get_user_by_user_name("test_user")
+        user_data = user_service.get_user_by_id(1)
+
+        # then
+        self.assertEqual("test_user", user_data["user_name"])
+        self.user_repository_mock.read_by_user_name.assert_called_once_with("test_user")
+        self.user_repository_mock.read_by_id.assert_not_called()
+
+    def test_should_not_share_cached_dict_with_callers(self):
+        # given
+        self.user_repository_mock.read_by_id.return_value = self.user
+        user_service.get_user_by_id(1)["user_name"] = "changed"
+
+        # when
+        user_data = user_service.get_user_by_id(1)
+
+        # then
+        self.assertEqual("test_user", user_data["user_name"])
+
+    def test_should_read_user_again_after_user_changed(self):
+        # given
+        self.user_repository_mock.read_by_id.return_value = self.user
+        user_service.get_user_by_id(1)
+
+        # when
+        user_events.publish_user_changed("test_user")
+        user_service.get_user_by_id(1)
+
+        # then
+        self.assertEqual(2, self.user_repository_mock.read_by_id.call_count)
+
+    def test_should_not_cache_missing_user(self):
+        # given
+        self.user_repository_mock.read_by_id.return_value = None
+
+        # when
+        user_service.get_user_by_id(1)
+        user_service.get_user_by_id(1)
+
+        # then
+        self.assertEqual(2, self.user_repository_mock.read_by_id.call_count)
+
+
+class RevokeTokensTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        self.user_repository_mock = create_autospec(user_repository)
+        user_service.user_repository = self.user_repository_mock
+
+    def tearDown(self):
+        user_service.user_repository = user_repository
+
+    def test_should_revoke_tokens(self):
+        # given
+        user = UserEntity()
+        user.id = 1
+        user.user_name = "test_user"
+
+        self.user_repository_mock.read_by_id.return_value = user
+
+        # when
+        user_service.revoke_tokens("test_editor", 1)
+
+        # then
+        self.assertIsNotNone(user.tokens_valid_after)
+        self.assertEqual(0, user.tokens_valid_after.microsecond)
+        self.assertEqual(1, len(user.user_history_entries))
+        self.user_repository_mock.persist.assert_called_once_with(user)
+
+    def test_should_raise_error_when_user_does_not_exist(self):
+        # given
+        self.user_repository_mock.read_by_id.return_value = None
+
+        # when then
+        with self.assertRaises(BusinessError):
+            user_service.revoke_tokens("test_editor", 1)
+
+
+class ChangePasswordHashTest(TestCase):
+
+    def setUp(self):
+        assertModelInitialized()
+        self.user_repository_mock = create_autospec(user_repository)
+        user_service.user_repository = self.user_repository_mock
+
+    def tearDown(self):
+        user_service.user_repository = user_repository
+
+    def test_should_change_password_hash(self):
+        # given
+        user = UserEntity()
+        user.user_name = "test_user"
+        user.password_hash = "old_hash"
+
+        self.user_repository_mock.read_by_user_name.return_value = user
+
+        # when
+        user_service.change_password_hash("test_user", "new_hash")
+
+        # then
+        self.assertEqual("new_hash", user.password_hash)
+        self.user_repository_mock.persist.assert_called_once_with(user)
+
+    def test_should_raise_error_when_user_does_not_exist(self):
+        # given
+        self.user_repository_mock.read_by_user_name.return_value = None
+
+        # when then
+        with self.assertRaises(BusinessError):
+            user_service.change_password_hash("test_user", "new_hash")